@@ -3,6 +3,8 @@ import discord
 from discord.ext import commands
 from dotenv import load_dotenv
 from utils.database import DatabaseManager
+from utils.worker_pool import WorkerPool
+from utils.rank_card import warm_renderer
 
 # Load environment variables
 load_dotenv()
@@ -22,8 +24,18 @@ class MyBot(commands.AutoShardedBot):
     def __init__(self):
         super().__init__(command_prefix='!', intents=intents)
         self.db = DatabaseManager()
+        # Dedicated image rendering pool, kept apart from the default executor music uses
+        self.renderer = WorkerPool(
+            "Renderer", max_workers=2, max_pending=32, per_key_limit=4, initializer=warm_renderer
+        )
+
+    async def close(self):
+        await super().close()
+        self.renderer.shutdown()
 
     async def setup_hook(self):
+        self.renderer.warm()
+
         # Load cogs
         initial_extensions = [
             'cogs.essentials',
@@ -1,23 +1,143 @@
+import time
+import logging
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord import app_commands
 from datetime import datetime, timezone
 from utils.helpers import format_duration
 
+# Each AFK user is announced at most once per channel in this many seconds; later mentions are counted
+AFK_NOTICE_WINDOW = 60
+# Windows holding a count nobody has seen yet are forgotten after this long
+AFK_NOTICE_FORGET = 3600
+
+# AFK changes are queued in memory and written in one batch on this interval
+AFK_FLUSH_SECONDS = 10
+# AFK statuses older than this are cleared automatically
+AFK_EXPIRY_DAYS = 30
+
 
 class AFK(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.db = bot.db
+        self.logger = logging.getLogger("AFK")
         # In-memory cache so on_message doesn't hit the DB on every single message
-        # { (guild_id, user_id): (reason, timestamp) }
+        # { (guild_id, user_id): (reason, timestamp) }, filled per guild as each becomes available
         self._cache: dict[tuple[int, int], tuple[str, float]] = {}
-        self._load_cache()
+        self._loaded_guilds: set[int] = set()
+        # Write-behind queue: { (guild_id, user_id): (reason, timestamp), or None to delete }
+        self._pending: dict[tuple[int, int], tuple[str, float] | None] = {}
+        # Notice windows: { (channel_id, afk_user_id): [opened_at, suppressed mentions] }
+        self._notices: dict[tuple[int, int], list] = {}
+        self._notices_swept = time.monotonic()
+
+        self.flush_loop.start()
+        self.prune_loop.start()
+
+    async def cog_load(self):
+        # Reloading the cog: guilds are already available and won't fire the event again
+        for guild in self.bot.guilds:
+            if not guild.unavailable:
+                self._load_guild(guild)
+
+    def cog_unload(self):
+        self.flush_loop.cancel()
+        self.prune_loop.cancel()
+        self.flush()
 
-    def _load_cache(self):
-        rows = self.db.fetchall("SELECT user_id, guild_id, reason, timestamp FROM afk")
-        for user_id, guild_id, reason, timestamp in rows:
-            self._cache[(guild_id, user_id)] = (reason, timestamp)
+    # -------------------------------------------------------------------------
+    # Store
+    # -------------------------------------------------------------------------
+
+    def _load_guild(self, guild: discord.Guild):
+        """Load one guild's AFK entries, dropping expired ones and members who have left."""
+        if guild.id in self._loaded_guilds:
+            return
+        self._loaded_guilds.add(guild.id)
+        cutoff = datetime.now(timezone.utc).timestamp() - AFK_EXPIRY_DAYS * 86400
+        rows = self.db.fetchall("SELECT user_id, reason, timestamp FROM afk WHERE guild_id = ?", (guild.id,))
+        for user_id, reason, timestamp in rows:
+            key = (guild.id, user_id)
+            if key in self._pending:
+                continue  # A queued change is newer than the stored row
+            if timestamp < cutoff or (guild.chunked and guild.get_member(user_id) is None):
+                self._pending[key] = None
+                continue
+            self._cache[key] = (reason, timestamp)
+
+    def _set(self, guild_id: int, user_id: int, entry: tuple[str, float] | None):
+        key = (guild_id, user_id)
+        if entry is None:
+            self._cache.pop(key, None)
+        else:
+            self._cache[key] = entry
+        self._pending[key] = entry
+
+    def flush(self) -> bool:
+        """Write queued AFK changes in one transaction. On failure they stay queued for the next flush."""
+        if not self._pending:
+            return True
+        pending, self._pending = self._pending, {}
+        upserts = [(k[1], k[0], e[0], e[1]) for k, e in pending.items() if e is not None]
+        deletes = [(k[1], k[0]) for k, e in pending.items() if e is None]
+        try:
+            if deletes:
+                self.db.executemany("DELETE FROM afk WHERE user_id = ? AND guild_id = ?", deletes, commit=not upserts)
+            if upserts:
+                self.db.executemany(
+                    "INSERT OR REPLACE INTO afk (user_id, guild_id, reason, timestamp) VALUES (?, ?, ?, ?)", upserts
+                )
+        except Exception as e:
+            # Keep the batch for the next flush unless something newer replaced it meanwhile
+            for key, entry in pending.items():
+                self._pending.setdefault(key, entry)
+            self.logger.error(f"Failed to write {len(pending)} AFK changes, will retry: {e!r}")
+            return False
+        return True
+
+    @tasks.loop(seconds=AFK_FLUSH_SECONDS)
+    async def flush_loop(self):
+        self.flush()
+
+    @tasks.loop(hours=1)
+    async def prune_loop(self):
+        cutoff = datetime.now(timezone.utc).timestamp() - AFK_EXPIRY_DAYS * 86400
+        for key in [k for k, (_, timestamp) in self._cache.items() if timestamp < cutoff]:
+            self._set(key[0], key[1], None)
+        # Rows for guilds that haven't loaded (or that the bot has left) are pruned in SQL, via idx_afk_timestamp
+        try:
+            self.db.execute("DELETE FROM afk WHERE timestamp < ?", (cutoff,))
+        except Exception as e:
+            self.logger.error(f"Failed to prune expired AFK entries: {e!r}")
+
+    @flush_loop.before_loop
+    async def before_flush_loop(self):
+        await self.bot.wait_until_ready()
+
+    @prune_loop.before_loop
+    async def before_prune_loop(self):
+        await self.bot.wait_until_ready()
+
+    def _open_notice(self, channel_id: int, user_id: int, now: float):
+        """Return the mentions suppressed since the last notice if a new one should be sent, else None."""
+        key = (channel_id, user_id)
+        window = self._notices.get(key)
+        if window and now - window[0] < AFK_NOTICE_WINDOW:
+            window[1] += 1
+            return None
+        self._notices[key] = [now, 0]
+        return window[1] if window else 0
+
+    def _sweep_notices(self, now: float):
+        # Expired windows are only kept while they carry a count for the next notice
+        if now - self._notices_swept < AFK_NOTICE_WINDOW:
+            return
+        self._notices_swept = now
+        for key, (opened_at, suppressed) in list(self._notices.items()):
+            age = now - opened_at
+            if age >= AFK_NOTICE_FORGET or (age >= AFK_NOTICE_WINDOW and not suppressed):
+                del self._notices[key]
 
     # -------------------------------------------------------------------------
     # Command
@@ -30,12 +150,8 @@ class AFK(commands.Cog):
         user_id = interaction.user.id
         now = datetime.now(timezone.utc).timestamp()
 
-        # Save to DB and cache
-        self.db.execute(
-            "INSERT OR REPLACE INTO afk (user_id, guild_id, reason, timestamp) VALUES (?, ?, ?, ?)",
-            (user_id, guild_id, reason, now),
-        )
-        self._cache[(guild_id, user_id)] = (reason, now)
+        # Save to cache; flush_loop writes it to the DB
+        self._set(guild_id, user_id, (reason, now))
 
         # Add [AFK] prefix to nickname
         member = interaction.user
@@ -59,6 +175,26 @@ class AFK(commands.Cog):
     # Listeners
     # -------------------------------------------------------------------------
 
+    @commands.Cog.listener()
+    async def on_guild_available(self, guild: discord.Guild):
+        self._load_guild(guild)
+
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild: discord.Guild):
+        self._load_guild(guild)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        # Rows stay in the DB in case the bot is re-added; the prune loop expires them eventually
+        self._loaded_guilds.discard(guild.id)
+        for key in [k for k in self._cache if k[0] == guild.id]:
+            del self._cache[key]
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member: discord.Member):
+        if (member.guild.id, member.id) in self._cache:
+            self._set(member.guild.id, member.id, None)
+
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message):
         if message.author.bot or message.guild is None:
@@ -69,11 +205,11 @@ class AFK(commands.Cog):
 
         # --- Clear AFK if the author is AFK ---
         if (guild_id, author_id) in self._cache:
-            reason, timestamp = self._cache.pop((guild_id, author_id))
-            self.db.execute(
-                "DELETE FROM afk WHERE user_id = ? AND guild_id = ?",
-                (author_id, guild_id),
-            )
+            reason, timestamp = self._cache[(guild_id, author_id)]
+            self._set(guild_id, author_id, None)
+            # A fresh AFK later should be announced right away
+            for key in [k for k in self._notices if k[1] == author_id]:
+                del self._notices[key]
 
             # Remove [AFK] from nickname
             member = message.author
@@ -106,25 +242,37 @@ class AFK(commands.Cog):
         if not message.mentions:
             return
 
+        now = time.monotonic()
+        self._sweep_notices(now)
+        lines = []
         for mentioned in message.mentions:
             if mentioned.bot or mentioned.id == author_id:
                 continue
             key = (guild_id, mentioned.id)
             if key not in self._cache:
                 continue
+            suppressed = self._open_notice(message.channel.id, mentioned.id, now)
+            if suppressed is None:
+                continue
 
             reason, timestamp = self._cache[key]
             elapsed = datetime.now(timezone.utc).timestamp() - timestamp
             duration = format_duration(elapsed)
 
-            embed = discord.Embed(
-                description=f"💤 **{mentioned.display_name}** is AFK — *{reason}* (for {duration})",
-                color=discord.Color.greyple(),
-            )
-            try:
-                await message.channel.send(embed=embed, delete_after=15)
-            except discord.Forbidden:
-                pass
+            line = f"💤 **{mentioned.display_name}** is AFK — *{reason}* (for {duration})"
+            if suppressed:
+                line += f" · mentioned {suppressed} more time{'s' if suppressed != 1 else ''} since the last notice"
+            lines.append(line)
+
+        if not lines:
+            return
+
+        # Every AFK user mentioned in the message shares one embed
+        embed = discord.Embed(description="\n".join(lines), color=discord.Color.greyple())
+        try:
+            await message.channel.send(embed=embed, delete_after=15)
+        except discord.Forbidden:
+            pass
 
 
 async def setup(bot):
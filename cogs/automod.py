@@ -1,103 +1,413 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord import app_commands
 import re
 import json
 import time
 import datetime
-from collections import deque, defaultdict
+import asyncio
+import io
+import itertools
+import logging
+import os
+from collections import OrderedDict, deque, defaultdict
+from typing import NamedTuple
+from utils.text_normalize import normalize_text
+from utils.domain_trie import URL_HOST_REGEX, DomainTrie, extract_hosts, normalize_domain, parse_blocklist
+from utils.raid_detector import JoinRateDetector, replay, replay_fixed
+from utils.worker_pool import WorkerPool, PoolBusy
+from utils.classifiers import compile_keywords, scan_keywords, zalgo_marks
+from utils.image_hash import BKTree, dhash, format_hash, parse_hash
+
+
+# Discord accepts at most 200 users per bulk-ban request
+RAID_BATCH_SIZE = 200
+# Joins arriving during a lockdown are held this long so they can be actioned together
+RAID_FLUSH_DELAY = 2
+# Recent joins kept per guild for /automod_raid_replay
+JOIN_HISTORY_SIZE = 5_000
+
+# Log embeds are buffered per guild and delivered in batches through a webhook
+LOG_FLUSH_SECONDS = 5
+LOG_BATCH_SIZE = 10  # Discord allows at most 10 embeds per message
+LOG_WEBHOOK_NAME = "AutoMod Logs"
+# A channel where no webhook could be set up is retried after this long (or when its permissions change)
+LOG_WEBHOOK_RETRY_SECONDS = 600
+
+# Cached per-member exemption verdicts per guild before the guild's cache is reset
+EXEMPT_CACHE_SIZE = 50_000
+
+# Violation ledger: dirty scores are written back on this interval
+VIOLATION_FLUSH_SECONDS = 30
+# Scores that have decayed below this are dropped from the ledger
+VIOLATION_PRUNE_SCORE = 0.05
+# Fully decayed entries are swept from memory and the database on this interval
+VIOLATION_SWEEP_HOURS = 6
+
+# Inclusive bounds for /automod_limits settings that can't take any non-negative value
+LIMIT_RANGES = {
+    "raid_sensitivity": (1, 20),
+}
+
+# Text patterns run against normalize_text() output, not the raw message
+INVITE_REGEX = re.compile(r"discord(?:\.gg|(?:app)?\.com/invite)/")
+
+# Domain allow/deny lists are capped per guild to keep each trie's memory bounded
+MAX_DOMAINS_PER_GUILD = 200_000
+DOMAIN_IMPORT_CHUNK = 5_000
+# /automod_domains list shows as many domains as fit in one message
+DOMAIN_LIST_LENGTH = 1900
+
+# Heavy checks run in a bounded worker pool so inline rules never wait behind them
+WORKER_PROCESSES = min(4, os.cpu_count() or 1)
+WORKER_MAX_PENDING = 64
+WORKER_GUILD_QUOTA = 8
+# Bad-word lists longer than this are scanned in the worker pool instead of inline
+KEYWORD_OFFLOAD_THRESHOLD = 500
+# Zalgo checks on messages up to this length are cheap enough to run inline
+ZALGO_INLINE_LENGTH = 200
+
+# Image blocklist: hashes per guild, hashed attachment URLs remembered, and the largest file worth hashing
+MAX_IMAGE_HASHES = 5_000
+IMAGE_HASH_CACHE_SIZE = 10_000
+MAX_HASH_BYTES = 8 * 1024 * 1024
+
+# Bumped on every compile so worker processes know when their cached keyword set is stale
+_keyword_revisions = itertools.count(1)
+
+
+# -----------------------------------------------------------------------------
+# Settings
+# -----------------------------------------------------------------------------
+
+def default_punishments():
+    return [
+        {"threshold": 1, "action": "delete", "duration": 0},
+        {"threshold": 3, "action": "timeout", "duration": 300},
+        {"threshold": 5, "action": "kick", "duration": 0},
+    ]
+
+
+def default_settings():
+    return {
+        "bad_words": [],
+        "anti_invite": True,
+        "anti_links": False,
+        "anti_caps": False,
+        "max_mentions": 5,
+        "max_emojis": 5,
+        "exempt_roles": [],
+        "log_channel_id": None,
+        "anti_spam": False,
+        "spam_count": 5,
+        "spam_seconds": 5,
+        "min_account_age": 0,
+        "anti_raid": False,
+        "raid_count": 10,
+        "raid_seconds": 10,
+        "anti_repeat": False,
+        "repeat_count": 3,
+        "punishments": default_punishments(),
+        "exempt_channels": [],
+        "raid_action": "none",
+        "raid_max_age": 0,
+        "raid_default_avatar": False,
+        "violation_half_life": 168,
+        "raid_adaptive": False,
+        "raid_sensitivity": 4,
+        "shadow_mode": False,
+        "anti_zalgo": False,
+        "worker_timeout": 3,
+        "worker_fail_closed": False,
+        "anti_image_hash": False,
+        "image_hash_distance": 6,
+    }
+
+
+def load_settings(db, guild_id):
+    """Read a guild's settings from the database and compile them for the message path."""
+    result = db.fetchone("SELECT * FROM automod_settings WHERE guild_id = ?", (guild_id,))
+
+    if result:
+        def _get(idx, default):
+            return result[idx] if len(result) > idx and result[idx] is not None else default
+
+        settings = {
+            "bad_words": result[1].split(",") if result[1] else [],
+            "anti_invite": bool(result[2]),
+            "anti_links": bool(result[3]),
+            "anti_caps": bool(result[4]),
+            "max_mentions": result[5],
+            "max_emojis": result[6],
+            "exempt_roles": [int(r) for r in result[7].split(",") if r] if result[7] else [],
+            "log_channel_id": _get(8, None),
+            "anti_spam": bool(_get(9, 0)),
+            "spam_count": _get(10, 5),
+            "spam_seconds": _get(11, 5),
+            "min_account_age": _get(12, 0),
+            "anti_raid": bool(_get(13, 0)),
+            "raid_count": _get(14, 10),
+            "raid_seconds": _get(15, 10),
+            "anti_repeat": bool(_get(16, 0)),
+            "repeat_count": _get(17, 3),
+            "punishments": json.loads(_get(18, None) or "null") or default_punishments(),
+            "exempt_channels": [int(c) for c in _get(19, "").split(",") if c],
+            "raid_action": _get(20, "none"),
+            "raid_max_age": _get(21, 0),
+            "raid_default_avatar": bool(_get(22, 0)),
+            "violation_half_life": _get(23, 168),
+            "raid_adaptive": bool(_get(24, 0)),
+            "raid_sensitivity": _get(25, 4),
+            "shadow_mode": bool(_get(26, 0)),
+            "anti_zalgo": bool(_get(27, 0)),
+            "worker_timeout": _get(28, 3),
+            "worker_fail_closed": bool(_get(29, 0)),
+            "anti_image_hash": bool(_get(30, 0)),
+            "image_hash_distance": _get(31, 6),
+        }
+    else:
+        settings = default_settings()
+
+    compile_settings(settings)
+    return settings
+
+
+def pick_punishment(settings, count):
+    """Pick the highest punishment whose threshold has been reached."""
+    action_entry = {"action": "delete", "duration": 0}
+    for p in sorted(settings.get("punishments", default_punishments()), key=lambda x: x["threshold"]):
+        if count >= p["threshold"]:
+            action_entry = p
+    return action_entry
+
+
+def compile_settings(settings):
+    """Derive the lookup structures used on the message path from the stored settings."""
+    settings["exempt_role_set"] = frozenset(settings["exempt_roles"])
+    settings["exempt_channel_set"] = frozenset(settings.get("exempt_channels", []))
+
+    # One alternation over the normalized word list instead of a regex per word.
+    # Large lists are too slow to scan on the event loop and go to the worker pool instead.
+    words = {normalize_text(w).text for w in settings["bad_words"]}
+    words.discard("")
+    if len(words) > KEYWORD_OFFLOAD_THRESHOLD:
+        settings["bad_word_regex"] = None
+        settings["bad_word_offload"] = tuple(words)
+        settings["bad_word_revision"] = next(_keyword_revisions)
+    else:
+        settings["bad_word_regex"] = compile_keywords(words)
+        settings["bad_word_offload"] = None
+
+
+# -----------------------------------------------------------------------------
+# Message rules
+# -----------------------------------------------------------------------------
+
+class HeavyCheck(NamedTuple):
+    """A check to run in the worker pool. A truthy fn(*args) result means the rule was broken."""
+    rule: str
+    reason: str
+    fn: object
+    args: tuple
+    # Resubmitted with these when the worker raises KeyError (e.g. its cached keyword set is stale)
+    retry_args: tuple | None = None
+
+
+class RuleEngine:
+    """The per-message AutoMod rules, kept free of Discord objects so they can run offline."""
+
+    def __init__(self):
+        # Spam tracking: {guild_id: {user_id: deque of timestamps}}
+        self.spam_tracker = defaultdict(lambda: defaultdict(deque))
+
+        # Repeat message tracking: {guild_id: {user_id: {"msg": str, "count": int}}}
+        self.repeat_tracker = defaultdict(lambda: defaultdict(dict))
+
+    def check(self, settings, domains, guild_id, author_id, content, mention_count, now):
+        """Return (rule, reason) for the first rule the message breaks, or None."""
+        normalized = normalize_text(content)
+
+        # 1. Anti-Spam — rate limit messages per user
+        if settings.get("anti_spam"):
+            spam_count = settings.get("spam_count", 5)
+            spam_window = settings.get("spam_seconds", 5)
+
+            dq = self.spam_tracker[guild_id][author_id]
+            dq.append(now)
+            while dq and dq[0] < now - spam_window:
+                dq.popleft()
+
+            if len(dq) >= spam_count:
+                dq.clear()
+                return "anti_spam", "Sending messages too fast"
+
+        # 2. Repeat Message Detection
+        if settings.get("anti_repeat"):
+            repeat_limit = settings.get("repeat_count", 3)
+            stripped = normalized.text
+
+            tracker = self.repeat_tracker[guild_id][author_id]
+            if tracker.get("msg") == stripped:
+                tracker["count"] = tracker.get("count", 1) + 1
+                if tracker["count"] >= repeat_limit:
+                    tracker["count"] = 0
+                    return "anti_repeat", "Repeated the same message too many times"
+            else:
+                tracker["msg"] = stripped
+                tracker["count"] = 1
+
+        # 3. Anti-Invite
+        if settings["anti_invite"]:
+            if INVITE_REGEX.search(normalized.compact):
+                return "anti_invite", "Posting invite links is not allowed"
+
+        # 4. Links — most specific allow/deny domain entry wins, then the blanket Anti-Link toggle
+        if (settings["anti_links"] or domains) and "://" in normalized.text:
+            hosts = extract_hosts(normalized.text)
+            for host in hosts:
+                verdict = domains.match(host)
+                if verdict == "deny":
+                    return "domain_deny", f"Links to `{host}` are not allowed"
+                if verdict is None and settings["anti_links"]:
+                    return "anti_links", "Posting links is not allowed"
+            # A link whose host can't be parsed can't be allow-listed either
+            if not hosts and settings["anti_links"] and URL_HOST_REGEX.search(normalized.text):
+                return "anti_links", "Posting links is not allowed"
+
+        # 5. Bad Words — word boundary matching to avoid false positives
+        if settings["bad_word_regex"] and settings["bad_word_regex"].search(normalized.text):
+            return "bad_words", "Message contained a banned word"
+
+        # 6. Anti-Caps — checks letter ratio, not total character ratio
+        if settings["anti_caps"] and len(content) > 10:
+            letters = [c for c in content if c.isalpha()]
+            if letters and sum(1 for c in letters if c.isupper()) / len(letters) > 0.7:
+                return "anti_caps", "Excessive use of capital letters"
+
+        # 7. Mass Mentions
+        if settings["max_mentions"] > 0:
+            if mention_count > settings["max_mentions"]:
+                return "max_mentions", f"Too many mentions (max {settings['max_mentions']})"
+
+        # 8. Emoji Spam
+        if settings["max_emojis"] > 0:
+            custom = len(re.findall(r"<a?:[^:]+:[0-9]+>", content))
+            unicode = len(re.findall(r"[\U0001f300-\U0001faff]", content))
+            if custom + unicode > settings["max_emojis"]:
+                return "max_emojis", f"Too many emojis (max {settings['max_emojis']})"
+
+        # 9. Zalgo — short messages inline, long ones in heavy_checks()
+        if settings.get("anti_zalgo") and len(content) <= ZALGO_INLINE_LENGTH and not content.isascii():
+            if zalgo_marks(content):
+                return "anti_zalgo", "Message contained zalgo text"
+
+        return None
+
+    def heavy_checks(self, settings, guild_id, content):
+        """Return the HeavyChecks a message needs once it has passed every inline rule."""
+        checks = []
+        if settings.get("bad_word_offload"):
+            key, revision = guild_id, settings["bad_word_revision"]
+            text = normalize_text(content).text
+            checks.append(HeavyCheck(
+                "bad_words", "Message contained a banned word", scan_keywords,
+                (key, revision, text), (key, revision, text, settings["bad_word_offload"]),
+            ))
+        if settings.get("anti_zalgo") and len(content) > ZALGO_INLINE_LENGTH and not content.isascii():
+            checks.append(HeavyCheck("anti_zalgo", "Message contained zalgo text", zalgo_marks, (content,)))
+        return checks
 
 
 class AutoMod(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.logger = logging.getLogger("AutoMod")
         self.settings_cache = {}
+        self.engine = RuleEngine()
 
-        # Spam tracking: {guild_id: {user_id: deque of timestamps}}
-        self.spam_tracker = defaultdict(lambda: defaultdict(deque))
+        # Shadow-mode violation scores, never persisted: {(guild_id, user_id): (score, updated_at)}
+        self.shadow_violations = {}
+        # Last shadow raid alert per guild, so a raid is reported once: {guild_id: timestamp}
+        self.shadow_raid_alerts = {}
 
-        # Repeat message tracking: {guild_id: {user_id: {"msg": str, "count": int}}}
-        self.repeat_tracker = defaultdict(lambda: defaultdict(dict))
-
-        # Violation count tracking: {guild_id: {user_id: int}}
-        self.violation_counts = defaultdict(lambda: defaultdict(int))
+        # Decaying violation ledger, loaded lazily per guild: {guild_id: {user_id: [score, updated_at]}}
+        self.violations = {}
+        # (guild_id, user_id) pairs whose score has changed since the last flush
+        self.violations_dirty = set()
 
-        # Raid tracking: {guild_id: deque of join timestamps}
+        # Raid join ledger: {guild_id: deque of (join timestamp, member)}
         self.raid_tracker = defaultdict(deque)
 
         # Active raid lockdown state: {guild_id: bool}
         self.raid_lockdown = {}
 
+        # Adaptive join-rate model per guild: {guild_id: JoinRateDetector}
+        self.raid_detectors = {}
+
+        # Recorded join timeline: {guild_id: deque of (join timestamp, account age in days)}
+        self.join_history = defaultdict(lambda: deque(maxlen=JOIN_HISTORY_SIZE))
+
+        # Raiders waiting for a batched kick/ban: {guild_id: {user_id: member}}
+        self.raid_queue = defaultdict(dict)
+        self.raid_flush_tasks = {}
+
+        # Buffered log entries: {guild_id: {(title, user_id, reason): {"embed", "count", "last"}}}
+        self.log_buffer = defaultdict(dict)
+        # Early flushes for guilds whose buffer filled up: {guild_id: Task}
+        self.log_flush_tasks = {}
+
+        # Log delivery webhooks: {channel_id: discord.Webhook}, and channels without one: {channel_id: retry_at}
+        self.log_webhooks = {}
+        self.log_webhook_misses = {}
+
+        # Per-member exemption verdicts: {guild_id: {user_id: bool}}
+        self.exempt_cache = defaultdict(dict)
+
+        # Domain allow/deny lists, loaded lazily per guild: {guild_id: DomainTrie}
+        self.domain_tries = {}
+        # Tries being built off the event loop: {guild_id: Task}
+        self.domain_trie_tasks = {}
+
+        # Image blocklists, loaded lazily per guild: {guild_id: BKTree}
+        self.image_trees = {}
+        # dHash of recently seen attachments, keyed by URL without its expiring query string
+        self.image_hash_cache = OrderedDict()
+
+        # Off-loop pool for heavy checks, with a per-guild share of its capacity
+        self.workers = WorkerPool(
+            "AutoModWorkers", WORKER_PROCESSES, WORKER_MAX_PENDING, WORKER_GUILD_QUOTA
+        )
+        # Heavy checks in flight, referenced so they aren't collected mid-run
+        self.heavy_check_tasks = set()
+
+        self.log_flush_loop.start()
+        self.violation_flush_loop.start()
+        self.violation_sweep_loop.start()
+
+    async def cog_unload(self):
+        self.log_flush_loop.cancel()
+        for task in self.log_flush_tasks.values():
+            task.cancel()
+        self.violation_flush_loop.cancel()
+        self.violation_sweep_loop.cancel()
+        for task in self.domain_trie_tasks.values():
+            task.cancel()
+        for task in self.heavy_check_tasks:
+            task.cancel()
+        self.workers.shutdown()
+        self.flush_violations()
+        for guild_id in list(self.log_buffer):
+            await self._flush_logs(guild_id)
+
     # -------------------------------------------------------------------------
     # Settings
     # -------------------------------------------------------------------------
 
-    def _default_punishments(self):
-        return [
-            {"threshold": 1, "action": "delete", "duration": 0},
-            {"threshold": 3, "action": "timeout", "duration": 300},
-            {"threshold": 5, "action": "kick", "duration": 0},
-        ]
-
-    def _default_settings(self):
-        return {
-            "bad_words": [],
-            "anti_invite": True,
-            "anti_links": False,
-            "anti_caps": False,
-            "max_mentions": 5,
-            "max_emojis": 5,
-            "exempt_roles": [],
-            "log_channel_id": None,
-            "anti_spam": False,
-            "spam_count": 5,
-            "spam_seconds": 5,
-            "min_account_age": 0,
-            "anti_raid": False,
-            "raid_count": 10,
-            "raid_seconds": 10,
-            "anti_repeat": False,
-            "repeat_count": 3,
-            "punishments": self._default_punishments(),
-            "exempt_channels": [],
-        }
-
     def get_settings(self, guild_id):
         if guild_id in self.settings_cache:
             return self.settings_cache[guild_id]
 
-        result = self.bot.db.fetchone(
-            "SELECT * FROM automod_settings WHERE guild_id = ?", (guild_id,)
-        )
-
-        if result:
-            def _get(idx, default):
-                return result[idx] if len(result) > idx and result[idx] is not None else default
-
-            settings = {
-                "bad_words": result[1].split(",") if result[1] else [],
-                "anti_invite": bool(result[2]),
-                "anti_links": bool(result[3]),
-                "anti_caps": bool(result[4]),
-                "max_mentions": result[5],
-                "max_emojis": result[6],
-                "exempt_roles": [int(r) for r in result[7].split(",") if r] if result[7] else [],
-                "log_channel_id": _get(8, None),
-                "anti_spam": bool(_get(9, 0)),
-                "spam_count": _get(10, 5),
-                "spam_seconds": _get(11, 5),
-                "min_account_age": _get(12, 0),
-                "anti_raid": bool(_get(13, 0)),
-                "raid_count": _get(14, 10),
-                "raid_seconds": _get(15, 10),
-                "anti_repeat": bool(_get(16, 0)),
-                "repeat_count": _get(17, 3),
-                "punishments": json.loads(_get(18, None) or "null") or self._default_punishments(),
-                "exempt_channels": [int(c) for c in _get(19, "").split(",") if c],
-            }
-        else:
-            settings = self._default_settings()
-
+        settings = load_settings(self.bot.db, guild_id)
         self.settings_cache[guild_id] = settings
         return settings
 
@@ -108,8 +418,11 @@ class AutoMod(commands.Cog):
                 max_mentions, max_emojis, exempt_roles,
                 log_channel_id, anti_spam, spam_count, spam_seconds,
                 min_account_age, anti_raid, raid_count, raid_seconds,
-                anti_repeat, repeat_count, punishments, exempt_channels)
-               VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)''',
+                anti_repeat, repeat_count, punishments, exempt_channels,
+                raid_action, raid_max_age, raid_default_avatar, violation_half_life,
+                raid_adaptive, raid_sensitivity, shadow_mode, anti_zalgo,
+                worker_timeout, worker_fail_closed, anti_image_hash, image_hash_distance)
+               VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)''',
             (
                 guild_id,
                 ",".join(settings["bad_words"]),
@@ -129,32 +442,237 @@ class AutoMod(commands.Cog):
                 settings.get("raid_seconds", 10),
                 int(settings.get("anti_repeat", False)),
                 settings.get("repeat_count", 3),
-                json.dumps(settings.get("punishments", self._default_punishments())),
+                json.dumps(settings.get("punishments", default_punishments())),
                 ",".join(map(str, settings.get("exempt_channels", []))),
+                settings.get("raid_action", "none"),
+                settings.get("raid_max_age", 0),
+                int(settings.get("raid_default_avatar", False)),
+                settings.get("violation_half_life", 168),
+                int(settings.get("raid_adaptive", False)),
+                settings.get("raid_sensitivity", 4),
+                int(settings.get("shadow_mode", False)),
+                int(settings.get("anti_zalgo", False)),
+                settings.get("worker_timeout", 3),
+                int(settings.get("worker_fail_closed", False)),
+                int(settings.get("anti_image_hash", False)),
+                settings.get("image_hash_distance", 6),
             ),
         )
+        compile_settings(settings)
         self.settings_cache[guild_id] = settings
+        self.exempt_cache.pop(guild_id, None)
+
+    async def get_domain_trie(self, guild_id):
+        trie = self.domain_tries.get(guild_id)
+        if trie is not None:
+            return trie
+        # Messages arriving while the trie is built share one build
+        task = self.domain_trie_tasks.get(guild_id)
+        if task is None:
+            task = asyncio.create_task(self._load_domain_trie(guild_id))
+            self.domain_trie_tasks[guild_id] = task
+            task.add_done_callback(
+                lambda t: self.domain_trie_tasks.pop(guild_id) if self.domain_trie_tasks.get(guild_id) is t else None
+            )
+        return await asyncio.shield(task)
+
+    async def _load_domain_trie(self, guild_id):
+        rows = self.bot.db.fetchall(
+            "SELECT domain, list_type FROM automod_domains WHERE guild_id = ?", (guild_id,)
+        )
+        # A large imported blocklist takes long enough to build that it would stall the event loop
+        trie = await asyncio.to_thread(DomainTrie, rows)
+        # Skip caching if the list was cleared mid-build
+        if self.domain_trie_tasks.get(guild_id) is asyncio.current_task():
+            self.domain_tries[guild_id] = trie
+        return trie
+
+    def get_image_tree(self, guild_id):
+        tree = self.image_trees.get(guild_id)
+        if tree is None:
+            rows = self.bot.db.fetchall(
+                "SELECT hash, label FROM automod_image_hashes WHERE guild_id = ?", (guild_id,)
+            )
+            tree = BKTree((parse_hash(h), label) for h, label in rows if parse_hash(h) is not None)
+            self.image_trees[guild_id] = tree
+        return tree
+
+    # -------------------------------------------------------------------------
+    # Violation ledger
+    # -------------------------------------------------------------------------
+
+    def _violation_ledger(self, guild_id):
+        ledger = self.violations.get(guild_id)
+        if ledger is None:
+            rows = self.bot.db.fetchall(
+                "SELECT user_id, score, updated_at FROM automod_violations WHERE guild_id = ?", (guild_id,)
+            )
+            settings, now = self.get_settings(guild_id), time.time()
+            ledger, stale = {}, []
+            for user_id, score, updated_at in rows:
+                if self._decayed(score, updated_at, settings, now):
+                    stale.append((guild_id, user_id))
+                else:
+                    ledger[user_id] = [score, updated_at]
+            if stale:
+                self.bot.db.executemany("DELETE FROM automod_violations WHERE guild_id = ? AND user_id = ?", stale)
+            self.violations[guild_id] = ledger
+        return ledger
+
+    def _decay(self, score, updated_at, settings, now):
+        """Exponentially decay a score by the guild's half-life (0 = never decays)."""
+        half_life_hours = settings.get("violation_half_life", 168)
+        if not half_life_hours or score <= 0:
+            return score
+        return score * 0.5 ** ((now - updated_at) / (half_life_hours * 3600))
+
+    def _decayed(self, score, updated_at, settings, now):
+        return self._decay(score, updated_at, settings, now) < VIOLATION_PRUNE_SCORE
+
+    def get_violation_score(self, guild_id, user_id, settings):
+        entry = self._violation_ledger(guild_id).get(user_id)
+        if not entry:
+            return 0.0
+        return self._decay(entry[0], entry[1], settings, time.time())
+
+    def add_violation(self, guild_id, user_id, settings):
+        """Record a violation and return the user's new decayed score."""
+        now = time.time()
+        score = self.get_violation_score(guild_id, user_id, settings) + 1
+        self._violation_ledger(guild_id)[user_id] = [score, now]
+        self.violations_dirty.add((guild_id, user_id))
+        return score
+
+    def reset_violation(self, guild_id, user_id):
+        self._violation_ledger(guild_id)[user_id] = [0.0, time.time()]
+        self.violations_dirty.add((guild_id, user_id))
+
+    @staticmethod
+    def violation_count(score):
+        """A violation keeps counting toward the punishment ladder until it has decayed by half."""
+        return int(score + 0.5)
+
+    def flush_violations(self) -> bool:
+        """Write all changed scores back in one transaction and drop fully decayed entries.
+
+        On failure the changes stay dirty for the next flush.
+        """
+        if not self.violations_dirty:
+            return True
+        dirty, self.violations_dirty = self.violations_dirty, set()
+
+        upserts, deletes, pruned = [], [], {}
+        try:
+            for guild_id, user_id in dirty:
+                ledger = self.violations.get(guild_id, {})
+                entry = ledger.get(user_id)
+                if entry is None:
+                    continue
+                if self._decayed(entry[0], entry[1], self.get_settings(guild_id), time.time()):
+                    pruned[(guild_id, user_id)] = ledger.pop(user_id)
+                    deletes.append((guild_id, user_id))
+                else:
+                    upserts.append((guild_id, user_id, entry[0], entry[1]))
+
+            if upserts:
+                self.bot.db.executemany(
+                    "INSERT OR REPLACE INTO automod_violations (guild_id, user_id, score, updated_at) VALUES (?, ?, ?, ?)",
+                    upserts,
+                    commit=not deletes,
+                )
+            if deletes:
+                self.bot.db.executemany(
+                    "DELETE FROM automod_violations WHERE guild_id = ? AND user_id = ?", deletes
+                )
+        except Exception as e:
+            # Pruned entries go back in the ledger so the next flush deletes their rows
+            for (guild_id, user_id), entry in pruned.items():
+                self.violations[guild_id][user_id] = entry
+            self.violations_dirty |= dirty
+            self.logger.error(f"Failed to write {len(dirty)} violation scores, will retry: {e!r}")
+            return False
+        return True
+
+    def sweep_violations(self):
+        """Drop every fully decayed entry, including those of members who never offend again."""
+        now = time.time()
+        deletes = []
+        for guild_id, ledger in self.violations.items():
+            settings = self.get_settings(guild_id)
+            for user_id, (score, updated_at) in list(ledger.items()):
+                # Dirty entries are handled (and written) by the next flush
+                if (guild_id, user_id) not in self.violations_dirty and self._decayed(score, updated_at, settings, now):
+                    del ledger[user_id]
+                    deletes.append((guild_id, user_id))
+
+        # Guilds whose ledger isn't loaded only exist in the table
+        unloaded_settings = {}
+        for guild_id, user_id, score, updated_at in self.bot.db.fetchall(
+            "SELECT guild_id, user_id, score, updated_at FROM automod_violations"
+        ):
+            if guild_id in self.violations:
+                continue
+            settings = unloaded_settings.get(guild_id)
+            if settings is None:
+                settings = unloaded_settings[guild_id] = load_settings(self.bot.db, guild_id)
+            if self._decayed(score, updated_at, settings, now):
+                deletes.append((guild_id, user_id))
+
+        if deletes:
+            self.bot.db.executemany("DELETE FROM automod_violations WHERE guild_id = ? AND user_id = ?", deletes)
+        return len(deletes)
+
+    @tasks.loop(seconds=VIOLATION_FLUSH_SECONDS)
+    async def violation_flush_loop(self):
+        self.flush_violations()
+
+    @violation_flush_loop.before_loop
+    async def before_violation_flush_loop(self):
+        await self.bot.wait_until_ready()
+
+    @tasks.loop(hours=VIOLATION_SWEEP_HOURS)
+    async def violation_sweep_loop(self):
+        try:
+            self.sweep_violations()
+        except Exception:
+            self.logger.exception("Failed to sweep decayed violations")
+
+    @violation_sweep_loop.before_loop
+    async def before_violation_sweep_loop(self):
+        await self.bot.wait_until_ready()
 
     # -------------------------------------------------------------------------
     # Helpers
     # -------------------------------------------------------------------------
 
     async def is_exempt(self, message, settings):
-        if message.author.guild_permissions.administrator:
+        if message.channel.id in settings["exempt_channel_set"]:
             return True
-        for role in message.author.roles:
-            if role.id in settings["exempt_roles"]:
-                return True
-        if message.channel.id in settings.get("exempt_channels", []):
-            return True
-        return False
+
+        verdicts = self.exempt_cache[message.guild.id]
+        verdict = verdicts.get(message.author.id)
+        if verdict is None:
+            member = message.author
+            exempt_roles = settings["exempt_role_set"]
+            verdict = member.guild_permissions.administrator or any(
+                role.id in exempt_roles for role in member.roles
+            )
+            if len(verdicts) >= EXEMPT_CACHE_SIZE:
+                verdicts.clear()
+            verdicts[member.id] = verdict
+        return verdict
 
     async def send_log(self, guild, settings, title, user, reason, message=None):
-        log_channel_id = settings.get("log_channel_id")
-        if not log_channel_id:
+        """Buffer a log entry. Identical violations by the same user are folded into one embed."""
+        if not settings.get("log_channel_id"):
             return
-        channel = guild.get_channel(log_channel_id)
-        if not channel:
+
+        buffer = self.log_buffer[guild.id]
+        key = (title, user.id, reason)
+        entry = buffer.get(key)
+        if entry:
+            entry["count"] += 1
+            entry["last"] = discord.utils.utcnow()
             return
 
         embed = discord.Embed(
@@ -171,28 +689,111 @@ class AutoMod(commands.Cog):
             embed.add_field(name="Channel", value=message.channel.mention, inline=True)
         embed.set_thumbnail(url=user.display_avatar.url)
 
+        buffer[key] = {"embed": embed, "count": 1, "last": embed.timestamp}
+        if len(buffer) >= LOG_BATCH_SIZE and guild.id not in self.log_flush_tasks:
+            task = asyncio.create_task(self._flush_logs(guild.id))
+            self.log_flush_tasks[guild.id] = task
+            task.add_done_callback(lambda _: self.log_flush_tasks.pop(guild.id, None))
+
+    async def _flush_logs(self, guild_id):
+        """Deliver every buffered log entry for a guild, up to 10 embeds per message."""
+        buffer = self.log_buffer.pop(guild_id, None)
+        if not buffer:
+            return
+        guild = self.bot.get_guild(guild_id)
+        if not guild:
+            return
+        channel = guild.get_channel(self.get_settings(guild_id).get("log_channel_id") or 0)
+        if not channel:
+            return
+
+        embeds = []
+        for entry in buffer.values():
+            embed = entry["embed"]
+            if entry["count"] > 1:
+                embed.title = f"{embed.title} (×{entry['count']})"
+                embed.add_field(
+                    name="Repeated",
+                    value=f"{entry['count']} times, last {discord.utils.format_dt(entry['last'], 'R')}",
+                    inline=False,
+                )
+            embeds.append(embed)
+
+        for i in range(0, len(embeds), LOG_BATCH_SIZE):
+            await self._deliver_log(channel, embeds[i:i + LOG_BATCH_SIZE])
+
+    async def _get_log_webhook(self, channel):
+        if channel.id in self.log_webhooks:
+            return self.log_webhooks[channel.id]
+        if self.log_webhook_misses.get(channel.id, 0) > time.time():
+            return None
+
+        webhook = None
         try:
-            await channel.send(embed=embed)
-        except discord.Forbidden:
-            pass
+            for existing in await channel.webhooks():
+                if existing.name == LOG_WEBHOOK_NAME and existing.token:
+                    webhook = existing
+                    break
+            if webhook is None:
+                webhook = await channel.create_webhook(name=LOG_WEBHOOK_NAME, reason="AutoMod log delivery")
+        except (discord.Forbidden, discord.HTTPException):
+            webhook = None
+
+        if webhook is None:
+            self.log_webhook_misses[channel.id] = time.time() + LOG_WEBHOOK_RETRY_SECONDS
+        else:
+            self.log_webhook_misses.pop(channel.id, None)
+            self.log_webhooks[channel.id] = webhook
+        return webhook
+
+    async def _deliver_log(self, channel, embeds):
+        """Send log embeds through the channel's webhook, falling back to a normal bot message."""
+        webhook = await self._get_log_webhook(channel)
+        if webhook:
+            try:
+                await webhook.send(
+                    embeds=embeds,
+                    username=self.bot.user.name,
+                    avatar_url=self.bot.user.display_avatar.url,
+                )
+                return
+            except discord.NotFound:
+                # Webhook was deleted — recreate it on the next delivery
+                self.log_webhooks.pop(channel.id, None)
+            except (discord.Forbidden, discord.HTTPException):
+                pass
+
+        try:
+            await channel.send(embeds=embeds)
+        except discord.HTTPException as e:
+            self.logger.warning(f"Couldn't deliver AutoMod logs to channel {channel.id}: {e}")
+
+    @tasks.loop(seconds=LOG_FLUSH_SECONDS)
+    async def log_flush_loop(self):
+        for guild_id in list(self.log_buffer):
+            # One guild's failure mustn't stop the loop (and with it every guild's logging)
+            try:
+                await self._flush_logs(guild_id)
+            except Exception as e:
+                self.logger.error(f"Failed to flush AutoMod logs for guild {guild_id}: {e!r}")
+
+    @log_flush_loop.before_loop
+    async def before_log_flush_loop(self):
+        await self.bot.wait_until_ready()
 
     async def punish(self, message, settings, reason):
-        """Increment violation count, apply the correct escalating punishment, and log it."""
+        """Record a violation, apply the correct escalating punishment, and log it."""
         guild_id = message.guild.id
         user_id = message.author.id
         member = message.author
 
-        self.violation_counts[guild_id][user_id] += 1
-        count = self.violation_counts[guild_id][user_id]
-
-        punishments = settings.get("punishments", self._default_punishments())
+        if settings.get("shadow_mode"):
+            return await self.shadow_punish(message, settings, reason)
 
-        # Pick the highest punishment whose threshold has been reached
-        action_entry = {"action": "delete", "duration": 0}
-        for p in sorted(punishments, key=lambda x: x["threshold"]):
-            if count >= p["threshold"]:
-                action_entry = p
+        score = self.add_violation(guild_id, user_id, settings)
+        count = max(1, self.violation_count(score))
 
+        action_entry = pick_punishment(settings, count)
         action = action_entry["action"]
         duration = action_entry.get("duration", 0)
 
@@ -240,6 +841,22 @@ class AutoMod(commands.Cog):
 
         await self.send_log(message.guild, settings, action.title(), member, reason, message)
 
+    async def shadow_punish(self, message, settings, reason):
+        """Log the punishment that would have been applied, without touching the message or member."""
+        key = (message.guild.id, message.author.id)
+        now = time.time()
+        score, updated_at = self.shadow_violations.get(key, (0.0, now))
+        score = self._decay(score, updated_at, settings, now) + 1
+        self.shadow_violations[key] = (score, now)
+
+        action_entry = pick_punishment(settings, max(1, self.violation_count(score)))
+        action = action_entry["action"]
+        if action == "timeout" and action_entry.get("duration"):
+            action = f"timeout {action_entry['duration'] // 60}m"
+        await self.send_log(
+            message.guild, settings, f"Shadow: {action.title()}", message.author, reason, message
+        )
+
     # -------------------------------------------------------------------------
     # Event: on_message
     # -------------------------------------------------------------------------
@@ -254,87 +871,123 @@ class AutoMod(commands.Cog):
         if await self.is_exempt(message, settings):
             return
 
-        now = time.time()
-        content = message.content.lower()
-
-        # 1. Anti-Spam — rate limit messages per user
-        if settings.get("anti_spam"):
-            spam_count = settings.get("spam_count", 5)
-            spam_window = settings.get("spam_seconds", 5)
-
-            dq = self.spam_tracker[message.guild.id][message.author.id]
-            dq.append(now)
-            while dq and dq[0] < now - spam_window:
-                dq.popleft()
-
-            if len(dq) >= spam_count:
-                dq.clear()
-                await self.punish(message, settings, "Sending messages too fast")
-                return
-
-        # 2. Repeat Message Detection
-        if settings.get("anti_repeat"):
-            repeat_limit = settings.get("repeat_count", 3)
-            uid = message.author.id
-            gid = message.guild.id
-            stripped = message.content.strip().lower()
-
-            tracker = self.repeat_tracker[gid][uid]
-            if tracker.get("msg") == stripped:
-                tracker["count"] = tracker.get("count", 1) + 1
-                if tracker["count"] >= repeat_limit:
-                    tracker["count"] = 0
-                    await self.punish(message, settings, "Repeated the same message too many times")
-                    return
-            else:
-                tracker["msg"] = stripped
-                tracker["count"] = 1
+        verdict = self.engine.check(
+            settings,
+            await self.get_domain_trie(message.guild.id),
+            message.guild.id,
+            message.author.id,
+            message.content,
+            len(message.mentions),
+            time.time(),
+        )
+        if verdict:
+            await self.punish(message, settings, verdict[1])
+            return
 
-        # 3. Anti-Invite
-        if settings["anti_invite"]:
-            if re.search(r"discord\.gg/|discord\.com/invite/", content):
-                await self.punish(message, settings, "Posting invite links is not allowed")
-                return
+        checks = self.engine.heavy_checks(settings, message.guild.id, message.content)
+        images = []
+        if settings.get("anti_image_hash") and message.attachments and self.get_image_tree(message.guild.id):
+            images = [
+                a for a in message.attachments
+                if a.content_type and a.content_type.startswith("image/") and a.size <= MAX_HASH_BYTES
+            ]
+        if checks or images:
+            task = asyncio.create_task(self._run_heavy_checks(message, settings, checks, images))
+            self.heavy_check_tasks.add(task)
+            task.add_done_callback(self.heavy_check_tasks.discard)
+
+    async def _run_heavy_check(self, guild_id, settings, check):
+        """Run one HeavyCheck in the pool and return its reason if the rule was broken."""
+        timeout = settings.get("worker_timeout", 3) or None
+        try:
+            result = await self.workers.run(guild_id, check.fn, *check.args, timeout=timeout)
+        except KeyError:
+            if check.retry_args is None:
+                raise
+            result = await self.workers.run(guild_id, check.fn, *check.retry_args, timeout=timeout)
+        return check.reason if result else None
+
+    async def hash_attachment(self, guild_id, attachment, timeout=None):
+        """dHash an attachment in the pool, reusing the hash if the same URL was seen before."""
+        key = attachment.url.split("?", 1)[0]
+        value = self.image_hash_cache.get(key)
+        if value is not None:
+            self.image_hash_cache.move_to_end(key)
+            return value
+
+        data = await attachment.read()
+        value = await self.workers.run(guild_id, dhash, data, timeout=timeout)
+        self.image_hash_cache[key] = value
+        if len(self.image_hash_cache) > IMAGE_HASH_CACHE_SIZE:
+            self.image_hash_cache.popitem(last=False)
+        return value
+
+    async def _check_image(self, guild_id, settings, attachment):
+        """Return a reason if the attachment is within the guild's distance of a blocked image."""
+        value = await self.hash_attachment(guild_id, attachment, settings.get("worker_timeout", 3) or None)
+        match = self.get_image_tree(guild_id).search(value, settings.get("image_hash_distance", 6))
+        if match is None:
+            return None
+        distance, _, label = match
+        return f"Posted a blocked image{f' ({label})' if label else ''} [distance {distance}]"
+
+    async def _run_heavy_checks(self, message, settings, checks, images=()):
+        """Run a message's heavy checks off the event loop and feed any hit back into punish()."""
+        guild_id = message.guild.id
+        jobs = [(c.rule, self._run_heavy_check(guild_id, settings, c)) for c in checks]
+        jobs += [("image_hash", self._check_image(guild_id, settings, a)) for a in images]
+        results = await asyncio.gather(*(job for _, job in jobs), return_exceptions=True)
+
+        failure = None
+        for (rule, _), result in zip(jobs, results):
+            if isinstance(result, BaseException):
+                if isinstance(result, PoolBusy):
+                    failure = failure or "AutoMod is overloaded"
+                elif isinstance(result, asyncio.TimeoutError):
+                    failure = failure or "Content check timed out"
+                else:
+                    self.workers.logger.error(f"Heavy check {rule} failed: {result!r}")
+                    failure = failure or "Content check failed"
+            elif result:
+                return await self.punish(message, settings, result)
+
+        # Fail closed removes what couldn't be checked, but it's not the member's violation
+        if failure and settings.get("worker_fail_closed"):
+            reason = f"{failure}; message held for safety"
+            if not settings.get("shadow_mode"):
+                try:
+                    await message.delete()
+                except (discord.Forbidden, discord.NotFound):
+                    pass
+            title = "Shadow: Held" if settings.get("shadow_mode") else "Held"
+            await self.send_log(message.guild, settings, title, message.author, reason, message)
 
-        # 4. Anti-Link
-        if settings["anti_links"]:
-            if re.search(r"https?://[^\s]+", content):
-                await self.punish(message, settings, "Posting links is not allowed")
-                return
+    # -------------------------------------------------------------------------
+    # Events: exemption cache invalidation
+    # -------------------------------------------------------------------------
 
-        # 5. Bad Words — word boundary matching to avoid false positives
-        if settings["bad_words"]:
-            for word in settings["bad_words"]:
-                if re.search(r"\b" + re.escape(word) + r"\b", content):
-                    await self.punish(message, settings, "Message contained a banned word")
-                    return
+    @commands.Cog.listener()
+    async def on_member_update(self, before, after):
+        if before.roles != after.roles:
+            self.exempt_cache[after.guild.id].pop(after.id, None)
 
-        # 6. Anti-Caps — checks letter ratio, not total character ratio
-        if settings["anti_caps"] and len(message.content) > 10:
-            letters = [c for c in message.content if c.isalpha()]
-            if letters and sum(1 for c in letters if c.isupper()) / len(letters) > 0.7:
-                await self.punish(message, settings, "Excessive use of capital letters")
-                return
+    @commands.Cog.listener()
+    async def on_member_remove(self, member):
+        self.exempt_cache[member.guild.id].pop(member.id, None)
 
-        # 7. Mass Mentions
-        if settings["max_mentions"] > 0:
-            if len(message.mentions) > settings["max_mentions"]:
-                await self.punish(
-                    message, settings,
-                    f"Too many mentions (max {settings['max_mentions']})"
-                )
-                return
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before, after):
+        # A permission change can grant or revoke administrator for every holder of the role
+        if before.permissions != after.permissions:
+            self.exempt_cache.pop(after.guild.id, None)
+            # ...and Manage Webhooks for the bot, so retry log channels that had none
+            for channel in after.guild.channels:
+                self.log_webhook_misses.pop(channel.id, None)
 
-        # 8. Emoji Spam
-        if settings["max_emojis"] > 0:
-            custom = len(re.findall(r"<a?:[^:]+:[0-9]+>", message.content))
-            unicode = len(re.findall(r"[\U0001f300-\U0001faff]", message.content))
-            if custom + unicode > settings["max_emojis"]:
-                await self.punish(
-                    message, settings,
-                    f"Too many emojis (max {settings['max_emojis']})"
-                )
-                return
+    @commands.Cog.listener()
+    async def on_guild_channel_update(self, before, after):
+        if before.overwrites != after.overwrites:
+            self.log_webhook_misses.pop(after.id, None)
 
     # -------------------------------------------------------------------------
     # Event: on_member_join
@@ -344,26 +997,67 @@ class AutoMod(commands.Cog):
     async def on_member_join(self, member):
         settings = self.get_settings(member.guild.id)
         now = time.time()
+        raid_seconds = settings.get("raid_seconds", 10) or 10
+
+        # The join-rate baseline is learned even while Anti-Raid is off, so it's ready when enabled
+        age_days = (discord.utils.utcnow() - member.created_at).total_seconds() / 86400
+        self.join_history[member.guild.id].append((now, age_days))
+        detector = self.raid_detectors.get(member.guild.id)
+        if detector is None or detector.bucket_seconds != raid_seconds:
+            detector = self.raid_detectors[member.guild.id] = JoinRateDetector(raid_seconds)
+        detector.sensitivity = settings.get("raid_sensitivity", 4)
+        signal = detector.observe(now, age_days)
 
         # Anti-Raid — detect mass joins in a short window
         if settings.get("anti_raid"):
             raid_count = settings.get("raid_count", 10)
-            raid_seconds = settings.get("raid_seconds", 10)
 
             dq = self.raid_tracker[member.guild.id]
-            dq.append(now)
-            while dq and dq[0] < now - raid_seconds:
+            dq.append((now, member))
+            while dq and dq[0][0] < now - raid_seconds:
                 dq.popleft()
 
-            if len(dq) >= raid_count and not self.raid_lockdown.get(member.guild.id):
+            # Adaptive mode falls back to the fixed threshold until the baseline has warmed up
+            if settings.get("raid_adaptive") and signal is not None:
+                raid_detected = signal.flagged
+            else:
+                raid_detected = len(dq) >= raid_count
+
+            if settings.get("shadow_mode"):
+                last_alert = self.shadow_raid_alerts.get(member.guild.id, 0)
+                if raid_detected and now - last_alert > raid_seconds * 6:
+                    await self.send_log(
+                        member.guild, settings, "Shadow: Raid Lockdown", member,
+                        f"{len(dq)} joins within {raid_seconds}s — would lock channels"
+                        f" and apply raid response '{settings.get('raid_action', 'none')}'",
+                    )
+                if raid_detected:
+                    self.shadow_raid_alerts[member.guild.id] = now
+            elif self.raid_lockdown.get(member.guild.id):
+                # Lockdown already active — anyone still joining is part of the raid
+                if self._queue_raid_action(member.guild, settings, [member]):
+                    return
+            elif raid_detected:
                 self.raid_lockdown[member.guild.id] = True
-                await self._trigger_lockdown(member.guild, settings, len(dq), raid_seconds)
+                queued = self._queue_raid_action(member.guild, settings, [m for _, m in dq])
+                await self._trigger_lockdown(
+                    member.guild, settings, len(dq), raid_seconds,
+                    signal if settings.get("raid_adaptive") else None,
+                )
+                if queued:
+                    return
 
         # New Account Filter
         min_age = settings.get("min_account_age", 0)
         if min_age > 0:
             account_age_days = (discord.utils.utcnow() - member.created_at).days
-            if account_age_days < min_age:
+            if account_age_days < min_age and settings.get("shadow_mode"):
+                await self.send_log(
+                    member.guild, settings,
+                    "Shadow: Kick (New Account)", member,
+                    f"Account is {account_age_days} day(s) old (minimum: {min_age})"
+                )
+            elif account_age_days < min_age:
                 try:
                     await member.send(
                         f"You were kicked from **{member.guild.name}** because your account is too new. "
@@ -383,7 +1077,84 @@ class AutoMod(commands.Cog):
                     f"Account is {account_age_days} day(s) old (minimum: {min_age})"
                 )
 
-    async def _trigger_lockdown(self, guild, settings, join_count, window_seconds):
+    def _is_raid_suspect(self, member, settings):
+        """Check a raid-window joiner against the configured raid-response filters."""
+        max_age = settings.get("raid_max_age", 0)
+        if max_age > 0 and (discord.utils.utcnow() - member.created_at).days >= max_age:
+            return False
+        if settings.get("raid_default_avatar") and member.avatar is not None:
+            return False
+        return True
+
+    def _queue_raid_action(self, guild, settings, members):
+        """Queue matching raiders for a batched kick/ban. Returns True if any member was queued."""
+        if settings.get("raid_action", "none") not in ("kick", "ban"):
+            return False
+
+        queue = self.raid_queue[guild.id]
+        queued = False
+        for member in members:
+            if member.id not in queue and self._is_raid_suspect(member, settings):
+                queue[member.id] = member
+                queued = True
+
+        if queued and guild.id not in self.raid_flush_tasks:
+            self.raid_flush_tasks[guild.id] = asyncio.create_task(self._flush_raid_queue(guild))
+        return queued
+
+    async def _flush_raid_queue(self, guild):
+        """Action every queued raider in as few requests as possible."""
+        try:
+            await asyncio.sleep(RAID_FLUSH_DELAY)
+        finally:
+            self.raid_flush_tasks.pop(guild.id, None)
+
+        members = list(self.raid_queue.pop(guild.id, {}).values())
+        if not members:
+            return
+
+        settings = self.get_settings(guild.id)
+        action = settings.get("raid_action", "none")
+        actioned, failed = 0, 0
+
+        if action == "ban":
+            for i in range(0, len(members), RAID_BATCH_SIZE):
+                chunk = members[i:i + RAID_BATCH_SIZE]
+                try:
+                    result = await guild.bulk_ban(
+                        chunk, reason="AutoMod: Anti-raid response", delete_message_seconds=3600
+                    )
+                    actioned += len(result.banned)
+                    failed += len(result.failed)
+                except (discord.Forbidden, discord.HTTPException):
+                    failed += len(chunk)
+
+        elif action == "kick":
+            # Discord has no bulk-kick endpoint; the batch still collapses logging into one entry
+            for member in members:
+                try:
+                    await member.kick(reason="AutoMod: Anti-raid response")
+                    actioned += 1
+                except (discord.Forbidden, discord.HTTPException):
+                    failed += 1
+
+        log_channel_id = settings.get("log_channel_id")
+        channel = guild.get_channel(log_channel_id) if log_channel_id else None
+        if channel:
+            verb = "banned" if action == "ban" else "kicked"
+            embed = discord.Embed(
+                title="🚨 Raid Response",
+                description=f"**{actioned}** raider(s) {verb}" + (f", **{failed}** failed." if failed else "."),
+                color=discord.Color.red(),
+                timestamp=discord.utils.utcnow(),
+            )
+            preview = ", ".join(f"`{m.id}`" for m in members[:30])
+            if len(members) > 30:
+                preview += f" … (+{len(members) - 30} more)"
+            embed.add_field(name="Users", value=preview, inline=False)
+            await self._deliver_log(channel, [embed])
+
+    async def _trigger_lockdown(self, guild, settings, join_count, window_seconds, signal=None):
         """Lock all text channels and alert the log channel."""
         locked = 0
         for channel in guild.text_channels:
@@ -412,10 +1183,16 @@ class AutoMod(commands.Cog):
                     color=discord.Color.red(),
                     timestamp=discord.utils.utcnow(),
                 )
-                try:
-                    await channel.send(embed=embed)
-                except discord.Forbidden:
-                    pass
+                if signal:
+                    embed.add_field(
+                        name="Adaptive Detector",
+                        value=(
+                            f"Burst: **{signal.z_burst:.1f}σ** · Trend: **{signal.z_trend:.1f}σ** · "
+                            f"Account age: **{signal.z_age:.1f}σ** younger than usual"
+                        ),
+                        inline=False,
+                    )
+                await self._deliver_log(channel, [embed])
 
     # -------------------------------------------------------------------------
     # Commands
@@ -427,17 +1204,25 @@ class AutoMod(commands.Cog):
         settings = self.get_settings(interaction.guild.id)
 
         embed = discord.Embed(title="🛡️ AutoMod Configuration", color=discord.Color.blue())
+        if settings.get("shadow_mode"):
+            embed.description = "🕶️ **Shadow mode is on** — rules are evaluated and logged, but no action is taken."
 
         core = (
             f"Anti-Invite: {'✅' if settings['anti_invite'] else '❌'}\n"
             f"Anti-Link: {'✅' if settings['anti_links'] else '❌'}\n"
             f"Anti-Caps: {'✅' if settings['anti_caps'] else '❌'}\n"
+            f"Anti-Zalgo: {'✅' if settings.get('anti_zalgo') else '❌'}\n"
             f"Max Mentions: {settings['max_mentions']}\n"
             f"Max Emojis: {settings['max_emojis']}\n"
-            f"Bad Words: {len(settings['bad_words'])} words"
+            f"Bad Words: {len(settings['bad_words'])} words\n"
+            f"Image Blocklist: {'✅' if settings.get('anti_image_hash') else '❌'} "
+            f"({len(self.get_image_tree(interaction.guild.id))} images, ≤{settings.get('image_hash_distance', 6)} bits)"
         )
         embed.add_field(name="Core Filters", value=core, inline=True)
 
+        detection = (
+            f"Adaptive ({settings.get('raid_sensitivity', 4)}σ)" if settings.get("raid_adaptive") else "Fixed"
+        )
         advanced = (
             f"Anti-Spam: {'✅' if settings.get('anti_spam') else '❌'} "
             f"({settings.get('spam_count', 5)} msgs / {settings.get('spam_seconds', 5)}s)\n"
@@ -445,16 +1230,32 @@ class AutoMod(commands.Cog):
             f"(x{settings.get('repeat_count', 3)})\n"
             f"Anti-Raid: {'✅' if settings.get('anti_raid') else '❌'} "
             f"({settings.get('raid_count', 10)} joins / {settings.get('raid_seconds', 10)}s)\n"
+            f"Raid Detection: {detection}\n"
+            f"Raid Response: **{settings.get('raid_action', 'none').title()}**\n"
             f"Min Account Age: {settings.get('min_account_age', 0)} days"
         )
+        half_life = settings.get("violation_half_life", 168)
         embed.add_field(name="Advanced Filters", value=advanced, inline=True)
 
-        punishments = settings.get("punishments", self._default_punishments())
+        punishments = settings.get("punishments", default_punishments())
         pun_lines = []
         for p in sorted(punishments, key=lambda x: x["threshold"]):
             dur = f" ({p['duration'] // 60}m)" if p.get("duration") else ""
             pun_lines.append(f"Violation #{p['threshold']}: **{p['action'].title()}**{dur}")
-        embed.add_field(name="Punishment Ladder", value="\n".join(pun_lines) or "None set", inline=False)
+        pun_lines.append(
+            f"*Violations halve every {half_life}h*" if half_life else "*Violations never expire*"
+        )
+        embed.add_field(name="Punishment Ladder", value="\n".join(pun_lines), inline=False)
+
+        stats = self.workers.stats()
+        timeout = settings.get("worker_timeout", 3)
+        heavy = (
+            f"On failure: **{'Hold message' if settings.get('worker_fail_closed') else 'Allow message'}**\n"
+            f"Timeout: {f'{timeout}s' if timeout else 'None'}\n"
+            f"Pool: {stats['pending']}/{self.workers.max_pending} busy, "
+            f"p95 {stats['p95_ms']:.0f}ms, {stats['rejected']} rejected, {stats['timed_out']} timed out"
+        )
+        embed.add_field(name="Heavy Checks", value=heavy, inline=False)
 
         log_ch = interaction.guild.get_channel(settings.get("log_channel_id") or 0)
         embed.add_field(name="Log Channel", value=log_ch.mention if log_ch else "Not set", inline=True)
@@ -472,6 +1273,11 @@ class AutoMod(commands.Cog):
         app_commands.Choice(name="Anti-Spam", value="anti_spam"),
         app_commands.Choice(name="Anti-Repeat Messages", value="anti_repeat"),
         app_commands.Choice(name="Anti-Raid", value="anti_raid"),
+        app_commands.Choice(name="Anti-Raid: Adaptive Detection", value="raid_adaptive"),
+        app_commands.Choice(name="Shadow Mode (log only, no actions)", value="shadow_mode"),
+        app_commands.Choice(name="Anti-Zalgo", value="anti_zalgo"),
+        app_commands.Choice(name="Heavy Checks: Fail Closed", value="worker_fail_closed"),
+        app_commands.Choice(name="Image Blocklist", value="anti_image_hash"),
     ])
     @app_commands.checks.has_permissions(administrator=True)
     async def toggle(self, interaction: discord.Interaction, feature: app_commands.Choice[str]):
@@ -492,12 +1298,21 @@ class AutoMod(commands.Cog):
         app_commands.Choice(name="Repeat: Same message count", value="repeat_count"),
         app_commands.Choice(name="Raid: Joins per window", value="raid_count"),
         app_commands.Choice(name="Raid: Window (seconds)", value="raid_seconds"),
+        app_commands.Choice(name="Raid: Adaptive sensitivity (std devs)", value="raid_sensitivity"),
         app_commands.Choice(name="Min Account Age (days)", value="min_account_age"),
+        app_commands.Choice(name="Violation Half-Life (hours, 0 = never)", value="violation_half_life"),
+        app_commands.Choice(name="Heavy Check Timeout (seconds, 0 = none)", value="worker_timeout"),
+        app_commands.Choice(name="Image Match Distance (bits of 64)", value="image_hash_distance"),
     ])
     @app_commands.checks.has_permissions(administrator=True)
     async def limits(self, interaction: discord.Interaction, feature: app_commands.Choice[str], limit: int):
         if limit < 0:
             return await interaction.response.send_message("Limit cannot be negative.", ephemeral=True)
+        bounds = LIMIT_RANGES.get(feature.value)
+        if bounds and not bounds[0] <= limit <= bounds[1]:
+            return await interaction.response.send_message(
+                f"**{feature.name}** must be between {bounds[0]} and {bounds[1]}.", ephemeral=True
+            )
         settings = self.get_settings(interaction.guild.id)
         settings[feature.value] = limit
         self.save_settings(interaction.guild.id, settings)
@@ -536,7 +1351,7 @@ class AutoMod(commands.Cog):
             return await interaction.response.send_message("Threshold must be at least 1.", ephemeral=True)
 
         settings = self.get_settings(interaction.guild.id)
-        punishments = [p for p in settings.get("punishments", self._default_punishments()) if p["threshold"] != threshold]
+        punishments = [p for p in settings.get("punishments", default_punishments()) if p["threshold"] != threshold]
         punishments.append({"threshold": threshold, "action": action.value, "duration": duration_minutes * 60})
         punishments.sort(key=lambda x: x["threshold"])
         settings["punishments"] = punishments
@@ -656,6 +1471,324 @@ class AutoMod(commands.Cog):
             self.save_settings(interaction.guild.id, settings)
             await interaction.response.send_message(f"✅ Removed AutoMod exemption for {channel.mention}.")
 
+    @app_commands.command(name="automod_raid_response", description="Configure what happens to raiders when anti-raid fires")
+    @app_commands.describe(
+        action="What to do with members who joined during the raid window",
+        max_account_age="Only action accounts younger than this many days (0 = any age)",
+        default_avatar_only="Only action accounts that still have the default avatar",
+    )
+    @app_commands.choices(action=[
+        app_commands.Choice(name="Lock Channels Only", value="none"),
+        app_commands.Choice(name="Kick Raiders", value="kick"),
+        app_commands.Choice(name="Ban Raiders", value="ban"),
+    ])
+    @app_commands.checks.has_permissions(administrator=True)
+    async def raid_response(
+        self,
+        interaction: discord.Interaction,
+        action: app_commands.Choice[str],
+        max_account_age: int = 0,
+        default_avatar_only: bool = False,
+    ):
+        if max_account_age < 0:
+            return await interaction.response.send_message("Account age cannot be negative.", ephemeral=True)
+
+        settings = self.get_settings(interaction.guild.id)
+        settings["raid_action"] = action.value
+        settings["raid_max_age"] = max_account_age
+        settings["raid_default_avatar"] = default_avatar_only
+        self.save_settings(interaction.guild.id, settings)
+
+        filters = []
+        if max_account_age:
+            filters.append(f"accounts younger than {max_account_age} day(s)")
+        if default_avatar_only:
+            filters.append("default avatar")
+        filter_str = f" (filters: {', '.join(filters)})" if filters else ""
+        await interaction.response.send_message(f"✅ Raid response set to **{action.name}**{filter_str}.")
+
+    @app_commands.command(name="automod_domains", description="Manage per-domain link allow and deny lists")
+    @app_commands.describe(
+        action="What to do",
+        list_type="Which list to change (allowed links bypass Anti-Links, denied links are always removed)",
+        domain="Domain to add or remove (subdomains are covered too)",
+        file="Blocklist to import (plain, hosts-file or adblock format)",
+    )
+    @app_commands.choices(
+        action=[
+            app_commands.Choice(name="Add", value="add"),
+            app_commands.Choice(name="Remove", value="remove"),
+            app_commands.Choice(name="List", value="list"),
+            app_commands.Choice(name="Import File", value="import"),
+            app_commands.Choice(name="Clear List", value="clear"),
+        ],
+        list_type=[
+            app_commands.Choice(name="Allow", value="allow"),
+            app_commands.Choice(name="Deny", value="deny"),
+        ],
+    )
+    @app_commands.checks.has_permissions(administrator=True)
+    async def domains(
+        self,
+        interaction: discord.Interaction,
+        action: app_commands.Choice[str],
+        list_type: app_commands.Choice[str],
+        domain: str = None,
+        file: discord.Attachment = None,
+    ):
+        guild_id = interaction.guild.id
+
+        if action.value == "list":
+            total = self.bot.db.fetchone(
+                "SELECT COUNT(*) FROM automod_domains WHERE guild_id = ? AND list_type = ?",
+                (guild_id, list_type.value),
+            )[0]
+            if not total:
+                return await interaction.response.send_message(f"The {list_type.name.lower()} list is empty.", ephemeral=True)
+            # Domains are at most 253 characters, so this many always fills the message
+            rows = self.bot.db.fetchall(
+                "SELECT domain FROM automod_domains WHERE guild_id = ? AND list_type = ? ORDER BY domain LIMIT 500",
+                (guild_id, list_type.value),
+            )
+            text = f"🔗 **{list_type.name} List ({total:,}):** "
+            shown = 0
+            for (name,) in rows:
+                item = f"{', ' if shown else ''}`{name}`"
+                if len(text) + len(item) > DOMAIN_LIST_LENGTH:
+                    break
+                text += item
+                shown += 1
+            if total > shown:
+                text += f"\n… and {total - shown:,} more"
+            return await interaction.response.send_message(text, ephemeral=True)
+
+        if action.value == "clear":
+            self.bot.db.execute(
+                "DELETE FROM automod_domains WHERE guild_id = ? AND list_type = ?", (guild_id, list_type.value)
+            )
+            self.domain_tries.pop(guild_id, None)
+            self.domain_trie_tasks.pop(guild_id, None)
+            return await interaction.response.send_message(f"✅ Cleared the {list_type.name.lower()} list.")
+
+        trie = await self.get_domain_trie(guild_id)
+
+        if action.value == "import":
+            if not file:
+                return await interaction.response.send_message("Please attach a blocklist file.", ephemeral=True)
+            await interaction.response.defer()
+            text = (await file.read()).decode("utf-8", errors="ignore")
+            room = MAX_DOMAINS_PER_GUILD - len(trie)
+            imported, chunk = 0, []
+            for parsed in parse_blocklist(text.splitlines()):
+                if imported >= room:
+                    break
+                chunk.append((guild_id, parsed, list_type.value))
+                imported += 1
+                if len(chunk) >= DOMAIN_IMPORT_CHUNK:
+                    self.bot.db.executemany("INSERT OR REPLACE INTO automod_domains VALUES (?, ?, ?)", chunk)
+                    trie.update((d, t) for _, d, t in chunk)
+                    chunk = []
+                    await asyncio.sleep(0)
+            if chunk:
+                self.bot.db.executemany("INSERT OR REPLACE INTO automod_domains VALUES (?, ?, ?)", chunk)
+                trie.update((d, t) for _, d, t in chunk)
+            capped = f" (stopped at the {MAX_DOMAINS_PER_GUILD:,} domain limit)" if imported >= room else ""
+            return await interaction.followup.send(
+                f"✅ Imported **{imported:,}** domain(s) into the {list_type.name.lower()} list{capped}."
+            )
+
+        if not domain:
+            return await interaction.response.send_message("Please specify a domain.", ephemeral=True)
+        parsed = normalize_domain(domain)
+        if not parsed:
+            return await interaction.response.send_message("That doesn't look like a valid domain.", ephemeral=True)
+
+        if action.value == "add":
+            if len(trie) >= MAX_DOMAINS_PER_GUILD:
+                return await interaction.response.send_message("Domain list limit reached.", ephemeral=True)
+            self.bot.db.execute(
+                "INSERT OR REPLACE INTO automod_domains (guild_id, domain, list_type) VALUES (?, ?, ?)",
+                (guild_id, parsed, list_type.value),
+            )
+            trie.add(parsed, list_type.value)
+            await interaction.response.send_message(f"✅ Added `{parsed}` to the {list_type.name.lower()} list.")
+
+        elif action.value == "remove":
+            c = self.bot.db.execute(
+                "DELETE FROM automod_domains WHERE guild_id = ? AND domain = ? AND list_type = ?",
+                (guild_id, parsed, list_type.value),
+            )
+            if c.rowcount == 0:
+                return await interaction.response.send_message(
+                    f"`{parsed}` is not in the {list_type.name.lower()} list.", ephemeral=True
+                )
+            trie.remove(parsed)
+            await interaction.response.send_message(f"✅ Removed `{parsed}` from the {list_type.name.lower()} list.")
+
+    @app_commands.command(name="automod_images", description="Manage the blocked image list")
+    @app_commands.describe(
+        action="What to do",
+        image="Image to add or remove",
+        image_hash="Hash to add or remove (16 hex digits, as shown by List)",
+        label="Optional note shown in logs when the image is matched",
+    )
+    @app_commands.choices(action=[
+        app_commands.Choice(name="Add", value="add"),
+        app_commands.Choice(name="Remove", value="remove"),
+        app_commands.Choice(name="List", value="list"),
+        app_commands.Choice(name="Clear List", value="clear"),
+    ])
+    @app_commands.checks.has_permissions(administrator=True)
+    async def images(
+        self,
+        interaction: discord.Interaction,
+        action: app_commands.Choice[str],
+        image: discord.Attachment = None,
+        image_hash: str = None,
+        label: str = None,
+    ):
+        guild_id = interaction.guild.id
+
+        if action.value == "list":
+            rows = self.bot.db.fetchall(
+                "SELECT hash, label FROM automod_image_hashes WHERE guild_id = ? ORDER BY rowid DESC LIMIT 25",
+                (guild_id,),
+            )
+            if not rows:
+                return await interaction.response.send_message("The image blocklist is empty.", ephemeral=True)
+            total = len(self.get_image_tree(guild_id))
+            lines = [f"`{h}`" + (f" — {lbl}" if lbl else "") for h, lbl in rows]
+            more = f"\n… and {total - len(rows)} more" if total > len(rows) else ""
+            return await interaction.response.send_message(
+                f"🖼️ **Blocked Images ({total}):**\n" + "\n".join(lines) + more, ephemeral=True
+            )
+
+        if action.value == "clear":
+            self.bot.db.execute("DELETE FROM automod_image_hashes WHERE guild_id = ?", (guild_id,))
+            self.image_trees.pop(guild_id, None)
+            return await interaction.response.send_message("✅ Cleared the image blocklist.")
+
+        if image_hash:
+            value = parse_hash(image_hash)
+            if value is None:
+                return await interaction.response.send_message(
+                    "A hash is 16 hex digits, e.g. `c3e1f0d0b0a08080`.", ephemeral=True
+                )
+        elif image:
+            if not (image.content_type or "").startswith("image/") or image.size > MAX_HASH_BYTES:
+                return await interaction.response.send_message(
+                    f"Please attach an image under {MAX_HASH_BYTES // 1024 // 1024} MB.", ephemeral=True
+                )
+            await interaction.response.defer()
+            try:
+                value = await self.hash_attachment(guild_id, image)
+            except PoolBusy:
+                return await interaction.followup.send("AutoMod is busy right now, please try again shortly.")
+            except (discord.HTTPException, ValueError, OSError):
+                return await interaction.followup.send("That image couldn't be read.")
+        else:
+            return await interaction.response.send_message("Please attach an image or give a hash.", ephemeral=True)
+
+        send = interaction.followup.send if interaction.response.is_done() else interaction.response.send_message
+        hex_hash = format_hash(value)
+
+        if action.value == "add":
+            tree = self.get_image_tree(guild_id)
+            if len(tree) >= MAX_IMAGE_HASHES:
+                return await send(f"The image blocklist is full ({MAX_IMAGE_HASHES:,} images).")
+            self.bot.db.execute(
+                "INSERT OR REPLACE INTO automod_image_hashes (guild_id, hash, label) VALUES (?, ?, ?)",
+                (guild_id, hex_hash, label),
+            )
+            tree.add(value, label)
+            await send(f"✅ Blocked image `{hex_hash}`" + (f" ({label})" if label else "") + ".")
+
+        elif action.value == "remove":
+            c = self.bot.db.execute(
+                "DELETE FROM automod_image_hashes WHERE guild_id = ? AND hash = ?", (guild_id, hex_hash)
+            )
+            if c.rowcount == 0:
+                return await send(f"`{hex_hash}` is not on the image blocklist.")
+            # BK-trees don't support removal, so the guild's tree is rebuilt on next use
+            self.image_trees.pop(guild_id, None)
+            await send(f"✅ Removed `{hex_hash}` from the image blocklist.")
+
+    @app_commands.command(name="automod_raid_replay", description="Replay a join timeline against the raid detectors")
+    @app_commands.describe(
+        file="Timeline to replay (CSV 'timestamp,account_age_days' or JSON lines). Defaults to recent joins.",
+        sensitivity="Adaptive sensitivity to test (defaults to the current setting)",
+    )
+    @app_commands.checks.has_permissions(administrator=True)
+    async def raid_replay(
+        self,
+        interaction: discord.Interaction,
+        file: discord.Attachment = None,
+        sensitivity: app_commands.Range[int, 1, 20] = None,
+    ):
+        settings = self.get_settings(interaction.guild.id)
+        sensitivity = sensitivity or settings.get("raid_sensitivity", 4)
+        raid_seconds = settings.get("raid_seconds", 10) or 10
+
+        if file:
+            events = []
+            for line in (await file.read()).decode("utf-8", errors="ignore").splitlines():
+                line = line.strip()
+                try:
+                    if line.startswith("{"):
+                        data = json.loads(line)
+                        events.append((float(data["timestamp"]), float(data["account_age_days"])))
+                    elif line:
+                        ts, age = line.split(",")[:2]
+                        events.append((float(ts), float(age)))
+                except (ValueError, KeyError):
+                    continue  # header or malformed line
+            source = file.filename
+        else:
+            events = list(self.join_history[interaction.guild.id])
+            source = "recent joins"
+
+        if not events:
+            return await interaction.response.send_message("No join events to replay.", ephemeral=True)
+
+        result = replay(events, raid_seconds, sensitivity)
+        fixed = replay_fixed(events, settings.get("raid_count", 10), raid_seconds)
+        span = max(e[0] for e in events) - min(e[0] for e in events)
+
+        embed = discord.Embed(
+            title="🧪 Raid Detector Replay",
+            description=f"**{result.joins}** joins over **{span / 3600:.1f}h** from {source}.",
+            color=discord.Color.blue(),
+        )
+        adaptive_lines = [
+            f"<t:{int(ts)}:f> — {sig.count} joins, burst {sig.z_burst:.1f}σ, trend {sig.z_trend:.1f}σ"
+            for ts, sig in result.incidents[:5]
+        ]
+        if len(result.incidents) > 5:
+            adaptive_lines.append(f"… and {len(result.incidents) - 5} more")
+        embed.add_field(
+            name=f"Adaptive ({sensitivity}σ): {len(result.incidents)} incident(s)",
+            value="\n".join(adaptive_lines) or "No raids flagged.",
+            inline=False,
+        )
+        if result.peak:
+            embed.add_field(
+                name="Peak Deviation",
+                value=f"burst {result.peak.z_burst:.1f}σ · trend {result.peak.z_trend:.1f}σ",
+                inline=True,
+            )
+        embed.add_field(
+            name=f"Fixed ({settings.get('raid_count', 10)} / {raid_seconds}s)",
+            value=f"{len(fixed)} incident(s)",
+            inline=True,
+        )
+
+        # Hand back the recorded timeline so it can be replayed again later
+        extra = {}
+        if not file:
+            csv_text = "timestamp,account_age_days\n" + "\n".join(f"{ts:.3f},{age:.2f}" for ts, age in events)
+            extra["file"] = discord.File(io.BytesIO(csv_text.encode()), filename="join_timeline.csv")
+        await interaction.response.send_message(embed=embed, ephemeral=True, **extra)
+
     @app_commands.command(name="automod_unlock", description="Lift an active raid lockdown and unlock all channels")
     @app_commands.checks.has_permissions(administrator=True)
     async def unlock(self, interaction: discord.Interaction):
@@ -679,6 +1812,7 @@ class AutoMod(commands.Cog):
 
         self.raid_lockdown[interaction.guild.id] = False
         self.raid_tracker[interaction.guild.id].clear()
+        self.raid_queue.pop(interaction.guild.id, None)
 
         await interaction.followup.send(f"✅ Lockdown lifted. **{unlocked}** channels have been unlocked.")
 
@@ -686,9 +1820,13 @@ class AutoMod(commands.Cog):
     @app_commands.describe(user="The user to check")
     @app_commands.checks.has_permissions(manage_messages=True)
     async def check_violations(self, interaction: discord.Interaction, user: discord.Member):
-        count = self.violation_counts[interaction.guild.id].get(user.id, 0)
+        settings = self.get_settings(interaction.guild.id)
+        score = self.get_violation_score(interaction.guild.id, user.id, settings)
+        half_life = settings.get("violation_half_life", 168)
+        decay = f"halves every {half_life}h" if half_life else "never decays"
         await interaction.response.send_message(
-            f"🛡️ {user.mention} has **{count}** AutoMod violation(s) this session.",
+            f"🛡️ {user.mention} has **{self.violation_count(score)}** active AutoMod violation(s) "
+            f"(score `{score:.2f}`, {decay}).",
             ephemeral=True,
         )
 
@@ -696,7 +1834,7 @@ class AutoMod(commands.Cog):
     @app_commands.describe(user="The user to reset")
     @app_commands.checks.has_permissions(administrator=True)
     async def reset_violations(self, interaction: discord.Interaction, user: discord.Member):
-        self.violation_counts[interaction.guild.id][user.id] = 0
+        self.reset_violation(interaction.guild.id, user.id)
         await interaction.response.send_message(f"✅ Reset violation count for {user.mention}.")
 
 
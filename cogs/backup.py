@@ -6,6 +6,7 @@ import json
 import io
 import os
 import logging
+from utils.level_curve import total_xp_for
 
 
 class Backup(commands.Cog):
@@ -209,6 +210,9 @@ class Backup(commands.Cog):
         backup["bot_config"] = cfg
 
         # Member XP/levels
+        leveling = self.bot.get_cog("Leveling")
+        if leveling:
+            leveling.flush_xp(guild_id)
         try:
             rows = self.db.fetchall("SELECT user_id, xp, level FROM levels WHERE guild_id = ?", (guild_id,))
             backup["member_levels"] = [{"user_id": r[0], "xp": r[1], "level": r[2]} for r in rows]
@@ -584,16 +588,25 @@ class Backup(commands.Cog):
         # 4. Bot config
         self._restore_bot_config(guild.id, backup.get("bot_config", {}))
 
-        # 5. Member levels
+        # 5. Member levels — one transaction instead of a commit per member
+        level_rows = []
         for ld in backup.get("member_levels", []):
             try:
-                self.db.execute(
-                    "INSERT OR REPLACE INTO levels (user_id, guild_id, xp, level) VALUES (?, ?, ?, ?)",
-                    (ld["user_id"], guild.id, ld["xp"], ld["level"]),
-                )
-                results["levels"] += 1
+                xp, level = int(ld["xp"]), int(ld["level"])
+                level_rows.append((int(ld["user_id"]), guild.id, xp, level, total_xp_for(level, xp)))
             except Exception:
-                pass
+                pass  # Skip malformed entries, as before
+        try:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO levels (user_id, guild_id, xp, level, total_xp) VALUES (?, ?, ?, ?, ?)",
+                level_rows,
+            )
+            results["levels"] = len(level_rows)
+        except Exception as e:
+            errors.append(f"Member levels: {e}")
+        leveling = self.bot.get_cog("Leveling")
+        if leveling:
+            leveling.invalidate_guild(guild.id)
 
         # 6. Warnings
         for wd in backup.get("warnings", []):
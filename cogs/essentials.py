@@ -61,6 +61,12 @@ class Essentials(commands.Cog):
         embed.add_field(name="Discord.py Version", value=discord.__version__, inline=True)
         embed.add_field(name="Servers", value=str(len(self.bot.guilds)), inline=True)
         embed.add_field(name="Users", value=str(sum(guild.member_count for guild in self.bot.guilds)), inline=True)
+        render = self.bot.renderer.stats()
+        embed.add_field(
+            name="Image Renderer",
+            value=f"{render['queued']} queued · p50 {render['p50_ms']:.0f}ms · p95 {render['p95_ms']:.0f}ms",
+            inline=True,
+        )
         
         await interaction.response.send_message(embed=embed)
 
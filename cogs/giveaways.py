@@ -4,15 +4,174 @@ from discord import app_commands
 from datetime import datetime, timezone, timedelta
 import random
 import asyncio
+import logging
 from utils.helpers import parse_duration
 
+GIVEAWAY_EMOJI = "🎉"
+# Queued entry changes are written in one batch on this interval
+ENTRY_FLUSH_SECONDS = 5
+# Entries of ended giveaways are kept this long for /greroll
+ENTRY_RETENTION_DAYS = 30
+
 class Giveaways(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.logger = logging.getLogger("Giveaways")
+        # Message IDs of running giveaways, so reaction events for anything else cost one set lookup
+        self.active = {row[0] for row in self.bot.db.fetchall("SELECT message_id FROM giveaways WHERE status = 'active'")}
+        # Write-behind entry changes: {(message_id, user_id): True to enter, False to leave}
+        self.entry_queue = {}
+        # Entry changes seen while a reconcile pass is paging reactions; they're newer than the pass
+        self.reconciling = set()
+        self.touched = set()
+        # Giveaways whose ledger is known to be complete in this process (checked, or started while we were online).
+        # Ended giveaways also carry a persistent `reconciled` flag, so they're never checked again after a restart.
+        self.reconciled = set()
+        self.reconcile_tasks = {}
+        self.startup_reconcile = None
         self.check_giveaways.start()
+        self.flush_entries_loop.start()
 
     def cog_unload(self):
         self.check_giveaways.cancel()
+        self.flush_entries_loop.cancel()
+        if self.startup_reconcile:
+            self.startup_reconcile.cancel()
+        for task in self.reconcile_tasks.values():
+            task.cancel()
+        self.flush_entries()
+
+    # -------------------------------------------------------------------------
+    # Entry ledger
+    # -------------------------------------------------------------------------
+
+    def flush_entries(self) -> bool:
+        """Write queued entries and withdrawals in one transaction. On failure they stay queued for the next flush."""
+        if not self.entry_queue:
+            return True
+        queue, self.entry_queue = self.entry_queue, {}
+        added = [key for key, entered in queue.items() if entered]
+        removed = [key for key, entered in queue.items() if not entered]
+        try:
+            if removed:
+                self.bot.db.executemany(
+                    "DELETE FROM giveaway_entries WHERE message_id = ? AND user_id = ?", removed, commit=not added
+                )
+            if added:
+                self.bot.db.executemany("INSERT OR IGNORE INTO giveaway_entries (message_id, user_id) VALUES (?, ?)", added)
+        except Exception as e:
+            # Keep the batch for the next flush unless a newer reaction event replaced it meanwhile
+            for key, entered in queue.items():
+                self.entry_queue.setdefault(key, entered)
+            self.logger.error(f"Failed to write {len(queue)} giveaway entry changes, will retry: {e!r}")
+            return False
+        return True
+
+    def get_entrants(self, message_id):
+        flushed = self.flush_entries()
+        entrants = {row[0] for row in self.bot.db.fetchall(
+            "SELECT user_id FROM giveaway_entries WHERE message_id = ?", (message_id,)
+        )}
+        if not flushed:
+            # The ledger is behind; apply the changes still waiting in the queue
+            for (queued_id, user_id), entered in self.entry_queue.items():
+                if queued_id == message_id:
+                    if entered:
+                        entrants.add(user_id)
+                    else:
+                        entrants.discard(user_id)
+        return list(entrants)
+
+    async def reconcile(self):
+        """Startup pass: bring the ledger of every running giveaway in line with its reactions."""
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=ENTRY_RETENTION_DAYS)).isoformat()
+        self.bot.db.execute(
+            """DELETE FROM giveaway_entries WHERE message_id IN
+               (SELECT message_id FROM giveaways WHERE status = 'ended' AND end_time <= ?)""",
+            (cutoff,),
+        )
+
+        for message_id, channel_id in self.bot.db.fetchall(
+            "SELECT message_id, channel_id FROM giveaways WHERE status = 'active'"
+        ):
+            await self.ensure_reconciled(message_id, channel_id)
+
+    async def ensure_reconciled(self, message_id, channel_id, message=None):
+        """Make sure the ledger includes entries made while the bot was offline. Returns False if it couldn't be checked."""
+        if message_id in self.reconciled:
+            return True
+        row = self.bot.db.fetchone("SELECT reconciled FROM giveaways WHERE message_id = ?", (message_id,))
+        if row and row[0]:
+            self.reconciled.add(message_id)
+            return True
+        # Concurrent callers (the startup pass and a giveaway ending) share one pass
+        task = self.reconcile_tasks.get(message_id)
+        if task is None:
+            task = asyncio.create_task(self._reconcile_giveaway(message_id, channel_id, message))
+            self.reconcile_tasks[message_id] = task
+            task.add_done_callback(lambda _: self.reconcile_tasks.pop(message_id, None))
+        return await asyncio.shield(task)
+
+    async def _reconcile_giveaway(self, message_id, channel_id, message=None):
+        self.reconciling.add(message_id)
+        try:
+            if message is None:
+                channel = self.bot.get_channel(channel_id)
+                if not channel:
+                    return False
+                message = await channel.fetch_message(message_id)
+            reaction = discord.utils.get(message.reactions, emoji=GIVEAWAY_EMOJI)
+            reacted = {user.id async for user in reaction.users() if not user.bot} if reaction else set()
+        except discord.HTTPException as e:
+            self.logger.warning(f"Couldn't reconcile giveaway {message_id}: {e}")
+            return False
+        finally:
+            self.reconciling.discard(message_id)
+
+        # Reaction events that arrived during paging are newer than this pass, so they win
+        touched = {k[1] for k in self.touched if k[0] == message_id}
+        self.touched.difference_update((message_id, user_id) for user_id in touched)
+        recorded = set(self.get_entrants(message_id))
+        for user_id in reacted - recorded - touched:
+            self.entry_queue[(message_id, user_id)] = True
+        for user_id in recorded - reacted - touched:
+            self.entry_queue[(message_id, user_id)] = False
+        self.flush_entries()
+        self.reconciled.add(message_id)
+        # Only an ended ledger stays complete; a running one can miss reactions during the next downtime
+        self.bot.db.execute(
+            "UPDATE giveaways SET reconciled = 1 WHERE message_id = ? AND status = 'ended'", (message_id,)
+        )
+        return True
+
+    @tasks.loop(seconds=ENTRY_FLUSH_SECONDS)
+    async def flush_entries_loop(self):
+        self.flush_entries()
+
+    @flush_entries_loop.before_loop
+    async def before_flush_entries(self):
+        await self.bot.wait_until_ready()
+        # Entries keep flushing while the reconcile pass pages through reactions
+        self.startup_reconcile = asyncio.create_task(self.reconcile())
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_add(self, payload: discord.RawReactionActionEvent):
+        if payload.message_id not in self.active or payload.emoji.name != GIVEAWAY_EMOJI:
+            return
+        if payload.member is None or payload.member.bot:
+            return
+        self._record(payload.message_id, payload.user_id, True)
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_remove(self, payload: discord.RawReactionActionEvent):
+        if payload.message_id not in self.active or payload.emoji.name != GIVEAWAY_EMOJI:
+            return
+        self._record(payload.message_id, payload.user_id, False)
+
+    def _record(self, message_id, user_id, entered):
+        self.entry_queue[(message_id, user_id)] = entered
+        if message_id in self.reconciling:
+            self.touched.add((message_id, user_id))
 
     @app_commands.command(name="gstart", description="Start a giveaway")
     @app_commands.describe(duration="Duration (e.g. 10m, 1h, 2d)", winners="Number of winners", prize="Prize to win")
@@ -32,11 +191,13 @@ class Giveaways(commands.Cog):
             description=f"**Prize:** {prize}\n**Winners:** {winners}\n**Ends:** <t:{end_timestamp}:R>",
             color=discord.Color.purple(),
         )
-        embed.set_footer(text="React with 🎉 to enter!")
+        embed.set_footer(text=f"React with {GIVEAWAY_EMOJI} to enter!")
 
         await interaction.response.send_message("Giveaway started!", ephemeral=True)
         message = await interaction.channel.send(embed=embed)
-        await message.add_reaction("🎉")
+        self.active.add(message.id)
+        self.reconciled.add(message.id)
+        await message.add_reaction(GIVEAWAY_EMOJI)
 
         self.bot.db.execute(
             "INSERT INTO giveaways (message_id, channel_id, prize, end_time, winners_count, status) VALUES (?, ?, ?, ?, ?, ?)",
@@ -61,11 +222,14 @@ class Giveaways(commands.Cog):
             return await interaction.response.send_message("Giveaway not found or already ended.", ephemeral=True)
 
         self.bot.db.execute("UPDATE giveaways SET status = 'ended' WHERE message_id = ?", (msg_id_int,))
+        self.active.discard(msg_id_int)
 
+        # Drawing may have to page reactions first if the ledger hasn't been checked yet
+        await interaction.response.defer(ephemeral=True)
         channel_id, prize, winners_count = result
         await self.end_giveaway(msg_id_int, channel_id, prize, winners_count)
 
-        await interaction.response.send_message("Giveaway ended.", ephemeral=True)
+        await interaction.followup.send("Giveaway ended.", ephemeral=True)
 
     @app_commands.command(name="greroll", description="Reroll a giveaway winner")
     @app_commands.describe(message_id="The message ID of the giveaway")
@@ -76,22 +240,21 @@ class Giveaways(commands.Cog):
         except ValueError:
             return await interaction.response.send_message("Invalid ID", ephemeral=True)
 
-        try:
-            message = await interaction.channel.fetch_message(msg_id_int)
-        except discord.NotFound:
-            return await interaction.response.send_message("Giveaway message not found.", ephemeral=True)
-
-        reaction = discord.utils.get(message.reactions, emoji="🎉")
-        if not reaction:
-            return await interaction.response.send_message("No 🎉 reaction found on that message.", ephemeral=True)
+        row = self.bot.db.fetchone("SELECT channel_id FROM giveaways WHERE message_id = ?", (msg_id_int,))
+        if not row or row[0] != interaction.channel.id:
+            return await interaction.response.send_message("No giveaway with that ID in this channel.", ephemeral=True)
 
-        users = [user async for user in reaction.users() if not user.bot]
+        # A giveaway that ran across a restart may have to page reactions first
+        await interaction.response.defer(ephemeral=True)
+        if not await self.ensure_reconciled(msg_id_int, row[0]):
+            return await interaction.followup.send("Giveaway message not found.", ephemeral=True)
 
-        if not users:
-            return await interaction.response.send_message("No valid entrants to reroll.", ephemeral=True)
+        entrants = self.get_entrants(msg_id_int)
+        if not entrants:
+            return await interaction.followup.send("No valid entrants to reroll.", ephemeral=True)
 
-        winner = random.choice(users)
-        await interaction.response.send_message(f"🎉 The new winner is {winner.mention}! Congratulations!")
+        await interaction.channel.send(f"🎉 The new winner is <@{random.choice(entrants)}>! Congratulations!")
+        await interaction.followup.send("Giveaway rerolled.", ephemeral=True)
 
     async def end_giveaway(self, message_id, channel_id, prize, winners_count):
         channel = self.bot.get_channel(channel_id)
@@ -108,19 +271,17 @@ class Giveaways(commands.Cog):
         embed.color = discord.Color.greyple()
         await message.edit(embed=embed)
 
-        reaction = discord.utils.get(message.reactions, emoji="🎉")
-        if not reaction:
-            await channel.send(f"Giveaway for **{prize}** ended, but no one entered! 😞")
-            return
-
-        users = [user async for user in reaction.users() if not user.bot]
+        # Entries are recorded as they happen; only a giveaway that ran across a restart needs its reactions checked first
+        if await self.ensure_reconciled(message_id, channel_id, message):
+            self.bot.db.execute("UPDATE giveaways SET reconciled = 1 WHERE message_id = ?", (message_id,))
+        entrants = self.get_entrants(message_id)
 
-        if not users:
+        if not entrants:
             await channel.send(f"Giveaway for **{prize}** ended, but no one entered! 😞")
             return
 
-        winners = users if len(users) < winners_count else random.sample(users, winners_count)
-        winner_mentions = ", ".join(w.mention for w in winners)
+        winners = entrants if len(entrants) < winners_count else random.sample(entrants, winners_count)
+        winner_mentions = ", ".join(f"<@{user_id}>" for user_id in winners)
         await channel.send(f"🎉 Congratulations {winner_mentions}! You won **{prize}**! 🎉")
 
     @tasks.loop(seconds=30)
@@ -133,6 +294,7 @@ class Giveaways(commands.Cog):
 
         for message_id, channel_id, prize, winners_count in ended:
             self.bot.db.execute("UPDATE giveaways SET status = 'ended' WHERE message_id = ?", (message_id,))
+            self.active.discard(message_id)
             asyncio.create_task(self.end_giveaway(message_id, channel_id, prize, winners_count))
 
     @check_giveaways.before_loop
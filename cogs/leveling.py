@@ -1,12 +1,70 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord import app_commands
 import random
 import time
-import math
 import io
-import functools
-from PIL import Image, ImageDraw, ImageFont, ImageOps, ImageFilter
+import gzip
+import asyncio
+import tempfile
+import logging
+from collections import OrderedDict
+from utils.cooldowns import ExpiringCooldowns
+from utils.level_curve import level_for_total_xp, total_xp_for, xp_for_level
+from utils.voice_sessions import VoiceTracker
+from utils.rank_card import render_leaderboard, render_rank_card
+from utils.worker_pool import PoolBusy
+from utils.xp_transfer import ImportFileError, iter_records, open_text, write_rows
+
+# XP gains are accumulated in memory and written back in one batch on this interval
+XP_FLUSH_SECONDS = 15
+# Clean cache entries untouched for this long are dropped at flush time
+XP_CACHE_IDLE_SECONDS = 600
+
+DEFAULT_XP_COOLDOWN = 60
+MAX_XP_COOLDOWN = 3600
+
+# Voice XP per minute of eligible voice time; banked minutes are credited on this interval
+DEFAULT_VOICE_XP = 10
+MAX_VOICE_XP = 100
+VOICE_FLUSH_SECONDS = 60
+
+# Rank card caches: downloaded avatars by avatar hash, finished cards by (user, name, xp, level, avatar hash)
+AVATAR_CACHE_SIZE = 256
+AVATAR_FETCH_SIZE = 256
+CARD_CACHE_SIZE = 256
+# Give up on a render that has waited this long in the renderer pool
+RENDER_TIMEOUT = 15
+
+LEADERBOARD_PAGE_SIZE = 10
+# Top-N rows kept per guild and how long a snapshot is trusted before it's re-queried
+LEADERBOARD_SNAPSHOT_SIZE = 100
+LEADERBOARD_SNAPSHOT_TTL = 60
+
+
+# Bulk import/export: rows per executemany transaction / per export query, and progress update interval
+XP_IMPORT_CHUNK = 5_000
+XP_EXPORT_CHUNK = 5_000
+XP_PROGRESS_SECONDS = 3
+# A file whose first this-many lines all fail to parse is rejected outright
+XP_IMPORT_MAX_ERRORS = 1_000
+
+
+def map_xp_record(level, xp, total):
+    """Map an imported record onto our level curve. Returns (level, xp, total_xp).
+
+    An absolute total wins; otherwise level + progress is kept as-is (progress
+    clamped into the level), and a bare XP figure is treated as a total.
+    """
+    if total is None and level is None:
+        total = xp
+    if total is not None:
+        level, xp = level_for_total_xp(total)
+        return level, xp, total_xp_for(level, xp)
+    level = max(0, level)
+    xp = min(max(0, xp or 0), xp_for_level(level) - 1)
+    return level, xp, total_xp_for(level, xp)
+
 
 class LevelRewardView(discord.ui.View):
     def __init__(self, cog):
@@ -45,12 +103,13 @@ class LevelRewardView(discord.ui.View):
         
         self.cog.bot.db.execute("INSERT OR REPLACE INTO level_roles (guild_id, level, role_id) VALUES (?, ?, ?)", 
                   (interaction.guild.id, self.selected_level, self.selected_role.id))
+        self.cog.load_rewards(interaction.guild.id)
         
         await interaction.followup.send(f"✅ Set **{self.selected_role.name}** for **Level {self.selected_level}**.", ephemeral=True)
 
     @discord.ui.button(label="View Config", style=discord.ButtonStyle.grey)
     async def view_config(self, interaction: discord.Interaction, button: discord.ui.Button):
-        results = self.cog.bot.db.fetchall("SELECT level, role_id FROM level_roles WHERE guild_id = ? ORDER BY level", (interaction.guild.id,))
+        results = sorted(self.cog.rewards.get(interaction.guild.id, {}).items())
         
         if not results:
              return await interaction.response.send_message("No level rewards configured.", ephemeral=True)
@@ -65,13 +124,423 @@ class LevelRewardView(discord.ui.View):
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
 
+class LeaderboardView(discord.ui.View):
+    """Pages through a guild's leaderboard with keyset cursors, so deep pages cost the same as the first."""
+
+    def __init__(self, cog, guild, author_id):
+        super().__init__(timeout=180)
+        self.cog = cog
+        self.guild = guild
+        self.author_id = author_id
+        # Cursor (total_xp, user_id) of the row before each page's first row; None for page 1
+        self.page_starts = [None]
+        self.rows = []
+        self.ranked = 0
+
+    def load(self):
+        snapshot = self.cog.get_leaderboard(self.guild.id)
+        self.ranked = snapshot["ranked"]
+        page = len(self.page_starts)
+        start = (page - 1) * LEADERBOARD_PAGE_SIZE
+        # Pages inside the cached top N are served from the snapshot; deeper ones use keyset queries
+        if start + LEADERBOARD_PAGE_SIZE <= len(snapshot["rows"]) or len(snapshot["rows"]) < LEADERBOARD_SNAPSHOT_SIZE:
+            self.rows = snapshot["rows"][start:start + LEADERBOARD_PAGE_SIZE]
+        else:
+            self.rows = self.cog.fetch_leaderboard_page(self.guild.id, self.page_starts[-1])
+        self.previous.disabled = page == 1
+        self.next.disabled = page * LEADERBOARD_PAGE_SIZE >= self.ranked
+
+    def build_embed(self):
+        embed = discord.Embed(title=f"Leaderboard - {self.guild.name}", color=discord.Color.gold())
+        first = (len(self.page_starts) - 1) * LEADERBOARD_PAGE_SIZE + 1
+        description = ""
+        for i, (user_id, level, xp, total) in enumerate(self.rows, first):
+            description += f"**{i}.** <@{user_id}> - Level {level} ({xp} XP · {total:,} total)\n"
+        embed.description = description or "No more members."
+        pages = max(1, -(-self.ranked // LEADERBOARD_PAGE_SIZE))
+        embed.set_footer(text=f"Page {len(self.page_starts)} of {pages:,} · {self.ranked:,} ranked members")
+        return embed
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.author_id:
+            await interaction.response.send_message("Run `/leaderboard` yourself to browse pages.", ephemeral=True)
+            return False
+        return True
+
+    @discord.ui.button(label="◀ Previous", style=discord.ButtonStyle.grey)
+    async def previous(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if len(self.page_starts) > 1:
+            self.page_starts.pop()
+        self.load()
+        await interaction.response.edit_message(embed=self.build_embed(), view=self)
+
+    @discord.ui.button(label="Next ▶", style=discord.ButtonStyle.grey)
+    async def next(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if self.rows:
+            last = self.rows[-1]
+            self.page_starts.append((last[3], last[0]))
+        self.load()
+        await interaction.response.edit_message(embed=self.build_embed(), view=self)
+
+
 class Leveling(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.cooldowns = {}
+        self.logger = logging.getLogger("Leveling")
+        # XP cooldowns keyed (user_id, guild_id); idle entries expire on their own
+        self.cooldowns = ExpiringCooldowns(DEFAULT_XP_COOLDOWN)
+        # Per-guild settings: {guild_id: (cooldown seconds, voice XP per minute)}
+        self.guild_settings = {}
+
+        # Write-behind XP cache: {(guild_id, user_id): [xp, level, last_touched]}
+        self.xp_cache = {}
+        # Keys whose cached XP hasn't been written to the database yet
+        self.xp_dirty = set()
+
+        # Downloaded avatars: {avatar_key: png bytes}, and finished cards: {card key: png bytes}
+        self.avatar_cache = OrderedDict()
+        self.card_cache = OrderedDict()
+
+        # Top-N leaderboard snapshots: {guild_id: {"rows", "ranked", "taken_at", "image"}}
+        self.leaderboards = {}
+
+        # Level reward roles: {guild_id: {level: role_id}}
+        self.rewards = {}
+        self._load_all_rewards()
+
+        # Voice sessions keyed (guild_id, user_id); events are ignored until the startup scan has run
+        self.voice = VoiceTracker()
+        self.voice_ready = False
+
+        self.xp_flush_loop.start()
+        self.voice_flush_loop.start()
+
+    def cog_unload(self):
+        self.xp_flush_loop.cancel()
+        self.voice_flush_loop.cancel()
+        if self.voice_ready:
+            self.snapshot_voice(time.time())
+        self.flush_xp()
 
     def get_xp_for_level(self, level):
-        return (level + 1) * 100
+        return xp_for_level(level)
+
+    def get_settings(self, guild_id):
+        """Return the guild's (cooldown, voice XP per minute), cached after the first lookup."""
+        settings = self.guild_settings.get(guild_id)
+        if settings is None:
+            result = self.bot.db.fetchone(
+                "SELECT cooldown, voice_xp FROM leveling_settings WHERE guild_id = ?", (guild_id,)
+            )
+            settings = (
+                result[0] if result and result[0] is not None else DEFAULT_XP_COOLDOWN,
+                result[1] if result and result[1] is not None else DEFAULT_VOICE_XP,
+            )
+            self.guild_settings[guild_id] = settings
+        return settings
+
+    def get_cooldown(self, guild_id):
+        return self.get_settings(guild_id)[0]
+
+    # -------------------------------------------------------------------------
+    # XP cache
+    # -------------------------------------------------------------------------
+
+    def get_xp(self, guild_id, user_id):
+        """Return the cached [xp, level, last_touched] entry for a member, loading it if needed. None if no XP yet."""
+        key = (guild_id, user_id)
+        entry = self.xp_cache.get(key)
+        if entry is None:
+            result = self.bot.db.fetchone(
+                "SELECT xp, level FROM levels WHERE user_id = ? AND guild_id = ?", (user_id, guild_id)
+            )
+            if not result:
+                return None
+            entry = [result[0], result[1], time.time()]
+            self.xp_cache[key] = entry
+        return entry
+
+    def add_xp(self, guild_id, user_id, amount):
+        """Add XP to a member's cached entry, applying any level-ups. Returns (old_level, new_level)."""
+        key = (guild_id, user_id)
+        entry = self.get_xp(guild_id, user_id)
+        if entry is None:
+            entry = [0, 0, 0]
+            self.xp_cache[key] = entry
+        entry[0] += amount
+        entry[2] = time.time()
+        self.xp_dirty.add(key)
+
+        old_level = entry[1]
+        while entry[0] >= self.get_xp_for_level(entry[1]):
+            entry[0] -= self.get_xp_for_level(entry[1])
+            entry[1] += 1
+        if entry[1] != old_level:
+            self._touch_leaderboard(guild_id, entry[1], entry[0])
+        return old_level, entry[1]
+
+    async def announce_level_up(self, member, channel, old_level, new_level):
+        # Roles are granted first so a failed announcement can't cost the member their rewards
+        roles = await self.grant_rewards(member, old_level, new_level)
+        await channel.send(f"🎉 {member.mention} has leveled up to **Level {new_level}**!")
+
+        # Check for role rewards
+        if roles:
+            names = ", ".join(f"**{r.name}**" for r in roles)
+            await channel.send(f"🏆 You have been awarded the {names} role{'s' if len(roles) > 1 else ''}!")
+
+    def flush_xp(self, guild_id=None):
+        """Write pending XP to the database in one batch, optionally only for one guild."""
+        keys = [k for k in self.xp_dirty if guild_id is None or k[0] == guild_id]
+        if keys:
+            self.bot.db.executemany(
+                '''INSERT INTO levels (user_id, guild_id, xp, level, total_xp) VALUES (?, ?, ?, ?, ?)
+                   ON CONFLICT(user_id, guild_id) DO UPDATE SET
+                       xp = excluded.xp, level = excluded.level, total_xp = excluded.total_xp''',
+                [
+                    (k[1], k[0], self.xp_cache[k][0], self.xp_cache[k][1],
+                     total_xp_for(self.xp_cache[k][1], self.xp_cache[k][0]))
+                    for k in keys
+                ],
+            )
+            self.xp_dirty.difference_update(keys)
+
+        if guild_id is None:
+            cutoff = time.time() - XP_CACHE_IDLE_SECONDS
+            for key in [k for k, e in self.xp_cache.items() if e[2] < cutoff and k not in self.xp_dirty]:
+                del self.xp_cache[key]
+
+    def invalidate_guild(self, guild_id):
+        """Drop cached state for a guild whose levels or rewards were rewritten directly (e.g. a backup restore)."""
+        for key in [k for k in self.xp_cache if k[0] == guild_id]:
+            del self.xp_cache[key]
+            self.xp_dirty.discard(key)
+        self.leaderboards.pop(guild_id, None)
+        self.load_rewards(guild_id)
+
+    # -------------------------------------------------------------------------
+    # Level rewards
+    # -------------------------------------------------------------------------
+
+    def _load_all_rewards(self):
+        self.rewards = {}
+        for guild_id, level, role_id in self.bot.db.fetchall("SELECT guild_id, level, role_id FROM level_roles"):
+            self.rewards.setdefault(guild_id, {})[level] = role_id
+
+    def load_rewards(self, guild_id):
+        rows = self.bot.db.fetchall("SELECT level, role_id FROM level_roles WHERE guild_id = ?", (guild_id,))
+        if rows:
+            self.rewards[guild_id] = dict(rows)
+        else:
+            self.rewards.pop(guild_id, None)
+
+    async def grant_rewards(self, member, old_level, new_level):
+        """Give every reward role for levels in (old_level, new_level] in one role edit. Returns the roles added."""
+        rewards = self.rewards.get(member.guild.id)
+        if not rewards or new_level <= old_level:
+            return []
+        roles = []
+        for level, role_id in rewards.items():
+            if old_level < level <= new_level:
+                role = member.guild.get_role(role_id)
+                if role and role not in member.roles:
+                    roles.append(role)
+        if not roles:
+            return []
+        try:
+            await member.add_roles(*roles, reason=f"Level {new_level} rewards")
+        except discord.HTTPException:
+            return []
+        return roles
+
+    def get_leaderboard(self, guild_id):
+        """Return the guild's top-N snapshot, re-querying it once it's older than the TTL.
+
+        A refresh that finds the same rows keeps the snapshot's rendered image,
+        so the image is only redrawn when the standings actually change.
+        """
+        now = time.time()
+        snapshot = self.leaderboards.get(guild_id)
+        if snapshot and now - snapshot["taken_at"] < LEADERBOARD_SNAPSHOT_TTL:
+            return snapshot
+
+        self.flush_xp(guild_id)
+        rows = self.bot.db.fetchall(
+            '''SELECT user_id, level, xp, total_xp FROM levels WHERE guild_id = ?
+               ORDER BY total_xp DESC, user_id LIMIT ?''',
+            (guild_id, LEADERBOARD_SNAPSHOT_SIZE),
+        )
+        ranked = self.bot.db.fetchone("SELECT COUNT(*) FROM levels WHERE guild_id = ?", (guild_id,))[0]
+
+        if snapshot and snapshot["rows"] == rows:
+            snapshot["ranked"] = ranked
+            snapshot["taken_at"] = now
+            return snapshot
+        snapshot = {"rows": rows, "ranked": ranked, "taken_at": now, "image": None}
+        self.leaderboards[guild_id] = snapshot
+        return snapshot
+
+    def _touch_leaderboard(self, guild_id, level, xp):
+        """Expire the guild's snapshot if a level-up has put this member into its top N."""
+        snapshot = self.leaderboards.get(guild_id)
+        if snapshot is None:
+            return
+        rows = snapshot["rows"]
+        if len(rows) < LEADERBOARD_SNAPSHOT_SIZE or total_xp_for(level, xp) >= rows[-1][3]:
+            snapshot["taken_at"] = 0
+
+    def get_rank(self, guild_id, user_id, level, xp):
+        """Return (position, ranked member count) with two counts over the (guild_id, total_xp, user_id) index."""
+        self.flush_xp(guild_id)
+        total = total_xp_for(level, xp)
+        ahead = self.bot.db.fetchone(
+            '''SELECT COUNT(*) FROM levels
+               WHERE guild_id = ? AND (total_xp > ? OR (total_xp = ? AND user_id < ?))''',
+            (guild_id, total, total, user_id),
+        )[0]
+        ranked = self.bot.db.fetchone("SELECT COUNT(*) FROM levels WHERE guild_id = ?", (guild_id,))[0]
+        return ahead + 1, ranked
+
+    def fetch_leaderboard_page(self, guild_id, after=None, limit=LEADERBOARD_PAGE_SIZE):
+        """One leaderboard page of (user_id, level, xp, total_xp), starting after the (total_xp, user_id) cursor."""
+        if after is None:
+            return self.bot.db.fetchall(
+                '''SELECT user_id, level, xp, total_xp FROM levels WHERE guild_id = ?
+                   ORDER BY total_xp DESC, user_id LIMIT ?''',
+                (guild_id, limit),
+            )
+        total, user_id = after
+        return self.bot.db.fetchall(
+            '''SELECT user_id, level, xp, total_xp FROM levels
+               WHERE guild_id = ? AND (total_xp < ? OR (total_xp = ? AND user_id > ?))
+               ORDER BY total_xp DESC, user_id LIMIT ?''',
+            (guild_id, total, total, user_id, limit),
+        )
+
+    def upsert_levels(self, rows, overwrite=True):
+        """Write (user_id, guild_id, xp, level, total_xp) rows in one transaction.
+
+        Without `overwrite`, a row only replaces an existing one with less total XP.
+        """
+        self.bot.db.executemany(
+            '''INSERT INTO levels (user_id, guild_id, xp, level, total_xp) VALUES (?, ?, ?, ?, ?)
+               ON CONFLICT(user_id, guild_id) DO UPDATE SET
+                   xp = excluded.xp, level = excluded.level, total_xp = excluded.total_xp'''
+            + ("" if overwrite else " WHERE excluded.total_xp > levels.total_xp"),
+            rows,
+        )
+
+    @tasks.loop(seconds=XP_FLUSH_SECONDS)
+    async def xp_flush_loop(self):
+        # Dirty keys are only cleared once written, so a failed flush is retried on the next tick
+        try:
+            self.flush_xp()
+        except Exception as e:
+            self.logger.error(f"Failed to write {len(self.xp_dirty)} pending XP entries, will retry: {e!r}")
+
+    @xp_flush_loop.before_loop
+    async def before_xp_flush_loop(self):
+        await self.bot.wait_until_ready()
+
+    # -------------------------------------------------------------------------
+    # Voice XP
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def voice_eligible(member, state):
+        """Whether time in this voice state earns XP: not in the AFK channel, muted or deafened."""
+        return not (
+            state.channel == member.guild.afk_channel
+            or state.self_mute or state.mute
+            or state.self_deaf or state.deaf
+        )
+
+    async def credit_voice(self, guild, user_id, xp, channel=None):
+        """Add voice XP, announcing level-ups in the voice channel's text chat when one is given."""
+        if xp <= 0:
+            return
+        old_level, new_level = self.add_xp(guild.id, user_id, xp)
+        member = guild.get_member(user_id)
+        if new_level == old_level or member is None:
+            return
+        if channel is None:
+            await self.grant_rewards(member, old_level, new_level)
+            return
+        try:
+            await self.announce_level_up(member, channel, old_level, new_level)
+        except discord.HTTPException:
+            pass  # Can't post in the voice chat; the level-up itself is already recorded
+
+    def snapshot_voice(self, now):
+        """Replace the stored session snapshot with the live sessions and their banked time."""
+        self.bot.db.execute("DELETE FROM voice_sessions", commit=False)
+        self.bot.db.executemany(
+            "INSERT INTO voice_sessions (guild_id, user_id, channel_id, banked) VALUES (?, ?, ?, ?)",
+            [(key[0], key[1], channel_id, banked) for key, channel_id, banked in self.voice.snapshot(now)],
+        )
+
+    async def restore_voice_sessions(self):
+        """Start sessions for everyone already in voice, then carry over time banked before the restart."""
+        now = time.time()
+        for guild in self.bot.guilds:
+            for channel in guild.voice_channels + guild.stage_channels:
+                for member in channel.members:
+                    if not member.bot and member.voice:
+                        self.voice.update((guild.id, member.id), channel.id, self.voice_eligible(member, member.voice), now)
+
+        stored = self.bot.db.fetchall("SELECT guild_id, user_id, banked FROM voice_sessions")
+        self.voice_ready = True
+        # Snapshot right away so the restored time can't be credited twice
+        orphaned = []
+        for guild_id, user_id, banked in stored:
+            if (guild_id, user_id) in self.voice:
+                self.voice.add_banked((guild_id, user_id), banked)
+            else:
+                orphaned.append((guild_id, user_id, banked))
+        self.snapshot_voice(now)
+
+        # Members who left voice while the bot was down get their banked time now
+        for guild_id, user_id, banked in orphaned:
+            guild = self.bot.get_guild(guild_id)
+            if guild:
+                try:
+                    await self.credit_voice(guild, user_id, int(banked / 60 * self.get_settings(guild_id)[1]))
+                except Exception as e:
+                    self.logger.error(f"Failed to credit restored voice XP to {user_id} in guild {guild_id}: {e!r}")
+
+    @tasks.loop(seconds=VOICE_FLUSH_SECONDS)
+    async def voice_flush_loop(self):
+        now = time.time()
+        for key, minutes in self.voice.drain(now).items():
+            guild = self.bot.get_guild(key[0])
+            if guild is None:
+                # The bot left the guild; no voice update will ever end this session
+                self.voice.update(key, None, False, now)
+                continue
+            channel = guild.get_channel(self.voice.channel_of(key))
+            # One member's failure mustn't stop the loop, which also snapshots every session
+            try:
+                await self.credit_voice(guild, key[1], minutes * self.get_settings(guild.id)[1], channel)
+            except Exception as e:
+                self.logger.error(f"Failed to credit voice XP to {key[1]} in guild {guild.id}: {e!r}")
+        self.snapshot_voice(now)
+
+    @voice_flush_loop.before_loop
+    async def before_voice_flush_loop(self):
+        await self.bot.wait_until_ready()
+        await self.restore_voice_sessions()
+
+    @commands.Cog.listener()
+    async def on_voice_state_update(self, member, before, after):
+        if member.bot or not self.voice_ready:
+            return
+        channel_id = after.channel.id if after.channel else None
+        eligible = channel_id is not None and self.voice_eligible(member, after)
+        banked = self.voice.update((member.guild.id, member.id), channel_id, eligible, time.time())
+        if banked:
+            # Session over: credit the remainder, partial minutes included
+            rate = self.get_settings(member.guild.id)[1]
+            await self.credit_voice(member.guild, member.id, int(banked / 60 * rate), before.channel)
 
     @commands.Cog.listener()
     async def on_message(self, message):
@@ -81,173 +550,305 @@ class Leveling(commands.Cog):
         user_id = message.author.id
         guild_id = message.guild.id
         
-        # Cooldown check (60 seconds)
-        key = (user_id, guild_id)
-        if key in self.cooldowns and time.time() - self.cooldowns[key] < 60:
+        # Cooldown check (per-guild, 60 seconds by default)
+        if not self.cooldowns.hit((user_id, guild_id), time.time(), self.get_cooldown(guild_id)):
             return
-        
-        self.cooldowns[key] = time.time()
 
-        # Add XP
+        # Add XP — in memory only; xp_flush_loop writes it back
         xp_gain = random.randint(15, 25)
-        
-        result = self.bot.db.fetchone("SELECT xp, level FROM levels WHERE user_id = ? AND guild_id = ?", (user_id, guild_id))
-        
-        if result:
-            current_xp, current_level = result
-            new_xp = current_xp + xp_gain
-            
-            xp_needed = self.get_xp_for_level(current_level)
-            if new_xp >= xp_needed:
-                new_level = current_level + 1
-                new_xp -= xp_needed
-                await message.channel.send(f"🎉 {message.author.mention} has leveled up to **Level {new_level}**!")
-                
-                # Check for role reward
-                role_result = self.bot.db.fetchone("SELECT role_id FROM level_roles WHERE guild_id = ? AND level = ?", (guild_id, new_level))
-                if role_result:
-                    role_id = role_result[0]
-                    role = message.guild.get_role(role_id)
-                    if role:
-                        try:
-                            await message.author.add_roles(role)
-                            await message.channel.send(f"🏆 You have been awarded the **{role.name}** role!")
-                        except discord.Forbidden:
-                            pass 
-
-            else:
-                new_level = current_level
-                
-            self.bot.db.execute("UPDATE levels SET xp = ?, level = ? WHERE user_id = ? AND guild_id = ?", 
-                      (new_xp, new_level, user_id, guild_id))
-        else:
-            self.bot.db.execute("INSERT INTO levels (user_id, guild_id, xp, level) VALUES (?, ?, ?, ?)", 
-                      (user_id, guild_id, xp_gain, 0))
+        old_level, new_level = self.add_xp(guild_id, user_id, xp_gain)
+        if new_level != old_level:
+            await self.announce_level_up(message.author, message.channel, old_level, new_level)
 
     @app_commands.command(name="rank", description="Check your current level and XP")
     async def rank(self, interaction: discord.Interaction, member: discord.Member = None):
         member = member or interaction.user
         
-        result = self.bot.db.fetchone("SELECT xp, level FROM levels WHERE user_id = ? AND guild_id = ?", (member.id, interaction.guild.id))
+        result = self.get_xp(interaction.guild.id, member.id)
         
         if result:
-            xp, level = result
+            xp, level = result[0], result[1]
             xp_needed = self.get_xp_for_level(level)
             
             await interaction.response.defer()
+            position, ranked = self.get_rank(interaction.guild.id, member.id, level, xp)
             try:
-                img_bytes = await self.generate_rank_card(member, xp, level, xp_needed)
+                img_bytes = await self.generate_rank_card(member, xp, level, xp_needed, position, ranked)
                 file = discord.File(fp=io.BytesIO(img_bytes), filename="rank.png")
                 await interaction.followup.send(file=file)
+            except PoolBusy:
+                await interaction.followup.send("🖌️ The renderer is busy right now, please try again in a few seconds.")
+            except asyncio.TimeoutError:
+                await interaction.followup.send("🖌️ Rendering took too long, please try again.")
             except Exception as e:
                 await interaction.followup.send(f"Error generating rank card: {e}")
                 
         else:
             await interaction.response.send_message(f"{member.mention} has not earned any XP yet.", ephemeral=True)
 
-    async def generate_rank_card(self, member, xp, level, xp_needed):
-        # Download Avatar
-        avatar_bytes = await member.display_avatar.with_format("png").read()
-        
-        # Run CPU-bound task in executor
-        fn = functools.partial(self._process_rank_card, member.name, member.discriminator, avatar_bytes, xp, level, xp_needed)
-        img_bytes = await self.bot.loop.run_in_executor(None, fn)
-        return img_bytes
-
-    def _process_rank_card(self, username, discriminator, avatar_bytes, xp, level, xp_needed):
-        width = 900
-        height = 250
-        
-        bg_color = (18, 18, 18) 
-        image = Image.new("RGB", (width, height), bg_color)
-        draw = ImageDraw.Draw(image)
+    async def generate_rank_card(self, member, xp, level, xp_needed, rank=None, ranked=None):
+        """Return rank card PNG bytes. Raises PoolBusy when the renderer is saturated."""
+        avatar = member.display_avatar
+        key = (member.id, member.name, xp, level, avatar.key, rank, ranked)
+        card = self.card_cache.get(key)
+        if card is not None:
+            self.card_cache.move_to_end(key)
+            return card
+
+        avatar_bytes = await self.fetch_avatar(avatar)
+
+        # Render in the dedicated renderer pool, sharing it fairly between guilds
+        card = await self.bot.renderer.run(
+            member.guild.id, render_rank_card, member.name, avatar.key, avatar_bytes, xp, level, xp_needed,
+            rank, ranked, timeout=RENDER_TIMEOUT,
+        )
+
+        self.card_cache[key] = card
+        if len(self.card_cache) > CARD_CACHE_SIZE:
+            self.card_cache.popitem(last=False)
+        return card
+
+    async def fetch_avatar(self, avatar):
+        """Download an avatar once per avatar hash, at the size the cards actually use."""
+        avatar_bytes = self.avatar_cache.get(avatar.key)
+        if avatar_bytes is None:
+            avatar_bytes = await avatar.with_format("png").with_size(AVATAR_FETCH_SIZE).read()
+            self.avatar_cache[avatar.key] = avatar_bytes
+            if len(self.avatar_cache) > AVATAR_CACHE_SIZE:
+                self.avatar_cache.popitem(last=False)
+        else:
+            self.avatar_cache.move_to_end(avatar.key)
+        return avatar_bytes
+
+    async def generate_leaderboard_image(self, guild):
+        """Return the top-10 leaderboard as PNG bytes, reusing the snapshot's image while it's unchanged."""
+        snapshot = self.get_leaderboard(guild.id)
+        if snapshot["image"] is not None:
+            return snapshot["image"]
+
+        entries = []
+        for position, (user_id, level, xp, total) in enumerate(snapshot["rows"][:LEADERBOARD_PAGE_SIZE], 1):
+            member = guild.get_member(user_id)
+            avatar_key = avatar_bytes = None
+            if member:
+                avatar_key = member.display_avatar.key
+                try:
+                    avatar_bytes = await self.fetch_avatar(member.display_avatar)
+                except discord.HTTPException:
+                    pass
+            name = member.display_name if member else f"User {user_id}"
+            entries.append((position, name, avatar_key, avatar_bytes, level, total))
+
+        image = await self.bot.renderer.run(
+            guild.id, render_leaderboard, f"Leaderboard - {guild.name}", entries, timeout=RENDER_TIMEOUT
+        )
+        snapshot["image"] = image
+        return image
+
+    @app_commands.command(name="leaderboard", description="Shows the server's XP leaderboard")
+    @app_commands.describe(image="Show the top 10 as an image instead of a paged list")
+    async def leaderboard(self, interaction: discord.Interaction, image: bool = False):
+        view = LeaderboardView(self, interaction.guild, interaction.user.id)
+        view.load()
         
-        avatar_size = 180
-        avatar_x = 40
-        avatar_y = 35
+        if not view.rows:
+            await interaction.response.send_message("No data found for this server.", ephemeral=True)
+            return
+
+        if image:
+            await interaction.response.defer()
+            try:
+                img_bytes = await self.generate_leaderboard_image(interaction.guild)
+                file = discord.File(fp=io.BytesIO(img_bytes), filename="leaderboard.png")
+                await interaction.followup.send(file=file)
+            except PoolBusy:
+                await interaction.followup.send("🖌️ The renderer is busy right now, please try again in a few seconds.")
+            except asyncio.TimeoutError:
+                await interaction.followup.send("🖌️ Rendering took too long, please try again.")
+            except Exception as e:
+                # Never leave the deferred interaction "thinking"; fall back to the text leaderboard
+                self.logger.error(f"Failed to render leaderboard for guild {interaction.guild.id}: {e!r}")
+                await interaction.followup.send(embed=view.build_embed(), view=view)
+            return
         
+        await interaction.response.send_message(embed=view.build_embed(), view=view)
+
+    @app_commands.command(name="xp_settings", description="View XP settings or change the XP cooldown and voice XP rate")
+    @app_commands.describe(
+        cooldown="Seconds between messages that earn XP (0 to disable)",
+        voice_xp="XP per minute spent in voice with others, unmuted (0 to disable)",
+    )
+    @app_commands.checks.has_permissions(administrator=True)
+    async def xp_settings(
+        self,
+        interaction: discord.Interaction,
+        cooldown: app_commands.Range[int, 0, MAX_XP_COOLDOWN] = None,
+        voice_xp: app_commands.Range[int, 0, MAX_VOICE_XP] = None,
+    ):
+        guild_id = interaction.guild.id
+        if cooldown is not None or voice_xp is not None:
+            current_cooldown, current_voice_xp = self.get_settings(guild_id)
+            settings = (
+                current_cooldown if cooldown is None else cooldown,
+                current_voice_xp if voice_xp is None else voice_xp,
+            )
+            self.bot.db.execute(
+                '''INSERT INTO leveling_settings (guild_id, cooldown, voice_xp) VALUES (?, ?, ?)
+                   ON CONFLICT(guild_id) DO UPDATE SET cooldown = excluded.cooldown, voice_xp = excluded.voice_xp''',
+                (guild_id, *settings),
+            )
+            self.guild_settings[guild_id] = settings
+
+        embed = discord.Embed(title="XP Settings", color=discord.Color.blue())
+        embed.add_field(name="Cooldown", value=f"{self.get_cooldown(guild_id)}s", inline=True)
+        embed.add_field(name="Voice XP", value=f"{self.get_settings(guild_id)[1]} XP/min", inline=True)
+        embed.add_field(
+            name="Cache",
+            value=(
+                f"Cooldowns: {len(self.cooldowns):,} ({self.cooldowns.memory_bytes() / 1024:.0f} KiB)\n"
+                f"XP entries: {len(self.xp_cache):,} ({len(self.xp_dirty):,} pending)\n"
+                f"Voice sessions: {len(self.voice):,}"
+            ),
+            inline=True,
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @app_commands.command(name="xp_import", description="Import XP records from another leveling bot")
+    @app_commands.describe(
+        file="CSV with a header row, or JSON lines (.gz accepted). Needs user_id plus total_xp, or level and xp.",
+        overwrite="Replace existing XP instead of keeping whichever is higher",
+        rewards="Also give imported members the reward roles for their level",
+    )
+    @app_commands.checks.has_permissions(administrator=True)
+    async def xp_import(self, interaction: discord.Interaction, file: discord.Attachment, overwrite: bool = False, rewards: bool = False):
+        guild = interaction.guild
+        await interaction.response.defer()
         try:
-            avatar_image = Image.open(io.BytesIO(avatar_bytes)).convert("RGBA")
-            avatar_image = avatar_image.resize((avatar_size, avatar_size), resample=Image.Resampling.LANCZOS)
-            
-            mask = Image.new("L", (avatar_size, avatar_size), 0)
-            mask_draw = ImageDraw.Draw(mask)
-            mask_draw.ellipse((0, 0, avatar_size, avatar_size), fill=255)
-            
-            output = ImageOps.fit(avatar_image, mask.size, centering=(0.5, 0.5))
-            output.putalpha(mask)
-            
-            image.paste(output, (avatar_x, avatar_y), output)
-        except Exception as e:
-            print(f"Error processing avatar: {e}")
+            stream = open_text(await file.read(), file.filename)
+        except (discord.HTTPException, OSError) as e:
+            return await interaction.followup.send(f"Couldn't read that file: {e}")
+
+        # Pending in-memory XP goes first so the import sees (and can override) it
+        self.flush_xp(guild.id)
+        progress = await interaction.followup.send("📥 Importing XP…", wait=True)
+        last_update = time.monotonic()
 
+        async def report(text):
+            nonlocal last_update
+            if time.monotonic() - last_update >= XP_PROGRESS_SECONDS:
+                last_update = time.monotonic()
+                try:
+                    await progress.edit(content=text)
+                except discord.HTTPException:
+                    pass
+
+        chunk = []
+        imported = 0
+        errors = []
+        error_count = 0
+        levels_by_user = {} if rewards else None
+
+        file_error = None
         try:
-            # Increased font sizes
-            font_name = ImageFont.truetype("arial.ttf", 60)
-            font_level_label = ImageFont.truetype("arial.ttf", 40)
-            font_level_val = ImageFont.truetype("arial.ttf", 100) 
-            font_xp = ImageFont.truetype("arial.ttf", 30)
-        except Exception as e:
-            print(f"Error loading fonts: {e}")
-            font_name = ImageFont.load_default()
-            font_level_label = ImageFont.load_default()
-            font_level_val = ImageFont.load_default()
-            font_xp = ImageFont.load_default()
+            for number, record, error in iter_records(stream):
+                if error is None:
+                    user_id, level, xp, total = record
+                    try:
+                        level, xp, total = map_xp_record(level, xp, total)
+                    except TypeError:
+                        error = "no level or XP values"
+                if error is not None:
+                    error_count += 1
+                    if len(errors) < 5:
+                        errors.append(f"line {number}: {error}")
+                    if error_count > XP_IMPORT_MAX_ERRORS and not imported and not chunk:
+                        return await progress.edit(content="❌ That doesn't look like an XP export:\n" + "\n".join(errors))
+                    continue
 
-        text_x = 260
-        
-        draw.text((text_x + 2, 45), username, font=font_name, fill=(255, 0, 0, 150))
-        draw.text((text_x - 2, 45), username, font=font_name, fill=(0, 255, 255, 150))
-        draw.text((text_x, 45), username, font=font_name, fill=(255, 255, 255))
-        
-        xp_text = f"{xp} / {xp_needed} XP"
-        draw.text((text_x, 105), xp_text, font=font_xp, fill=(150, 150, 150))
-        
-        level_val_text = str(level)
-        w_val = draw.textlength(level_val_text, font=font_level_val)
-        
-        level_label_text = "LEVEL"
-        w_label = draw.textlength(level_label_text, font=font_level_label)
-        
-        right_margin = 50
-        
-        draw.text((width - right_margin - w_val, 40), level_val_text, font=font_level_val, fill=(255, 255, 255))
-        draw.text((width - right_margin - w_val - w_label - 15, 65), level_label_text, font=font_level_label, fill=(100, 100, 100))
+                chunk.append((user_id, guild.id, xp, level, total))
+                if levels_by_user is not None:
+                    levels_by_user[user_id] = level
+                if len(chunk) >= XP_IMPORT_CHUNK:
+                    self.upsert_levels(chunk, overwrite)
+                    imported += len(chunk)
+                    chunk = []
+                    await report(f"📥 Importing XP… **{imported:,}** records so far")
+                    await asyncio.sleep(0)
+        except ImportFileError as e:
+            # Earlier chunks are already committed, so keep what was read and say where it stopped
+            file_error = str(e)
+            if not imported and not chunk:
+                return await progress.edit(content=f"❌ Couldn't read that file: {file_error}")
 
-        bar_x = 260
-        bar_y = 150
-        bar_w = 580
-        bar_h = 6
-        
-        draw.rectangle([bar_x, bar_y, bar_x + bar_w, bar_y + bar_h], fill=(40, 40, 40))
-        
-        progress = min(xp / xp_needed, 1.0)
-        fill_w = int(bar_w * progress)
-        
-        if fill_w > 0:
-            draw.rectangle([bar_x, bar_y, bar_x + fill_w, bar_y + bar_h], fill=(215, 0, 120))
+        if chunk:
+            self.upsert_levels(chunk, overwrite)
+            imported += len(chunk)
+        self.invalidate_guild(guild.id)
+
+        granted = 0
+        if levels_by_user:
+            for i, (user_id, level) in enumerate(levels_by_user.items(), 1):
+                member = guild.get_member(user_id)
+                if member and await self.grant_rewards(member, 0, level):
+                    granted += 1
+                await report(f"🏆 Granting rewards… {i:,}/{len(levels_by_user):,} members")
+
+        summary = f"✅ Imported **{imported:,}** XP records" + ("" if overwrite else " (kept higher existing XP)") + "."
+        if rewards:
+            summary += f"\n🏆 Gave reward roles to **{granted:,}** members."
+        if error_count:
+            summary += f"\n⚠️ Skipped **{error_count:,}** invalid lines:\n" + "\n".join(errors)
+        if file_error:
+            summary += f"\n❌ The file is {file_error}; nothing after that was imported."
+        try:
+            await progress.edit(content=summary)
+        except discord.HTTPException:
+            await interaction.channel.send(summary)
+
+    @app_commands.command(name="xp_export", description="Export this server's XP records")
+    @app_commands.describe(format="File format", compress="Gzip the file (for very large servers)")
+    @app_commands.choices(format=[
+        app_commands.Choice(name="CSV", value="csv"),
+        app_commands.Choice(name="JSON Lines", value="jsonl"),
+    ])
+    @app_commands.checks.has_permissions(administrator=True)
+    async def xp_export(self, interaction: discord.Interaction, format: app_commands.Choice[str] = None, compress: bool = False):
+        guild = interaction.guild
+        fmt = format.value if format else "csv"
+        await interaction.response.defer(ephemeral=True)
+        self.flush_xp(guild.id)
 
-        buffer = io.BytesIO()
-        image.save(buffer, format="PNG")
+        # Stream rank-ordered pages into a temp file so the table never sits in memory
+        buffer = tempfile.TemporaryFile()
+        raw = gzip.GzipFile(fileobj=buffer, mode="wb") if compress else buffer
+        text = io.TextIOWrapper(raw, encoding="utf-8", newline="")
+        after, count = None, 0
+        while True:
+            rows = self.fetch_leaderboard_page(guild.id, after, XP_EXPORT_CHUNK)
+            if not rows:
+                break
+            write_rows(text, rows, fmt, header=count == 0)
+            count += len(rows)
+            after = (rows[-1][3], rows[-1][0])
+            await asyncio.sleep(0)
+        text.flush()
+        text.detach()
+        if compress:
+            raw.close()
+
+        size = buffer.tell()
         buffer.seek(0)
-        return buffer.getvalue()
+        if size > guild.filesize_limit:
+            buffer.close()
+            hint = "" if compress else " Try again with `compress: True`."
+            return await interaction.followup.send(
+                f"The export is {size / 1024 / 1024:.1f} MB, over this server's upload limit.{hint}", ephemeral=True
+            )
 
-    @app_commands.command(name="leaderboard", description="Shows the top 10 users in the server")
-    async def leaderboard(self, interaction: discord.Interaction):
-        results = self.bot.db.fetchall("SELECT user_id, level, xp FROM levels WHERE guild_id = ? ORDER BY level DESC, xp DESC LIMIT 10", (interaction.guild.id,))
-        
-        if not results:
-            await interaction.response.send_message("No data found for this server.", ephemeral=True)
-            return
-        
-        embed = discord.Embed(title=f"Leaderboard - {interaction.guild.name}", color=discord.Color.gold())
-        
-        description = ""
-        for i, (user_id, level, xp) in enumerate(results, 1):
-            description += f"**{i}.** <@{user_id}> - Level {level} ({xp} XP)\n"
-            
-        embed.description = description
-        await interaction.response.send_message(embed=embed)
+        filename = f"xp-{guild.id}.{fmt}" + (".gz" if compress else "")
+        await interaction.followup.send(
+            f"📤 Exported **{count:,}** XP records.", file=discord.File(buffer, filename=filename), ephemeral=True
+        )
 
     @app_commands.command(name="setup_rewards", description="Configure level-up role rewards")
     @app_commands.checks.has_permissions(administrator=True)
@@ -1,61 +1,306 @@
+import asyncio
+import functools
+import heapq
+import logging
 import discord
-from discord.ext import commands, tasks
+from discord.ext import commands
 from discord import app_commands
 from datetime import datetime, timezone
 from utils.helpers import parse_duration, format_duration
+from utils.recipients import RecipientCache
+from utils.recurrence import CronError, CronSchedule, next_interval_fire
 
 
-MAX_REMINDERS_PER_USER = 5
+MAX_REMINDERS_PER_USER = 25
 MAX_DURATION_SECONDS = 365 * 24 * 3600  # 1 year
+# Shortest repeat interval for recurring reminders
+MIN_REPEAT_SECONDS = 300
+REMINDERS_PAGE_SIZE = 10
+# Fetched users and opened DM channels are reused this long; deleted accounts are remembered longer
+RECIPIENT_TTL = 3600
+RECIPIENT_NEGATIVE_TTL = 86400
+
+# Due times are loaded into memory this far ahead; later reminders stay in the DB until their window comes up
+SCHEDULE_HORIZON = 3600
+# Reminders delivered at once, and the most taken off the heap per wakeup
+DELIVERY_CONCURRENCY = 10
+DELIVERY_BATCH = 500
+# After an error the dispatcher waits this long before carrying on
+DISPATCH_ERROR_BACKOFF = 5
+# A delivery that failed on a transient error is retried after this long, doubling each attempt
+DELIVERY_RETRY_SECONDS = 60
+MAX_DELIVERY_ATTEMPTS = 5
+
+# deliver() result: the reminder couldn't be sent right now and should be tried again
+RETRY = object()
 
 
 def format_timestamp(ts: float) -> str:
     return f"<t:{int(ts)}:R>"
 
 
+@functools.lru_cache(maxsize=1024)
+def cron_schedule(expression: str) -> CronSchedule:
+    """Parsed schedules are shared, so a burst of reminders on the same expression parses it once."""
+    return CronSchedule(expression)
+
+
+def describe_repeat(interval, cron) -> str | None:
+    if interval:
+        return f"every {format_duration(interval)}"
+    if cron:
+        return f"`{cron}` (UTC)"
+    return None
+
+
+class ReminderListView(discord.ui.View):
+    """Pages through a member's reminders with (fire_at, id) cursors."""
+
+    def __init__(self, cog, user_id, guild_id):
+        super().__init__(timeout=180)
+        self.cog = cog
+        self.user_id = user_id
+        self.guild_id = guild_id
+        # Cursor (fire_at, id) of the row before each page's first row; None for page 1
+        self.page_starts = [None]
+        self.rows = []
+        self.total = 0
+
+    def load(self):
+        after = self.page_starts[-1]
+        query = "SELECT id, message, fire_at, deliver_dm, interval, cron FROM reminders WHERE user_id = ? AND guild_id = ?"
+        params = [self.user_id, self.guild_id]
+        if after is not None:
+            query += " AND (fire_at > ? OR (fire_at = ? AND id > ?))"
+            params += [after[0], after[0], after[1]]
+        self.rows = self.cog.db.fetchall(query + " ORDER BY fire_at, id LIMIT ?", (*params, REMINDERS_PAGE_SIZE))
+        self.total = self.cog.db.fetchone(
+            "SELECT COUNT(*) FROM reminders WHERE user_id = ? AND guild_id = ?", (self.user_id, self.guild_id)
+        )[0]
+        page = len(self.page_starts)
+        self.previous.disabled = page == 1
+        self.next.disabled = page * REMINDERS_PAGE_SIZE >= self.total
+        return self.rows
+
+    def build_embed(self):
+        embed = discord.Embed(
+            title="⏰ Your Pending Reminders",
+            color=discord.Color.yellow(),
+        )
+        for row_id, message, fire_at, deliver_dm, interval, cron in self.rows:
+            delivery = "DM" if deliver_dm else "Channel"
+            short_msg = message if len(message) <= 60 else message[:57] + "..."
+            value = f"`{short_msg}`\nDelivery: {delivery}"
+            repeat = describe_repeat(interval, cron)
+            if repeat:
+                value += f" · Repeats {repeat}"
+            embed.add_field(
+                name=f"#{row_id} — {format_timestamp(fire_at)}",
+                value=value,
+                inline=False,
+            )
+        pages = max(1, -(-self.total // REMINDERS_PAGE_SIZE))
+        embed.set_footer(
+            text=f"Page {len(self.page_starts)} of {pages} · {self.total}/{MAX_REMINDERS_PER_USER} reminders used"
+        )
+        return embed
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return interaction.user.id == self.user_id
+
+    @discord.ui.button(label="◀ Previous", style=discord.ButtonStyle.grey)
+    async def previous(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if len(self.page_starts) > 1:
+            self.page_starts.pop()
+        self.load()
+        await interaction.response.edit_message(embed=self.build_embed(), view=self)
+
+    @discord.ui.button(label="Next ▶", style=discord.ButtonStyle.grey)
+    async def next(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if self.rows:
+            last = self.rows[-1]
+            self.page_starts.append((last[2], last[0]))
+        self.load()
+        await interaction.response.edit_message(embed=self.build_embed(), view=self)
+
+
 class Reminders(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.db = bot.db
-        self.reminder_loop.start()
+        # Due times inside the loaded window: [(fire_at, reminder_id)]. Cancelled ids are skipped when they pop.
+        self._heap: list[tuple[float, int]] = []
+        # Everything due up to here is in the heap; the first window also picks up reminders overdue from downtime
+        self._loaded_until = float("-inf")
+        self._wakeup = asyncio.Event()
+        self._delivery_slots = asyncio.Semaphore(DELIVERY_CONCURRENCY)
+        self._deliveries: set[asyncio.Task] = set()
+        self._dispatcher = None
+        # Failed delivery attempts per reminder id, cleared once it's delivered or given up on
+        self._attempts: dict[int, int] = {}
+        self.logger = logging.getLogger("Reminders")
+        self.recipients = RecipientCache(bot, ttl=RECIPIENT_TTL, negative_ttl=RECIPIENT_NEGATIVE_TTL)
+
+    async def cog_load(self):
+        self._dispatcher = asyncio.create_task(self.dispatch_loop())
 
     def cog_unload(self):
-        self.reminder_loop.cancel()
+        if self._dispatcher:
+            self._dispatcher.cancel()
+        for task in self._deliveries:
+            task.cancel()
+
+    @staticmethod
+    def now() -> float:
+        return datetime.now(timezone.utc).timestamp()
 
     # -------------------------------------------------------------------------
-    # Background task
+    # Dispatcher
     # -------------------------------------------------------------------------
 
-    @tasks.loop(seconds=30)
-    async def reminder_loop(self):
-        now = datetime.now(timezone.utc).timestamp()
-        due = self.db.fetchall(
-            "SELECT id, user_id, guild_id, channel_id, message, deliver_dm FROM reminders WHERE fire_at <= ?",
-            (now,),
+    def schedule(self, reminder_id: int, fire_at: float):
+        """Track a newly stored reminder, waking the dispatcher if it's now the earliest one."""
+        if fire_at > self._loaded_until:
+            return  # Picked up when the window reaches it
+        heapq.heappush(self._heap, (fire_at, reminder_id))
+        if self._heap[0][1] == reminder_id:
+            self._wakeup.set()
+
+    def _load_window(self, now: float):
+        until = now + SCHEDULE_HORIZON
+        rows = self.db.fetchall(
+            "SELECT fire_at, id FROM reminders WHERE fire_at > ? AND fire_at <= ? ORDER BY fire_at",
+            (self._loaded_until, until),
         )
+        for row in rows:
+            heapq.heappush(self._heap, row)
+        self._loaded_until = until
 
-        for row_id, user_id, guild_id, channel_id, message, deliver_dm in due:
-            self.db.execute("DELETE FROM reminders WHERE id = ?", (row_id,))
+    async def dispatch_loop(self):
+        """Sleep until the earliest reminder is due, then hand every due reminder to a delivery task."""
+        await self.bot.wait_until_ready()
+        while True:
+            try:
+                await self._dispatch_once()
+            except Exception as e:
+                # A failed window load is simply retried; the dispatcher itself must never die
+                self.logger.error(f"Reminder dispatcher error: {e!r}")
+                await asyncio.sleep(DISPATCH_ERROR_BACKOFF)
 
-            user = self.bot.get_user(user_id)
-            if user is None:
-                try:
-                    user = await self.bot.fetch_user(user_id)
-                except discord.NotFound:
+    async def _dispatch_once(self):
+        now = self.now()
+        if now >= self._loaded_until:
+            self._load_window(now)
+
+        due = []
+        while self._heap and self._heap[0][0] <= now and len(due) < DELIVERY_BATCH:
+            due.append(heapq.heappop(self._heap)[1])
+        if due:
+            task = asyncio.create_task(self.deliver_batch(due))
+            self._deliveries.add(task)
+            task.add_done_callback(self._deliveries.discard)
+            return
+
+        next_at = min(self._heap[0][0], self._loaded_until) if self._heap else self._loaded_until
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=max(0.0, next_at - now))
+        except asyncio.TimeoutError:
+            pass
+
+    def next_fire(self, fire_at, interval, cron, now):
+        """When a recurring reminder fires next, or None for one-shot reminders."""
+        if interval:
+            return next_interval_fire(fire_at, interval, now)
+        if cron:
+            try:
+                return cron_schedule(cron).next_after(now)
+            except CronError:
+                return None
+        return None
+
+    async def deliver_batch(self, reminder_ids: list[int]):
+        try:
+            await self._deliver_batch(reminder_ids)
+        except Exception as e:
+            # The ids are already off the heap; put them back so they aren't lost until a restart
+            self.logger.error(f"Reminder delivery batch failed, retrying: {e!r}")
+            retry_at = self.now() + DISPATCH_ERROR_BACKOFF
+            for reminder_id in reminder_ids:
+                heapq.heappush(self._heap, (retry_at, reminder_id))
+            self._wakeup.set()
+
+    async def _deliver_batch(self, reminder_ids: list[int]):
+        placeholders = ", ".join("?" * len(reminder_ids))
+        # A reminder waiting on a retry keeps the slot it was originally due in
+        rows = self.db.fetchall(
+            f"""SELECT id, user_id, guild_id, channel_id, message, deliver_dm, COALESCE(slot, fire_at), interval, cron
+                FROM reminders WHERE id IN ({placeholders})""",
+            reminder_ids,
+        )
+        # Ids missing here were cancelled after they were scheduled
+        results = await asyncio.gather(*(self.deliver(*row[:6], repeat=describe_repeat(*row[7:])) for row in rows),
+                                       return_exceptions=True)
+
+        # Recurring reminders move to their next slot; the rest (and those whose owner is gone) are removed
+        now = self.now()
+        finished, rescheduled = [], []
+        for row, result in zip(rows, results):
+            if isinstance(result, Exception):
+                self.logger.warning(f"Reminder #{row[0]} delivery failed: {result!r}")
+                result = RETRY
+            if result is RETRY:
+                attempts = self._attempts.get(row[0], 0) + 1
+                if attempts < MAX_DELIVERY_ATTEMPTS:
+                    self._attempts[row[0]] = attempts
+                    rescheduled.append((now + DELIVERY_RETRY_SECONDS * 2 ** (attempts - 1), row[6], row[0]))
                     continue
+                self.logger.warning(f"Giving up on reminder #{row[0]} after {attempts} attempts")
+            self._attempts.pop(row[0], None)
+
+            next_at = self.next_fire(row[6], row[7], row[8], now) if result is not False else None
+            if next_at is None:
+                finished.append(row[0])
+            else:
+                rescheduled.append((next_at, None, row[0]))
+        if rescheduled:
+            self.db.executemany(
+                "UPDATE reminders SET fire_at = ?, slot = ? WHERE id = ?", rescheduled, commit=not finished
+            )
+            for next_at, _, row_id in rescheduled:
+                self.schedule(row_id, next_at)
+        if finished:
+            self.db.execute(f"DELETE FROM reminders WHERE id IN ({', '.join('?' * len(finished))})", finished)
+
+    async def deliver(self, row_id, user_id, guild_id, channel_id, message, deliver_dm, repeat=None):
+        """Send one reminder. Returns False if its owner's account no longer exists, RETRY on a transient failure."""
+        async with self._delivery_slots:
+            try:
+                user = await self.recipients.get_user(user_id)
+            except discord.HTTPException:
+                return RETRY
+            if user is None:
+                return False
 
             embed = discord.Embed(
                 title="⏰ Reminder!",
                 description=message,
                 color=discord.Color.yellow(),
             )
-            embed.set_footer(text=f"Reminder #{row_id}")
+            embed.set_footer(text=f"Reminder #{row_id}" + (f" · repeats {repeat.replace('`', '')}" if repeat else ""))
 
             if deliver_dm:
                 try:
-                    await user.send(embed=embed)
+                    channel = await self.recipients.dm_channel(user)
+                    await channel.send(embed=embed)
                 except discord.Forbidden:
                     pass
+                except discord.NotFound:
+                    # The cached DM channel is gone; resolve the user and channel afresh next attempt
+                    self.recipients.forget(user_id)
+                    return RETRY
+                except discord.HTTPException:
+                    return RETRY
             else:
                 channel = self.bot.get_channel(channel_id)
                 if channel:
@@ -63,10 +308,8 @@ class Reminders(commands.Cog):
                         await channel.send(content=user.mention, embed=embed)
                     except discord.Forbidden:
                         pass
-
-    @reminder_loop.before_loop
-    async def before_reminder_loop(self):
-        await self.bot.wait_until_ready()
+                    except discord.HTTPException:
+                        return RETRY
 
     # -------------------------------------------------------------------------
     # Commands
@@ -105,34 +348,18 @@ class Reminders(commands.Cog):
             )
             return
 
-        # Check cap
-        count = self.db.fetchone(
-            "SELECT COUNT(*) FROM reminders WHERE user_id = ? AND guild_id = ?",
-            (interaction.user.id, interaction.guild.id),
-        )[0]
-        if count >= MAX_REMINDERS_PER_USER:
-            await interaction.response.send_message(
-                f"❌ You already have **{MAX_REMINDERS_PER_USER}** pending reminders. Cancel one with `/reminders_cancel` first.",
-                ephemeral=True,
-            )
-            return
-
-        # Validate message length
-        if len(message) > 500:
-            await interaction.response.send_message(
-                "❌ Reminder message must be 500 characters or fewer.",
-                ephemeral=True,
-            )
+        if not await self._check_new_reminder(interaction, message):
             return
 
         now = datetime.now(timezone.utc).timestamp()
         fire_at = now + total_seconds
         deliver_dm = 1 if delivery.value == "dm" else 0
 
-        self.db.execute(
+        cursor = self.db.execute(
             "INSERT INTO reminders (user_id, guild_id, channel_id, message, fire_at, deliver_dm) VALUES (?, ?, ?, ?, ?, ?)",
             (interaction.user.id, interaction.guild.id, interaction.channel.id, message, fire_at, deliver_dm),
         )
+        self.schedule(cursor.lastrowid, fire_at)
 
         delivery_text = "via DM" if deliver_dm else f"in {interaction.channel.mention}"
         duration_text = format_duration(total_seconds)
@@ -147,32 +374,103 @@ class Reminders(commands.Cog):
         embed.add_field(name="Delivery", value=delivery_text, inline=True)
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
-    @app_commands.command(name="reminders_list", description="View all your pending reminders.")
-    async def reminders_list(self, interaction: discord.Interaction):
-        rows = self.db.fetchall(
-            "SELECT id, message, fire_at, deliver_dm FROM reminders WHERE user_id = ? AND guild_id = ? ORDER BY fire_at ASC",
-            (interaction.user.id, interaction.guild.id),
-        )
+    @app_commands.command(name="remind_every", description="Set a recurring reminder. (e.g. schedule: 1d  or  0 9 * * 1-5)")
+    @app_commands.describe(
+        schedule="An interval (e.g. 6h, 1d, 1w) or a cron expression in UTC (e.g. 0 9 * * 1-5)",
+        message="What to remind you about",
+        delivery="Where to deliver the reminder",
+    )
+    @app_commands.choices(delivery=[
+        app_commands.Choice(name="DM me", value="dm"),
+        app_commands.Choice(name="Here (this channel)", value="channel"),
+    ])
+    async def remind_every(
+        self,
+        interaction: discord.Interaction,
+        schedule: str,
+        message: str,
+        delivery: app_commands.Choice[str],
+    ):
+        now = datetime.now(timezone.utc).timestamp()
+        interval = parse_duration(schedule)
+        cron = None
+        if interval is not None:
+            if not MIN_REPEAT_SECONDS <= interval <= MAX_DURATION_SECONDS:
+                await interaction.response.send_message(
+                    f"❌ Repeat interval must be between **{format_duration(MIN_REPEAT_SECONDS)}** and **1 year**.",
+                    ephemeral=True,
+                )
+                return
+            fire_at = now + interval
+        else:
+            try:
+                cron = cron_schedule(schedule).expression
+                fire_at = cron_schedule(cron).next_after(now)
+            except CronError as e:
+                await interaction.response.send_message(
+                    f"❌ Invalid schedule ({e}). Use an interval like `6h` or `1d`, "
+                    "or a cron expression like `0 9 * * 1-5` (minute hour day month weekday, UTC).",
+                    ephemeral=True,
+                )
+                return
+            if cron_schedule(cron).shortest_gap() < MIN_REPEAT_SECONDS:
+                await interaction.response.send_message(
+                    f"❌ That schedule fires more often than every **{format_duration(MIN_REPEAT_SECONDS)}**.",
+                    ephemeral=True,
+                )
+                return
 
-        if not rows:
-            await interaction.response.send_message("You have no pending reminders.", ephemeral=True)
+        if not await self._check_new_reminder(interaction, message):
             return
 
+        deliver_dm = 1 if delivery.value == "dm" else 0
+        cursor = self.db.execute(
+            """INSERT INTO reminders (user_id, guild_id, channel_id, message, fire_at, deliver_dm, interval, cron)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+            (interaction.user.id, interaction.guild.id, interaction.channel.id, message, fire_at, deliver_dm, interval, cron),
+        )
+        self.schedule(cursor.lastrowid, fire_at)
+
+        delivery_text = "via DM" if deliver_dm else f"in {interaction.channel.mention}"
         embed = discord.Embed(
-            title="⏰ Your Pending Reminders",
+            title="🔁 Recurring Reminder Set!",
+            description=f"**{message}**",
             color=discord.Color.yellow(),
         )
-        for row_id, message, fire_at, deliver_dm in rows:
-            delivery = "DM" if deliver_dm else "Channel"
-            short_msg = message if len(message) <= 60 else message[:57] + "..."
-            embed.add_field(
-                name=f"#{row_id} — {format_timestamp(fire_at)}",
-                value=f"`{short_msg}`\nDelivery: {delivery}",
-                inline=False,
-            )
-        embed.set_footer(text=f"{len(rows)}/{MAX_REMINDERS_PER_USER} reminders used")
+        embed.add_field(name="Repeats", value=describe_repeat(interval, cron), inline=True)
+        embed.add_field(name="First fires", value=format_timestamp(fire_at), inline=True)
+        embed.add_field(name="Delivery", value=delivery_text, inline=True)
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
+    async def _check_new_reminder(self, interaction: discord.Interaction, message: str) -> bool:
+        """Enforce the per-member cap and message length, replying with the error if either fails."""
+        count = self.db.fetchone(
+            "SELECT COUNT(*) FROM reminders WHERE user_id = ? AND guild_id = ?",
+            (interaction.user.id, interaction.guild.id),
+        )[0]
+        if count >= MAX_REMINDERS_PER_USER:
+            await interaction.response.send_message(
+                f"❌ You already have **{MAX_REMINDERS_PER_USER}** pending reminders. Cancel one with `/reminders_cancel` first.",
+                ephemeral=True,
+            )
+            return False
+
+        if len(message) > 500:
+            await interaction.response.send_message(
+                "❌ Reminder message must be 500 characters or fewer.",
+                ephemeral=True,
+            )
+            return False
+        return True
+
+    @app_commands.command(name="reminders_list", description="View all your pending reminders.")
+    async def reminders_list(self, interaction: discord.Interaction):
+        view = ReminderListView(self, interaction.user.id, interaction.guild.id)
+        if not view.load():
+            await interaction.response.send_message("You have no pending reminders.", ephemeral=True)
+            return
+        await interaction.response.send_message(embed=view.build_embed(), view=view, ephemeral=True)
+
     @app_commands.command(name="reminders_cancel", description="Cancel a pending reminder by its ID.")
     @app_commands.describe(reminder_id="The reminder ID (shown in /reminders_list)")
     async def reminders_cancel(self, interaction: discord.Interaction, reminder_id: int):
@@ -0,0 +1,58 @@
+"""Heavy AutoMod classifiers that run inside a WorkerPool.
+
+Everything here is a plain module-level function of picklable arguments so it
+can be shipped to a worker process. Workers are long-lived, so large inputs
+(like a guild's keyword list) are sent once per revision and cached per
+process instead of with every message.
+"""
+import re
+import unicodedata
+
+# A message with at least this many combining marks, averaging more than
+# ZALGO_MARKS_PER_LETTER per base character, is treated as zalgo text
+ZALGO_MIN_MARKS = 20
+ZALGO_MARKS_PER_LETTER = 1.0
+
+# Compiled keyword sets cached in this process: {key: (revision, pattern)}
+_keyword_cache = {}
+
+
+def compile_keywords(words) -> re.Pattern | None:
+    """One word-boundary alternation over already-normalized keywords, longest first."""
+    words = sorted({w for w in words if w}, key=len, reverse=True)
+    if not words:
+        return None
+    return re.compile(r"\b(?:" + "|".join(re.escape(w) for w in words) + r")\b")
+
+
+def scan_keywords(key, revision, text: str, words=None) -> str | None:
+    """Return the first keyword found in `text`, or None.
+
+    Raises KeyError when this process has no compiled set for (key, revision)
+    and `words` wasn't supplied; the caller should resubmit with the words.
+    """
+    cached = _keyword_cache.get(key)
+    if cached is None or cached[0] != revision:
+        if words is None:
+            raise KeyError(key)
+        cached = (revision, compile_keywords(words))
+        _keyword_cache[key] = cached
+
+    pattern = cached[1]
+    if pattern is None:
+        return None
+    match = pattern.search(text)
+    return match.group(0) if match else None
+
+
+def zalgo_marks(text: str) -> int:
+    """Return the number of combining marks if the text looks like zalgo, else 0."""
+    marks = letters = 0
+    for c in text:
+        if unicodedata.combining(c):
+            marks += 1
+        elif not c.isspace():
+            letters += 1
+    if marks >= ZALGO_MIN_MARKS and marks / max(letters, 1) > ZALGO_MARKS_PER_LETTER:
+        return marks
+    return 0
@@ -0,0 +1,55 @@
+import sys
+
+
+class ExpiringCooldowns:
+    """Per-key cooldowns that forget idle keys on their own.
+
+    Entries live in two dict generations. Every `period` seconds the older
+    generation is dropped wholesale and the current one becomes the old one,
+    so a key nobody has touched for two periods costs nothing — no sweeps,
+    no timers, and memory tracks the number of recently active keys rather
+    than every key ever seen. `period` grows to the longest cooldown window
+    asked for, so a window is never cut short by a rotation.
+    """
+
+    __slots__ = ("period", "rotated_at", "current", "previous")
+
+    def __init__(self, period: float = 60):
+        self.period = period
+        self.rotated_at = None
+        self.current = {}
+        self.previous = {}
+
+    def __len__(self) -> int:
+        return len(self.current) + len(self.previous)
+
+    def _rotate(self, now: float):
+        if self.rotated_at is None:
+            self.rotated_at = now
+            return
+        elapsed = now - self.rotated_at
+        if elapsed < self.period:
+            return
+        # Two or more periods idle means both generations have expired
+        self.previous = self.current if elapsed < self.period * 2 else {}
+        self.current = {}
+        self.rotated_at = now
+
+    def hit(self, key, now: float, window: float) -> bool:
+        """Start the key's cooldown and return True, or return False if it's still cooling down."""
+        if window > self.period:
+            self.period = window
+        self._rotate(now)
+
+        last = self.current.get(key)
+        if last is None:
+            last = self.previous.get(key)
+        if last is not None and now - last < window:
+            return False
+        self.current[key] = now
+        return True
+
+    def memory_bytes(self) -> int:
+        """Approximate memory held, counting the dicts plus a typical (int, int) key and float value per entry."""
+        entry = sys.getsizeof((0, 0)) + 2 * sys.getsizeof(1 << 60) + sys.getsizeof(0.0)
+        return sys.getsizeof(self.current) + sys.getsizeof(self.previous) + len(self) * entry
@@ -1,5 +1,6 @@
 import sqlite3
 import logging
+from utils.level_curve import total_xp_for
 
 class DatabaseManager:
     def __init__(self, db_name="bot_database.db"):
@@ -8,6 +9,8 @@ class DatabaseManager:
         self._conn = sqlite3.connect(self.db_name, check_same_thread=False)
         self._conn.execute("PRAGMA journal_mode=WAL")
         self._conn.execute("PRAGMA foreign_keys=ON")
+        # Lets SQL (e.g. the total_xp migration) compute total XP from the same curve as the leveling cog
+        self._conn.create_function("total_xp_for", 2, total_xp_for, deterministic=True)
         self.init_db()
 
     def init_db(self):
@@ -24,10 +27,28 @@ class DatabaseManager:
         # --- Leveling ---
         c.execute('''CREATE TABLE IF NOT EXISTS levels
                      (user_id INTEGER, guild_id INTEGER, xp INTEGER, level INTEGER,
+                      total_xp INTEGER DEFAULT 0,
                       PRIMARY KEY (user_id, guild_id))''')
+        try:
+            c.execute("ALTER TABLE levels ADD COLUMN total_xp INTEGER DEFAULT 0")
+            c.execute("UPDATE levels SET total_xp = total_xp_for(level, xp)")
+        except sqlite3.OperationalError:
+            pass
+        c.execute('''CREATE INDEX IF NOT EXISTS idx_levels_rank
+                     ON levels (guild_id, total_xp DESC, user_id)''')
         c.execute('''CREATE TABLE IF NOT EXISTS level_roles
                      (guild_id INTEGER, level INTEGER, role_id INTEGER,
                       PRIMARY KEY (guild_id, level))''')
+        c.execute('''CREATE TABLE IF NOT EXISTS leveling_settings
+                     (guild_id INTEGER PRIMARY KEY, cooldown INTEGER DEFAULT 60)''')
+        try:
+            c.execute("ALTER TABLE leveling_settings ADD COLUMN voice_xp INTEGER DEFAULT 10")
+        except sqlite3.OperationalError:
+            pass
+        # Live voice sessions, snapshotted so banked voice time survives a restart
+        c.execute('''CREATE TABLE IF NOT EXISTS voice_sessions
+                     (guild_id INTEGER, user_id INTEGER, channel_id INTEGER, banked REAL,
+                      PRIMARY KEY (guild_id, user_id))''')
 
         # --- Welcome ---
         c.execute('''CREATE TABLE IF NOT EXISTS welcome_config
@@ -49,7 +70,20 @@ class DatabaseManager:
         # --- Giveaways ---
         c.execute('''CREATE TABLE IF NOT EXISTS giveaways
                      (message_id INTEGER PRIMARY KEY, channel_id INTEGER,
-                      prize TEXT, end_time TIMESTAMP, winners_count INTEGER, status TEXT)''')
+                      prize TEXT, end_time TIMESTAMP, winners_count INTEGER, status TEXT,
+                      reconciled INTEGER DEFAULT 0)''')
+        # Set once an ended giveaway's ledger has been checked against its reactions
+        try:
+            c.execute("ALTER TABLE giveaways ADD COLUMN reconciled INTEGER DEFAULT 0")
+            # Giveaways that ended with a ledger were checked when they were drawn
+            c.execute('''UPDATE giveaways SET reconciled = 1 WHERE status = 'ended'
+                         AND message_id IN (SELECT message_id FROM giveaway_entries)''')
+        except sqlite3.OperationalError:
+            pass
+        # One row per entrant, recorded from reaction events as they happen
+        c.execute('''CREATE TABLE IF NOT EXISTS giveaway_entries
+                     (message_id INTEGER, user_id INTEGER,
+                      PRIMARY KEY (message_id, user_id))''')
 
         # --- Automod ---
         c.execute('''CREATE TABLE IF NOT EXISTS automod_settings
@@ -72,7 +106,19 @@ class DatabaseManager:
                       anti_repeat INTEGER DEFAULT 0,
                       repeat_count INTEGER DEFAULT 3,
                       punishments TEXT,
-                      exempt_channels TEXT)''')
+                      exempt_channels TEXT,
+                      raid_action TEXT DEFAULT 'none',
+                      raid_max_age INTEGER DEFAULT 0,
+                      raid_default_avatar INTEGER DEFAULT 0,
+                      violation_half_life INTEGER DEFAULT 168,
+                      raid_adaptive INTEGER DEFAULT 0,
+                      raid_sensitivity INTEGER DEFAULT 4,
+                      shadow_mode INTEGER DEFAULT 0,
+                      anti_zalgo INTEGER DEFAULT 0,
+                      worker_timeout INTEGER DEFAULT 3,
+                      worker_fail_closed INTEGER DEFAULT 0,
+                      anti_image_hash INTEGER DEFAULT 0,
+                      image_hash_distance INTEGER DEFAULT 6)''')
         # Migrate existing installs — add new columns if missing
         for col, definition in [
             ("log_channel_id", "INTEGER"),
@@ -87,12 +133,34 @@ class DatabaseManager:
             ("repeat_count", "INTEGER DEFAULT 3"),
             ("punishments", "TEXT"),
             ("exempt_channels", "TEXT"),
+            ("raid_action", "TEXT DEFAULT 'none'"),
+            ("raid_max_age", "INTEGER DEFAULT 0"),
+            ("raid_default_avatar", "INTEGER DEFAULT 0"),
+            ("violation_half_life", "INTEGER DEFAULT 168"),
+            ("raid_adaptive", "INTEGER DEFAULT 0"),
+            ("raid_sensitivity", "INTEGER DEFAULT 4"),
+            ("shadow_mode", "INTEGER DEFAULT 0"),
+            ("anti_zalgo", "INTEGER DEFAULT 0"),
+            ("worker_timeout", "INTEGER DEFAULT 3"),
+            ("worker_fail_closed", "INTEGER DEFAULT 0"),
+            ("anti_image_hash", "INTEGER DEFAULT 0"),
+            ("image_hash_distance", "INTEGER DEFAULT 6"),
         ]:
             try:
                 c.execute(f"ALTER TABLE automod_settings ADD COLUMN {col} {definition}")
             except Exception:
                 pass
 
+        c.execute('''CREATE TABLE IF NOT EXISTS automod_violations
+                     (guild_id INTEGER, user_id INTEGER, score REAL, updated_at REAL,
+                      PRIMARY KEY (guild_id, user_id))''')
+        c.execute('''CREATE TABLE IF NOT EXISTS automod_domains
+                     (guild_id INTEGER, domain TEXT, list_type TEXT,
+                      PRIMARY KEY (guild_id, domain))''')
+        c.execute('''CREATE TABLE IF NOT EXISTS automod_image_hashes
+                     (guild_id INTEGER, hash TEXT, label TEXT,
+                      PRIMARY KEY (guild_id, hash))''')
+
         # --- Tickets ---
         c.execute('''CREATE TABLE IF NOT EXISTS ticket_settings
                      (guild_id INTEGER PRIMARY KEY, active_category_id INTEGER,
@@ -147,11 +215,26 @@ class DatabaseManager:
                      (id INTEGER PRIMARY KEY AUTOINCREMENT,
                       user_id INTEGER, guild_id INTEGER, channel_id INTEGER,
                       message TEXT, fire_at REAL, deliver_dm INTEGER)''')
+        # Recurring reminders: a repeat interval in seconds, or a cron expression
+        for col in ("interval INTEGER", "cron TEXT"):
+            try:
+                c.execute(f"ALTER TABLE reminders ADD COLUMN {col}")
+            except sqlite3.OperationalError:
+                pass
+        # Due time a reminder was delivered late from while it waits on a retry, so its schedule doesn't drift
+        try:
+            c.execute("ALTER TABLE reminders ADD COLUMN slot REAL")
+        except sqlite3.OperationalError:
+            pass
+        c.execute("CREATE INDEX IF NOT EXISTS idx_reminders_fire_at ON reminders (fire_at)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_reminders_user ON reminders (user_id, guild_id, fire_at)")
 
         # --- AFK ---
         c.execute('''CREATE TABLE IF NOT EXISTS afk
                      (user_id INTEGER, guild_id INTEGER, reason TEXT, timestamp REAL,
                       PRIMARY KEY (user_id, guild_id))''')
+        c.execute("CREATE INDEX IF NOT EXISTS idx_afk_guild ON afk (guild_id)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_afk_timestamp ON afk (timestamp)")
 
         # --- Birthdays ---
         c.execute('''CREATE TABLE IF NOT EXISTS birthday_settings
@@ -176,6 +259,19 @@ class DatabaseManager:
             self.logger.error(f"Database error executing {query}: {e}")
             raise
 
+    def executemany(self, query, seq_of_params, commit=True):
+        """Executes a query for every parameter set in a single transaction."""
+        c = self._conn.cursor()
+        try:
+            c.executemany(query, seq_of_params)
+            if commit:
+                self._conn.commit()
+            return c
+        except Exception as e:
+            self._conn.rollback()
+            self.logger.error(f"Database error executing many {query}: {e}")
+            raise
+
     def fetchone(self, query, params=()):
         c = self._conn.cursor()
         c.execute(query, params)
@@ -0,0 +1,176 @@
+import re
+from typing import Iterable, Iterator
+
+# ---------------------------------------------------------------------------
+# Domain parsing
+# ---------------------------------------------------------------------------
+
+# Host part of every http(s) URL in a message (userinfo and port are skipped)
+URL_HOST_REGEX = re.compile(r"https?://(?:[^\s/@]+@)?([^\s/:?#<>\"']+)", re.IGNORECASE)
+# Sentence punctuation that ends up glued to a bare host ("see https://example.com.")
+HOST_TRAILING_PUNCTUATION = ".,;:!?)]}'\""
+
+DOMAIN_REGEX = re.compile(r"^[a-z0-9_-]+(?:\.[a-z0-9_-]+)*$")
+
+# Hosts-file entries that point somewhere harmless rather than naming a domain
+HOSTS_PLACEHOLDERS = {"localhost", "localhost.localdomain", "local", "broadcasthost", "0.0.0.0"}
+
+
+def normalize_domain(raw: str) -> str | None:
+    """Turn user input like 'https://*.Example.com/path' into 'example.com'. Returns None if invalid."""
+    domain = raw.strip().lower()
+    if "://" in domain:
+        domain = domain.split("://", 1)[1]
+    domain = domain.split("/", 1)[0].split("?", 1)[0].split("#", 1)[0]
+    domain = domain.rsplit("@", 1)[-1].split(":", 1)[0]
+    domain = domain.lstrip("*.").rstrip(".")
+    try:
+        domain = domain.encode("idna").decode("ascii")
+    except UnicodeError:
+        return None
+    if not domain or not DOMAIN_REGEX.match(domain):
+        return None
+    return domain
+
+
+def extract_hosts(text: str) -> list[str]:
+    """Return the normalized host of every URL in the text, deduplicated in order."""
+    hosts = []
+    for raw in URL_HOST_REGEX.findall(text):
+        host = normalize_domain(raw.rstrip(HOST_TRAILING_PUNCTUATION))
+        if host and host not in hosts:
+            hosts.append(host)
+    return hosts
+
+
+def parse_blocklist(lines: Iterable[str]) -> Iterator[str]:
+    """Yield domains from plain, hosts-file ('0.0.0.0 example.com') or adblock ('||example.com^') lists."""
+    for line in lines:
+        line = line.split("#", 1)[0].strip()
+        if not line or line.startswith(("!", "[")):
+            continue
+        if line.startswith("||"):
+            line = line[2:].split("^", 1)[0]
+        else:
+            parts = line.split()
+            line = parts[1] if len(parts) > 1 else parts[0]
+        if line in HOSTS_PLACEHOLDERS:
+            continue
+        domain = normalize_domain(line)
+        if domain:
+            yield domain
+
+
+# ---------------------------------------------------------------------------
+# Suffix trie
+# ---------------------------------------------------------------------------
+
+# Labels are never empty, so "" is free to hold a node's verdict
+_VALUE = ""
+
+
+class DomainTrie:
+    """Maps domains to a verdict, keyed by reversed labels so a lookup is O(label count).
+
+    An entry for 'example.com' also covers every subdomain. When several
+    entries match, the most specific (longest) one wins.
+    """
+
+    __slots__ = ("root", "size")
+
+    def __init__(self, entries: Iterable[tuple[str, str]] = ()):
+        self.root: dict = {}
+        self.size = 0
+        self.update(entries)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def add(self, domain: str, value: str):
+        node = self.root
+        for label in reversed(domain.split(".")):
+            node = node.setdefault(label, {})
+        if _VALUE not in node:
+            self.size += 1
+        node[_VALUE] = value
+
+    def update(self, entries: Iterable[tuple[str, str]]):
+        for domain, value in entries:
+            self.add(domain, value)
+
+    def remove(self, domain: str) -> bool:
+        path = [self.root]
+        labels = list(reversed(domain.split(".")))
+        for label in labels:
+            node = path[-1].get(label)
+            if node is None:
+                return False
+            path.append(node)
+        if _VALUE not in path[-1]:
+            return False
+        del path[-1][_VALUE]
+        self.size -= 1
+        # Prune branches that no longer lead to any entry
+        for i in range(len(labels) - 1, -1, -1):
+            if path[i + 1]:
+                break
+            del path[i][labels[i]]
+        return True
+
+    def match(self, host: str) -> str | None:
+        """Return the verdict of the most specific entry covering the host, or None."""
+        node = self.root
+        verdict = None
+        for label in reversed(host.split(".")):
+            node = node.get(label)
+            if node is None:
+                break
+            verdict = node.get(_VALUE, verdict)
+        return verdict
+
+
+if __name__ == "__main__":
+    # Benchmark: python -m utils.domain_trie [blocklist file ...]
+    import random
+    import sys
+    import time
+    import tracemalloc
+
+    for message, expected in [
+        ("check https://evil.com, cool", ["evil.com"]),
+        ("(see https://evil.com)", ["evil.com"]),
+        ("https://evil.com!", ["evil.com"]),
+        ("[link](https://Sub.Evil.com/path?q=1).", ["sub.evil.com"]),
+        ("\"https://evil.com\"; https://user@good.org:8080/", ["evil.com", "good.org"]),
+        ("https://,,,", []),
+    ]:
+        hosts = extract_hosts(message)
+        assert hosts == expected, f"{message!r}: {hosts} != {expected}"
+    print("extract_hosts checks passed")
+
+    if len(sys.argv) > 1:
+        domains = []
+        for path in sys.argv[1:]:
+            with open(path, encoding="utf-8", errors="ignore") as f:
+                domains.extend(parse_blocklist(f))
+    else:
+        rng = random.Random(0)
+        tlds = ["com", "net", "org", "io", "xyz", "ru", "co.uk", "gg"]
+        domains = [
+            f"{rng.getrandbits(48):x}.{rng.choice(tlds)}" for _ in range(500_000)
+        ]
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    trie = DomainTrie((d, "deny") for d in domains)
+    build = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"Loaded {len(trie):,} domains in {build:.2f}s (peak {peak / 1024 / 1024:.0f} MiB)")
+
+    queries = ["cdn.discordapp.com", "www.youtube.com", "a.b.c.d.example.org", "tenor.com"] * 50_000
+    start = time.perf_counter()
+    for q in queries:
+        trie.match(q)
+    elapsed = time.perf_counter() - start
+    print(f"{len(queries):,} lookups: {elapsed / len(queries) * 1e6:.2f} µs/lookup")
@@ -0,0 +1,139 @@
+import io
+from typing import Iterable
+
+from PIL import Image
+
+# Refuse to decode anything bigger than this, however small the file is
+MAX_IMAGE_PIXELS = 40_000_000
+
+
+def dhash(data: bytes) -> int:
+    """64-bit difference hash of an image: one bit per horizontally adjacent pixel pair of a 9x8 greyscale thumbnail.
+
+    Re-encodes, resizes, and small colour or brightness edits leave most bits
+    unchanged, so near-duplicates are a small Hamming distance apart. Runs in
+    a worker, so it takes raw bytes rather than a Discord object.
+    """
+    with Image.open(io.BytesIO(data)) as img:
+        if img.width * img.height > MAX_IMAGE_PIXELS:
+            raise ValueError(f"image too large ({img.width}x{img.height})")
+        # Lets JPEG decode at a fraction of full resolution
+        img.draft("L", (64, 64))
+        small = img.convert("L").resize((9, 8), Image.Resampling.LANCZOS)
+        pixels = small.tobytes()
+
+    value = 0
+    for row in range(8):
+        offset = row * 9
+        for col in range(8):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def format_hash(value: int) -> str:
+    return f"{value:016x}"
+
+
+def parse_hash(text: str) -> int | None:
+    """Parse a 16-digit hex hash as shown by format_hash(). Returns None if invalid."""
+    text = text.strip().lower()
+    if len(text) != 16:
+        return None
+    try:
+        return int(text, 16)
+    except ValueError:
+        return None
+
+
+class BKTree:
+    """Burkhard-Keller tree over 64-bit hashes for nearest-match lookups by Hamming distance.
+
+    Each child edge is labelled with its distance from the parent, so a search
+    only descends into children whose label is within `max_distance` of the
+    query's distance to the parent (triangle inequality). Removal isn't
+    supported; rebuild the tree instead.
+    """
+
+    __slots__ = ("root", "size")
+
+    def __init__(self, entries: Iterable[tuple[int, str]] = ()):
+        # Node layout: [hash, label, {distance: child}]
+        self.root = None
+        self.size = 0
+        for value, label in entries:
+            self.add(value, label)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def add(self, value: int, label: str):
+        if self.root is None:
+            self.root = [value, label, {}]
+            self.size = 1
+            return
+        node = self.root
+        while True:
+            d = hamming(value, node[0])
+            if d == 0:
+                node[1] = label
+                return
+            child = node[2].get(d)
+            if child is None:
+                node[2][d] = [value, label, {}]
+                self.size += 1
+                return
+            node = child
+
+    def search(self, value: int, max_distance: int) -> tuple[int, int, str] | None:
+        """Return (distance, hash, label) of the closest entry within max_distance, or None."""
+        if self.root is None:
+            return None
+        best = None
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            d = hamming(value, node[0])
+            if d <= max_distance and (best is None or d < best[0]):
+                best = (d, node[0], node[1])
+                if d == 0:
+                    break
+            limit = best[0] if best else max_distance
+            for edge, child in node[2].items():
+                if d - limit <= edge <= d + limit:
+                    stack.append(child)
+        return best
+
+
+if __name__ == "__main__":
+    # Benchmark: python -m utils.image_hash
+    import random
+    import time
+
+    rng = random.Random(0)
+    hashes = [rng.getrandbits(64) for _ in range(5_000)]
+
+    start = time.perf_counter()
+    tree = BKTree((h, "x") for h in hashes)
+    print(f"Built BK-tree of {len(tree):,} hashes in {time.perf_counter() - start:.2f}s")
+
+    queries = [h ^ (1 << rng.randrange(64)) for h in rng.sample(hashes, 500)]
+    queries += [rng.getrandbits(64) for _ in range(500)]
+    for distance in (4, 8):
+        start = time.perf_counter()
+        hits = sum(tree.search(q, distance) is not None for q in queries)
+        elapsed = time.perf_counter() - start
+        print(f"distance {distance}: {len(queries)} queries, {hits} hits, "
+              f"{elapsed / len(queries) * 1e3:.2f} ms/query")
+
+    img = Image.effect_noise((1024, 768), 64).convert("RGB")
+    buf = io.BytesIO()
+    img.save(buf, "JPEG", quality=90)
+    data = buf.getvalue()
+    start = time.perf_counter()
+    for _ in range(20):
+        dhash(data)
+    print(f"dHash of a 1024x768 JPEG: {(time.perf_counter() - start) / 20 * 1e3:.1f} ms")
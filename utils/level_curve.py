@@ -0,0 +1,21 @@
+"""The XP curve, in one place: the leveling cog, backups and the database migration all derive from it."""
+import math
+
+
+def xp_for_level(level):
+    """XP needed to go from `level` to the next one."""
+    return (level + 1) * 100
+
+
+def total_xp_for(level, xp):
+    """Absolute XP: the sum of xp_for_level() over every level below `level`, plus progress into it."""
+    # sum((l + 1) * 100 for l in range(level)) in closed form
+    return 50 * level * (level + 1) + xp
+
+
+def level_for_total_xp(total):
+    """Invert total_xp_for(): return (level, xp into that level) for an absolute XP amount."""
+    total = max(0, total)
+    # Largest L with 50 * L * (L + 1) <= total
+    level = (math.isqrt(2500 + 200 * total) - 50) // 100
+    return level, total - total_xp_for(level, 0)
@@ -0,0 +1,164 @@
+import math
+from collections import deque
+from typing import Iterable, NamedTuple
+
+# ---------------------------------------------------------------------------
+# Tuning constants
+# ---------------------------------------------------------------------------
+
+# Smoothing for the long-term baseline (~200 buckets) and the short-term trend (~5 buckets)
+BASELINE_ALPHA = 0.01
+TREND_ALPHA = 0.3
+# Buckets that must be observed before the detector gives an opinion
+WARMUP_BUCKETS = 30
+# Never flag fewer joins than this in a bucket, however quiet the baseline is
+MIN_JOINS = 5
+# Standard-deviation floor so a perfectly quiet server doesn't flag on two joins
+MIN_STD = 1.0
+# Gaps longer than this many empty buckets have fully decayed the trend anyway
+MAX_CATCHUP_BUCKETS = 2_000
+
+
+class RaidSignal(NamedTuple):
+    count: int        # joins in the current bucket so far
+    z_burst: float    # current bucket vs. baseline
+    z_trend: float    # short-term average vs. baseline — catches slow raids
+    z_age: float      # how much younger this bucket's accounts are than usual
+    flagged: bool
+
+
+def _ewm_update(mean: float, var: float, x: float, alpha: float) -> tuple[float, float]:
+    diff = x - mean
+    incr = alpha * diff
+    return mean + incr, (1 - alpha) * (var + diff * incr)
+
+
+class JoinRateDetector:
+    """Adaptive per-guild raid detector in constant memory.
+
+    Joins are counted in fixed buckets. Each closed bucket updates an
+    exponentially weighted baseline of the join count and of the joiners'
+    log account age, plus a faster-moving trend of the join count. A raid is
+    flagged when the current bucket (burst) or the trend (slow raid) is
+    `sensitivity` standard deviations above the baseline, or when the bucket
+    is unusually busy and its accounts are unusually young.
+    """
+
+    __slots__ = (
+        "bucket_seconds", "sensitivity", "bucket_start", "bucket_count", "bucket_age_sum",
+        "rate_mean", "rate_var", "trend_mean", "age_mean", "age_var", "buckets_seen",
+    )
+
+    def __init__(self, bucket_seconds: float = 10, sensitivity: float = 4.0):
+        self.bucket_seconds = bucket_seconds
+        self.sensitivity = sensitivity
+        self.bucket_start = None
+        self.bucket_count = 0
+        self.bucket_age_sum = 0.0
+        self.rate_mean = 0.0
+        self.rate_var = 0.0
+        self.trend_mean = 0.0
+        self.age_mean = 0.0
+        self.age_var = 0.0
+        self.buckets_seen = 0
+
+    @property
+    def warmed_up(self) -> bool:
+        return self.buckets_seen >= WARMUP_BUCKETS
+
+    def _close_bucket(self, count: int, age_sum: float):
+        std = max(math.sqrt(self.rate_var), MIN_STD)
+        # Winsorize so a raid doesn't immediately become the new normal
+        clipped = min(count, self.rate_mean + self.sensitivity * std) if self.warmed_up else count
+        self.rate_mean, self.rate_var = _ewm_update(self.rate_mean, self.rate_var, clipped, BASELINE_ALPHA)
+        self.trend_mean += TREND_ALPHA * (count - self.trend_mean)
+        if count:
+            self.age_mean, self.age_var = _ewm_update(self.age_mean, self.age_var, age_sum / count, BASELINE_ALPHA)
+        self.buckets_seen += 1
+
+    def _advance(self, now: float):
+        if self.bucket_start is None:
+            self.bucket_start = now
+            return
+        elapsed = int((now - self.bucket_start) // self.bucket_seconds)
+        if elapsed <= 0:
+            return
+        self._close_bucket(self.bucket_count, self.bucket_age_sum)
+        for _ in range(min(elapsed - 1, MAX_CATCHUP_BUCKETS)):
+            self._close_bucket(0, 0.0)
+        self.bucket_start += elapsed * self.bucket_seconds
+        self.bucket_count = 0
+        self.bucket_age_sum = 0.0
+
+    def observe(self, now: float, account_age_days: float) -> RaidSignal | None:
+        """Record a join. Returns None while the baseline is still warming up."""
+        self._advance(now)
+        self.bucket_count += 1
+        self.bucket_age_sum += math.log1p(max(account_age_days, 0))
+
+        if not self.warmed_up:
+            return None
+
+        count = self.bucket_count
+        std = max(math.sqrt(self.rate_var), MIN_STD)
+        z_burst = (count - self.rate_mean) / std
+
+        # Standard error of an EWMA is std * sqrt(alpha / (2 - alpha))
+        trend = self.trend_mean + TREND_ALPHA * (count - self.trend_mean)
+        z_trend = (trend - self.rate_mean) / (std * math.sqrt(TREND_ALPHA / (2 - TREND_ALPHA)))
+
+        age_std = max(math.sqrt(self.age_var), 0.1)
+        z_age = (self.age_mean - self.bucket_age_sum / count) / (age_std / math.sqrt(count))
+
+        s = self.sensitivity
+        busy = count >= MIN_JOINS
+        flagged = busy and (
+            z_burst >= s
+            or z_trend >= s
+            or (z_burst >= s / 2 and z_age >= s)
+        )
+        return RaidSignal(count, z_burst, z_trend, z_age, flagged)
+
+
+class ReplayResult(NamedTuple):
+    joins: int
+    incidents: list[tuple[float, RaidSignal]]  # first flagged join of each incident
+    peak: RaidSignal | None
+
+
+def replay(events: Iterable[tuple[float, float]], bucket_seconds: float, sensitivity: float) -> ReplayResult:
+    """Run a recorded (timestamp, account_age_days) timeline through a fresh detector."""
+    detector = JoinRateDetector(bucket_seconds, sensitivity)
+    incidents = []
+    peak = None
+    last_flag = None
+    joins = 0
+    for ts, age in sorted(events):
+        joins += 1
+        signal = detector.observe(ts, age)
+        if signal is None:
+            continue
+        if peak is None or max(signal.z_burst, signal.z_trend) > max(peak.z_burst, peak.z_trend):
+            peak = signal
+        if signal.flagged:
+            # Flags closer together than a few buckets belong to the same incident
+            if last_flag is None or ts - last_flag > bucket_seconds * 6:
+                incidents.append((ts, signal))
+            last_flag = ts
+    return ReplayResult(joins, incidents, peak)
+
+
+def replay_fixed(events: Iterable[tuple[float, float]], count: int, window: float) -> list[float]:
+    """Replay a timeline through the fixed count-per-window rule for comparison."""
+    window_joins = deque()
+    incidents = []
+    last_flag = None
+    for ts, _ in sorted(events):
+        window_joins.append(ts)
+        while window_joins and window_joins[0] < ts - window:
+            window_joins.popleft()
+        if len(window_joins) >= count:
+            if last_flag is None or ts - last_flag > window * 6:
+                incidents.append(ts)
+            last_flag = ts
+    return incidents
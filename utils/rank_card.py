@@ -0,0 +1,165 @@
+"""Rank card and leaderboard drawing. Runs in the renderer WorkerPool, so it only deals in plain values and bytes."""
+import functools
+import io
+import threading
+from collections import OrderedDict
+
+from PIL import Image, ImageDraw, ImageFont, ImageOps
+
+CARD_WIDTH = 900
+CARD_HEIGHT = 250
+AVATAR_SIZE = 180
+AVATAR_POS = (40, 35)
+BAR_X, BAR_Y, BAR_W, BAR_H = 260, 150, 580, 6
+
+LEADERBOARD_HEADER = 80
+LEADERBOARD_ROW = 64
+LEADERBOARD_AVATAR = 48
+
+# Circular avatars already cut for a card, per process: {(avatar_key, size): RGBA image}
+AVATAR_IMAGE_CACHE_SIZE = 128
+_avatar_images = OrderedDict()
+_avatar_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=1)
+def _card_fonts():
+    """Name, level label, level value and XP fonts, loaded once per process."""
+    try:
+        return (
+            ImageFont.truetype("arial.ttf", 60),
+            ImageFont.truetype("arial.ttf", 40),
+            ImageFont.truetype("arial.ttf", 100),
+            ImageFont.truetype("arial.ttf", 30),
+        )
+    except Exception as e:
+        print(f"Error loading fonts: {e}")
+        default = ImageFont.load_default()
+        return default, default, default, default
+
+
+@functools.lru_cache(maxsize=1)
+def _card_template():
+    """The empty card (background and progress bar track); copied for every render."""
+    image = Image.new("RGB", (CARD_WIDTH, CARD_HEIGHT), (18, 18, 18))
+    ImageDraw.Draw(image).rectangle([BAR_X, BAR_Y, BAR_X + BAR_W, BAR_Y + BAR_H], fill=(40, 40, 40))
+    return image
+
+
+@functools.lru_cache(maxsize=4)
+def _avatar_mask(size=AVATAR_SIZE):
+    mask = Image.new("L", (size, size), 0)
+    ImageDraw.Draw(mask).ellipse((0, 0, size, size), fill=255)
+    return mask
+
+
+def _circular_avatar(avatar_key, avatar_bytes, size=AVATAR_SIZE):
+    key = (avatar_key, size)
+    with _avatar_lock:
+        cached = _avatar_images.get(key)
+        if cached is not None:
+            _avatar_images.move_to_end(key)
+            return cached
+
+    avatar_image = Image.open(io.BytesIO(avatar_bytes)).convert("RGBA")
+    output = ImageOps.fit(avatar_image, (size, size), Image.Resampling.LANCZOS, centering=(0.5, 0.5))
+    output.putalpha(_avatar_mask(size))
+
+    with _avatar_lock:
+        _avatar_images[key] = output
+        if len(_avatar_images) > AVATAR_IMAGE_CACHE_SIZE:
+            _avatar_images.popitem(last=False)
+    return output
+
+
+def render_rank_card(username, avatar_key, avatar_bytes, xp, level, xp_needed, rank=None, ranked=None):
+    """Draw a rank card and return it as PNG bytes. CPU-bound; run it off the event loop."""
+    image = _card_template().copy()
+    draw = ImageDraw.Draw(image)
+
+    try:
+        avatar = _circular_avatar(avatar_key, avatar_bytes)
+        image.paste(avatar, AVATAR_POS, avatar)
+    except Exception as e:
+        print(f"Error processing avatar: {e}")
+
+    font_name, font_level_label, font_level_val, font_xp = _card_fonts()
+
+    text_x = 260
+    
+    draw.text((text_x + 2, 45), username, font=font_name, fill=(255, 0, 0, 150))
+    draw.text((text_x - 2, 45), username, font=font_name, fill=(0, 255, 255, 150))
+    draw.text((text_x, 45), username, font=font_name, fill=(255, 255, 255))
+    
+    xp_text = f"{xp} / {xp_needed} XP"
+    draw.text((text_x, 105), xp_text, font=font_xp, fill=(150, 150, 150))
+
+    if rank:
+        draw.text((text_x, 175), f"RANK #{rank:,} of {ranked:,}", font=font_xp, fill=(100, 100, 100))
+    
+    level_val_text = str(level)
+    w_val = draw.textlength(level_val_text, font=font_level_val)
+    
+    level_label_text = "LEVEL"
+    w_label = draw.textlength(level_label_text, font=font_level_label)
+    
+    right_margin = 50
+    
+    draw.text((CARD_WIDTH - right_margin - w_val, 40), level_val_text, font=font_level_val, fill=(255, 255, 255))
+    draw.text((CARD_WIDTH - right_margin - w_val - w_label - 15, 65), level_label_text, font=font_level_label, fill=(100, 100, 100))
+
+    progress = min(xp / xp_needed, 1.0)
+    fill_w = int(BAR_W * progress)
+    
+    if fill_w > 0:
+        draw.rectangle([BAR_X, BAR_Y, BAR_X + fill_w, BAR_Y + BAR_H], fill=(215, 0, 120))
+
+    buffer = io.BytesIO()
+    # Cards are sent once and discarded; fast compression beats a slightly smaller file
+    image.save(buffer, format="PNG", compress_level=1)
+    return buffer.getvalue()
+
+
+def render_leaderboard(title, entries):
+    """Draw a leaderboard and return it as PNG bytes.
+
+    `entries` holds (position, name, avatar_key, avatar_bytes, level, total_xp)
+    tuples; avatar_bytes may be None for members who have left.
+    """
+    height = LEADERBOARD_HEADER + LEADERBOARD_ROW * max(len(entries), 1) + 20
+    image = Image.new("RGB", (CARD_WIDTH, height), (18, 18, 18))
+    draw = ImageDraw.Draw(image)
+    _, font_title, _, font_row = _card_fonts()
+
+    draw.text((40, 22), title, font=font_title, fill=(255, 255, 255))
+    draw.rectangle([40, LEADERBOARD_HEADER - 8, CARD_WIDTH - 40, LEADERBOARD_HEADER - 6], fill=(215, 0, 120))
+
+    for i, (position, name, avatar_key, avatar_bytes, level, total) in enumerate(entries):
+        y = LEADERBOARD_HEADER + i * LEADERBOARD_ROW
+        if i % 2:
+            draw.rectangle([30, y, CARD_WIDTH - 30, y + LEADERBOARD_ROW - 4], fill=(26, 26, 26))
+        text_y = y + (LEADERBOARD_ROW - 4 - 30) // 2
+
+        draw.text((45, text_y), f"#{position}", font=font_row, fill=(150, 150, 150))
+        if avatar_bytes:
+            try:
+                avatar = _circular_avatar(avatar_key, avatar_bytes, LEADERBOARD_AVATAR)
+                image.paste(avatar, (130, y + (LEADERBOARD_ROW - 4 - LEADERBOARD_AVATAR) // 2), avatar)
+            except Exception as e:
+                print(f"Error processing avatar: {e}")
+        draw.text((195, text_y), name[:24], font=font_row, fill=(255, 255, 255))
+
+        stats = f"Level {level}  ·  {total:,} XP"
+        w_stats = draw.textlength(stats, font=font_row)
+        draw.text((CARD_WIDTH - 50 - w_stats, text_y), stats, font=font_row, fill=(150, 150, 150))
+
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG", compress_level=1)
+    return buffer.getvalue()
+
+
+def warm_renderer():
+    """Renderer pool initializer: load fonts and templates before the first job arrives."""
+    _card_fonts()
+    _card_template()
+    _avatar_mask()
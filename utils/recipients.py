@@ -0,0 +1,87 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+import discord
+
+
+class RecipientCache:
+    """Resolves user IDs to users and DM channels with at most one REST call per user per TTL.
+
+    The client's own caches come first. Fetched users and opened DM channels are
+    then kept for `ttl` seconds, deleted accounts are remembered (as None) for
+    `negative_ttl`, and concurrent lookups for the same user share one request.
+    """
+
+    def __init__(self, bot, ttl: float = 3600, negative_ttl: float = 86400, max_size: int = 10_000):
+        self.bot = bot
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_size = max_size
+        # {user_id: (expires_at, user or None)} and {user_id: (expires_at, DMChannel)}
+        self._users = OrderedDict()
+        self._dm_channels = OrderedDict()
+        # Requests in progress: {("user" | "dm", user_id): Task}
+        self._inflight = {}
+
+    def _get(self, cache: OrderedDict, user_id: int):
+        entry = cache.get(user_id)
+        if entry is None:
+            return False, None
+        if entry[0] < time.monotonic():
+            del cache[user_id]
+            return False, None
+        cache.move_to_end(user_id)
+        return True, entry[1]
+
+    def _put(self, cache: OrderedDict, user_id: int, value, ttl: float):
+        cache[user_id] = (time.monotonic() + ttl, value)
+        cache.move_to_end(user_id)
+        while len(cache) > self.max_size:
+            cache.popitem(last=False)
+
+    async def _once(self, key, factory):
+        # Everyone asking while a request is in flight awaits the same task
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _fetch_user(self, user_id: int):
+        try:
+            user = await self.bot.fetch_user(user_id)
+        except discord.NotFound:
+            self._put(self._users, user_id, None, self.negative_ttl)
+            return None
+        self._put(self._users, user_id, user, self.ttl)
+        return user
+
+    async def get_user(self, user_id: int) -> discord.User | None:
+        """The user, or None if the account no longer exists. Other HTTP errors are raised and not cached."""
+        user = self.bot.get_user(user_id)
+        if user is not None:
+            return user
+        hit, user = self._get(self._users, user_id)
+        if hit:
+            return user
+        return await self._once(("user", user_id), lambda: self._fetch_user(user_id))
+
+    async def _open_dm(self, user: discord.abc.User):
+        channel = await user.create_dm()
+        self._put(self._dm_channels, user.id, channel, self.ttl)
+        return channel
+
+    async def dm_channel(self, user: discord.abc.User) -> discord.DMChannel:
+        """The user's DM channel, opened at most once per TTL."""
+        if user.dm_channel is not None:
+            return user.dm_channel
+        hit, channel = self._get(self._dm_channels, user.id)
+        if hit:
+            return channel
+        return await self._once(("dm", user.id), lambda: self._open_dm(user))
+
+    def forget(self, user_id: int):
+        self._users.pop(user_id, None)
+        self._dm_channels.pop(user_id, None)
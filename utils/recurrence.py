@@ -0,0 +1,119 @@
+"""Schedules for recurring reminders: fixed intervals and five-field cron expressions (evaluated in UTC).
+
+Only the next fire time is ever computed, straight from the previous one, so a
+recurring reminder is a single row no matter how often it repeats.
+"""
+import math
+from datetime import datetime, timedelta, timezone
+
+# (name, lowest, highest) for each cron field, in order
+CRON_FIELDS = (
+    ("minute", 0, 59),
+    ("hour", 0, 23),
+    ("day of month", 1, 31),
+    ("month", 1, 12),
+    ("day of week", 0, 6),
+)
+
+# A schedule that doesn't fire within this many days (e.g. "0 0 30 2 *") is rejected
+CRON_SEARCH_DAYS = 366 * 8
+
+
+class CronError(ValueError):
+    """A cron expression couldn't be parsed or never fires."""
+
+
+def _parse_field(text: str, name: str, low: int, high: int) -> tuple[int, ...]:
+    values = set()
+    for part in text.split(","):
+        step = 1
+        stepped = "/" in part
+        if stepped:
+            part, step_text = part.split("/", 1)
+            if not step_text.isdigit() or int(step_text) == 0:
+                raise CronError(f"bad step in {name}: {text!r}")
+            step = int(step_text)
+
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            first, last = part.split("-", 1)
+            if not (first.isdigit() and last.isdigit()):
+                raise CronError(f"bad range in {name}: {text!r}")
+            start, end = int(first), int(last)
+        elif part.isdigit():
+            start = int(part)
+            end = high if stepped else start
+        else:
+            raise CronError(f"bad {name}: {text!r}")
+
+        # Sunday may be written as 7
+        if name == "day of week" and end == 7:
+            end = 6
+            values.add(0)
+            if start == 7:
+                continue
+        if not low <= start <= end <= high:
+            raise CronError(f"{name} must be within {low}-{high}: {text!r}")
+        values.update(range(start, end + 1, step))
+    return tuple(sorted(values))
+
+
+class CronSchedule:
+    """A standard `minute hour day-of-month month day-of-week` schedule.
+
+    As in cron, when both day fields are restricted a day matches if either does.
+    """
+
+    __slots__ = ("expression", "minutes", "hours", "days", "months", "weekdays", "any_day", "any_weekday")
+
+    def __init__(self, expression: str):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise CronError("expected 5 fields: minute hour day-of-month month day-of-week")
+        self.expression = " ".join(fields)
+        self.minutes, self.hours, self.days, self.months, self.weekdays = (
+            _parse_field(text, *spec) for text, spec in zip(fields, CRON_FIELDS)
+        )
+        self.any_day = fields[2] == "*"
+        self.any_weekday = fields[4] == "*"
+
+    def _day_matches(self, date: datetime) -> bool:
+        day = date.day in self.days
+        # datetime counts Monday as 0, cron counts Sunday as 0
+        weekday = (date.weekday() + 1) % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return day and weekday
+        return day or weekday
+
+    def next_after(self, ts: float) -> float:
+        """The first fire time strictly after `ts`."""
+        moment = datetime.fromtimestamp(ts, timezone.utc).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        for _ in range(CRON_SEARCH_DAYS):
+            if moment.month in self.months and self._day_matches(moment):
+                for hour in self.hours:
+                    if hour < moment.hour:
+                        continue
+                    earliest = moment.minute if hour == moment.hour else 0
+                    minute = next((m for m in self.minutes if m >= earliest), None)
+                    if minute is not None:
+                        return moment.replace(hour=hour, minute=minute).timestamp()
+            moment = (moment + timedelta(days=1)).replace(hour=0, minute=0)
+        raise CronError(f"{self.expression!r} never fires")
+
+    def shortest_gap(self) -> float:
+        """The shortest time between two fire times, in seconds.
+
+        Assumes consecutive days can both match, so midnight-spanning gaps count too.
+        """
+        times = [hour * 60 + minute for hour in self.hours for minute in self.minutes]
+        gaps = [later - earlier for earlier, later in zip(times, times[1:])]
+        gaps.append(times[0] + 24 * 60 - times[-1])
+        return min(gaps) * 60
+
+
+def next_interval_fire(fire_at: float, interval: float, now: float) -> float:
+    """The next slot on `fire_at`'s interval grid after `now`; occurrences missed during downtime are skipped."""
+    if now < fire_at:
+        return fire_at
+    return fire_at + (math.floor((now - fire_at) / interval) + 1) * interval
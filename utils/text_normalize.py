@@ -0,0 +1,102 @@
+import re
+import unicodedata
+from functools import lru_cache
+from typing import NamedTuple
+
+# ---------------------------------------------------------------------------
+# Translation table
+# ---------------------------------------------------------------------------
+
+# Invisible characters used to split words without changing how they render
+ZERO_WIDTH_CHARS = [
+    0x00AD, 0x034F, 0x061C, 0x115F, 0x1160, 0x17B4, 0x17B5, 0x180E,
+    *range(0x200B, 0x2010), *range(0x202A, 0x202F), *range(0x2060, 0x2070),
+    0x3164, 0xFE0E, 0xFE0F, 0xFEFF, 0xFFA0,
+]
+
+# Combining marks (accents, "zalgo" stacks) — NFKD splits these off their base letter
+COMBINING_RANGES = [
+    (0x0300, 0x0370), (0x0483, 0x048A), (0x1AB0, 0x1B00),
+    (0x1DC0, 0x1E00), (0x20D0, 0x2100), (0xFE20, 0xFE30),
+]
+
+# Lowercase lookalikes that survive NFKD + casefold (Cyrillic, Greek, IPA, small caps)
+CONFUSABLES = {
+    "а": "a", "в": "b", "с": "c", "ԁ": "d", "е": "e", "ё": "e", "г": "r", "һ": "h", "н": "h",
+    "і": "i", "ї": "i", "ј": "j", "к": "k", "ӏ": "l", "м": "m", "п": "n", "о": "o", "р": "p",
+    "ԛ": "q", "ѕ": "s", "т": "t", "у": "y", "х": "x", "ԝ": "w", "ь": "b", "ц": "u",
+    "α": "a", "β": "b", "ε": "e", "η": "n", "ι": "i", "κ": "k", "ν": "v", "ο": "o", "ρ": "p",
+    "τ": "t", "υ": "u", "χ": "x", "γ": "y", "ω": "w", "μ": "u",
+    "ı": "i", "ȷ": "j", "ɑ": "a", "ɡ": "g", "ɩ": "i", "ɪ": "i", "ʀ": "r", "ʏ": "y",
+    "ᴀ": "a", "ʙ": "b", "ᴄ": "c", "ᴅ": "d", "ᴇ": "e", "ғ": "f", "ɢ": "g", "ʜ": "h", "ᴊ": "j",
+    "ᴋ": "k", "ʟ": "l", "ᴍ": "m", "ɴ": "n", "ᴏ": "o", "ᴘ": "p", "ǫ": "q", "ᴛ": "t", "ᴜ": "u",
+    "ᴠ": "v", "ᴡ": "w", "ᴢ": "z",
+}
+
+
+def _build_fold_table() -> dict[int, str | None]:
+    table: dict[int, str | None] = {cp: None for cp in ZERO_WIDTH_CHARS}
+    for start, end in COMBINING_RANGES:
+        table.update({cp: None for cp in range(start, end)})
+    table.update({ord(k): v for k, v in CONFUSABLES.items()})
+    return table
+
+
+FOLD_TABLE = _build_fold_table()
+
+# Separators removed entirely for the compact form ("." and "/" are kept so URLs survive)
+SEPARATOR_TABLE = {ord(c): None for c in " \t\n\r\f\v_-*~|+'\"`,"}
+
+# Runs of single characters split by separators: "b a d", "b-a-d", "d i s c o r d"
+SPACED_RUN_REGEX = re.compile(r"(?<!\w)(?:\w[\s_\-*~|+'\"`]+)+\w(?!\w)")
+SEPARATOR_REGEX = re.compile(r"[\s_\-*~|+'\"`]+")
+WHITESPACE_REGEX = re.compile(r"\s+")
+
+
+# ---------------------------------------------------------------------------
+# Normalization
+# ---------------------------------------------------------------------------
+
+class NormalizedText(NamedTuple):
+    text: str     # folded, lowercased, spaced-out runs joined, whitespace collapsed
+    compact: str  # text with every separator removed — for invite/URL style patterns
+
+
+def _join_run(match: re.Match) -> str:
+    return SEPARATOR_REGEX.sub("", match.group())
+
+
+@lru_cache(maxsize=1024)
+def normalize_text(content: str) -> NormalizedText:
+    """Fold a message into a canonical form for filtering. Results are cached per content string."""
+    text = unicodedata.normalize("NFKD", content).casefold().translate(FOLD_TABLE)
+    text = SPACED_RUN_REGEX.sub(_join_run, text)
+    text = WHITESPACE_REGEX.sub(" ", text).strip()
+    return NormalizedText(text, text.translate(SEPARATOR_TABLE))
+
+
+if __name__ == "__main__":
+    # Benchmark: python -m utils.text_normalize
+    import random
+    import timeit
+
+    samples = [
+        "ｄｉｓｃｏｒｄ．ｇｇ／ｒａｉｄ",
+        "d i s c o r d . g g / free",
+        "dis\u200bcord\u200d.gg/nitro",
+        "Frее nіtrо аt discоrd.gg",
+        "z̷̢̛a̵͝l̴̾g̸̈́o̶̿ t̷̀e̵͠x̵̐t̴̆",
+    ]
+    for s in samples:
+        print(f"{s!r:45} -> {normalize_text(s)}")
+
+    alphabet = "abcdefghijklmnopqrstuvwxyz ABCDEF 0123 ．ｇｇ\u200bа е о\u0301"
+    rng = random.Random(0)
+    messages = ["".join(rng.choice(alphabet) for _ in range(2000)) for _ in range(200)]
+
+    runs = 5
+    total = timeit.timeit(
+        lambda: [normalize_text.__wrapped__(m) for m in messages], number=runs
+    )
+    per_msg_ms = total / (runs * len(messages)) * 1000
+    print(f"\n2000-char messages, uncached: {per_msg_ms:.3f} ms/message")
@@ -0,0 +1,111 @@
+class VoiceTracker:
+    """Tracks how long each member has spent earning voice XP, in O(1) per voice state change.
+
+    A member earns while `ok` (not AFK, muted or deafened, as decided by the
+    caller) and at least one other tracked member shares their channel.
+    Earned time is banked as seconds and handed out by drain() or when the
+    session ends, so nothing is written per tick.
+    """
+
+    __slots__ = ("sessions", "channels")
+
+    def __init__(self):
+        # {key: [channel_id, ok, earning_since or None, banked_seconds]}
+        self.sessions = {}
+        # Tracked members per channel: {channel_id: set of keys}
+        self.channels = {}
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+    def __contains__(self, key) -> bool:
+        return key in self.sessions
+
+    def channel_of(self, key):
+        """The channel a member's session is in, or None if they have no session."""
+        session = self.sessions.get(key)
+        return session[0] if session else None
+
+    def _settle(self, session, now: float):
+        if session[2] is not None:
+            session[3] += now - session[2]
+            session[2] = now
+
+    def _refresh(self, key, now: float):
+        session = self.sessions[key]
+        earning = session[1] and len(self.channels.get(session[0], ())) >= 2
+        if earning and session[2] is None:
+            session[2] = now
+        elif not earning and session[2] is not None:
+            self._settle(session, now)
+            session[2] = None
+
+    def _refresh_channel(self, channel_id, now: float):
+        # Only called when a channel crosses between one and two members, so this touches at most two keys
+        for key in self.channels.get(channel_id, ()):
+            self._refresh(key, now)
+
+    def update(self, key, channel_id, ok: bool, now: float) -> float:
+        """Apply a member's new voice state (channel_id None when they left).
+
+        Returns the banked seconds if the session ended, otherwise 0.
+        """
+        session = self.sessions.get(key)
+        old_channel = session[0] if session else None
+
+        if session:
+            self._settle(session, now)
+
+        if old_channel != channel_id and old_channel is not None:
+            members = self.channels[old_channel]
+            members.discard(key)
+            if not members:
+                del self.channels[old_channel]
+            elif len(members) == 1:
+                self._refresh_channel(old_channel, now)
+
+        if channel_id is None:
+            if session is None:
+                return 0.0
+            del self.sessions[key]
+            return session[3]
+
+        if session is None:
+            session = [channel_id, ok, None, 0.0]
+            self.sessions[key] = session
+        session[0] = channel_id
+        session[1] = ok
+
+        if old_channel != channel_id:
+            members = self.channels.setdefault(channel_id, set())
+            members.add(key)
+            if len(members) == 2:
+                self._refresh_channel(channel_id, now)
+                return 0.0
+        self._refresh(key, now)
+        return 0.0
+
+    def add_banked(self, key, seconds: float):
+        """Credit time restored from a snapshot to a live session."""
+        session = self.sessions.get(key)
+        if session:
+            session[3] += seconds
+
+    def drain(self, now: float, unit: float = 60) -> dict:
+        """Take whole `unit`s of banked time from every session: {key: units}. Remainders stay banked."""
+        taken = {}
+        for key, session in self.sessions.items():
+            self._settle(session, now)
+            units = int(session[3] // unit)
+            if units:
+                session[3] -= units * unit
+                taken[key] = units
+        return taken
+
+    def snapshot(self, now: float) -> list:
+        """[(key, channel_id, banked_seconds)] for every live session, settled to `now`."""
+        rows = []
+        for key, session in self.sessions.items():
+            self._settle(session, now)
+            rows.append((key, session[0], session[3]))
+        return rows
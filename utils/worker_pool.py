@@ -0,0 +1,110 @@
+import asyncio
+import logging
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+def _noop():
+    pass
+
+
+class PoolBusy(Exception):
+    """Raised when a worker pool, or one key's share of it, is saturated."""
+
+
+class WorkerPool:
+    """A bounded executor for CPU-heavy work that must stay off the event loop.
+
+    Jobs are admitted only while the pool has fewer than `max_pending` jobs in
+    flight and the submitting key (usually a guild ID) has fewer than
+    `per_key_limit`, so one busy guild can't starve the others. Everything
+    else is rejected immediately with PoolBusy instead of queueing unbounded.
+    Slots are released when a job actually finishes, not when the caller
+    stops waiting, so the counts always reflect real worker occupancy.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_pending: int, per_key_limit: int,
+                 processes: bool = True, initializer=None, initargs: tuple = ()):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.per_key_limit = per_key_limit
+        self.logger = logging.getLogger(name)
+
+        self.executor = None
+        if processes:
+            try:
+                self.executor = ProcessPoolExecutor(max_workers, initializer=initializer, initargs=initargs)
+            except (OSError, NotImplementedError) as e:
+                self.logger.warning(f"Process pool unavailable, falling back to threads: {e}")
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers, thread_name_prefix=name,
+                                               initializer=initializer, initargs=initargs)
+
+        self.pending = 0
+        self.pending_by_key = defaultdict(int)
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        # Recent job latencies in seconds, for stats()
+        self.latencies = deque(maxlen=500)
+
+    def _release(self, key, started):
+        self.pending -= 1
+        self.pending_by_key[key] -= 1
+        if self.pending_by_key[key] <= 0:
+            del self.pending_by_key[key]
+        self.completed += 1
+        self.latencies.append(time.perf_counter() - started)
+
+    async def run(self, key, fn, *args, timeout: float | None = None):
+        """Run fn(*args) in the pool. Raises PoolBusy when saturated and asyncio.TimeoutError on timeout."""
+        if self.pending >= self.max_pending or self.pending_by_key.get(key, 0) >= self.per_key_limit:
+            self.rejected += 1
+            raise PoolBusy(self.name)
+
+        self.pending += 1
+        self.pending_by_key[key] += 1
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        try:
+            future = self.executor.submit(fn, *args)
+        except Exception:
+            self.pending -= 1
+            self.pending_by_key[key] -= 1
+            raise
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._release, key, started))
+
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            future.cancel()
+            raise
+
+    def warm(self):
+        """Start every worker now (running the initializer) instead of on the first real jobs."""
+        for _ in range(self.max_workers):
+            self.executor.submit(_noop)
+
+    def stats(self) -> dict:
+        latencies = sorted(self.latencies)
+
+        def pct(p):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000 if latencies else 0.0
+
+        return {
+            "pending": self.pending,
+            # Jobs admitted but still waiting for a free worker
+            "queued": max(0, self.pending - self.max_workers),
+            "busiest_key": max(self.pending_by_key.values(), default=0),
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "p50_ms": pct(0.5),
+            "p95_ms": pct(0.95),
+        }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,132 @@
+"""Streaming parsers and writers for bulk XP import/export.
+
+Records are (user_id, level, xp, total_xp) with level/xp/total_xp set to None
+when the source didn't provide them; mapping them onto our level curve is
+up to the caller.
+"""
+import csv
+import gzip
+import io
+import itertools
+import json
+import zlib
+from typing import IO, Iterable, Iterator
+
+EXPORT_FIELDS = ("user_id", "level", "xp", "total_xp")
+
+# Column names other leveling bots commonly use for the same values
+FIELD_ALIASES = {
+    "user_id": ("user_id", "userid", "id", "user", "member_id", "discord_id"),
+    "level": ("level", "lvl"),
+    "xp": ("xp", "exp", "experience", "progress"),
+    "total_xp": ("total_xp", "totalxp", "total", "total_exp"),
+}
+
+# Largest magnitude accepted per field. Discord IDs fit in 63 bits; the level/XP caps keep
+# every value derived from them on our curve inside a SQLite INTEGER.
+FIELD_LIMITS = {
+    "user_id": 2**63 - 1,
+    "level": 100_000,
+    "xp": 10**12,
+    "total_xp": 10**12,
+}
+
+# What a corrupt archive or a malformed CSV raises while it's being read
+READ_ERRORS = (OSError, EOFError, zlib.error, csv.Error)
+
+
+class RecordError(ValueError):
+    """A line of an import file couldn't be parsed."""
+
+
+class ImportFileError(ValueError):
+    """The import file itself couldn't be read past some point, e.g. a truncated .gz."""
+
+
+def open_text(data: bytes, filename: str) -> IO[str]:
+    """Wrap uploaded bytes as a text stream, transparently un-gzipping .gz files."""
+    raw = io.BytesIO(data)
+    if filename.lower().endswith(".gz"):
+        raw = gzip.GzipFile(fileobj=raw)
+    return io.TextIOWrapper(raw, encoding="utf-8-sig", errors="replace", newline="")
+
+
+def _int_or_none(value, name):
+    if value is None or value == "":
+        return None
+    try:
+        # int() first so large IDs given as strings don't lose precision through float
+        number = int(value)
+    except OverflowError:
+        raise RecordError(f"not a number: {value!r}")
+    except (TypeError, ValueError):
+        try:
+            number = int(float(value))
+        except (TypeError, ValueError, OverflowError):
+            raise RecordError(f"not a number: {value!r}")
+    if abs(number) > FIELD_LIMITS[name]:
+        raise RecordError(f"{name} out of range: {value!r}")
+    return number
+
+
+def _normalize(record: dict) -> tuple[int, int | None, int | None, int | None]:
+    lowered = {str(k).strip().lower(): v for k, v in record.items()}
+    fields = {}
+    for name, aliases in FIELD_ALIASES.items():
+        fields[name] = next((lowered[a] for a in aliases if a in lowered), None)
+    user_id = _int_or_none(fields["user_id"], "user_id")
+    if not user_id or user_id < 0:
+        raise RecordError("missing user_id")
+    return (
+        user_id,
+        _int_or_none(fields["level"], "level"),
+        _int_or_none(fields["xp"], "xp"),
+        _int_or_none(fields["total_xp"], "total_xp"),
+    )
+
+
+def iter_records(stream: IO[str]) -> Iterator[tuple[int, tuple | None, str | None]]:
+    """Yield (line number, record or None, error or None) from a CSV (with header) or JSON-lines stream.
+
+    Raises ImportFileError if the stream itself breaks part-way; records already yielded are valid.
+    """
+    number = 0
+    try:
+        for number, record, error in _iter_records(stream):
+            yield number, record, error
+    except READ_ERRORS as e:
+        raise ImportFileError(f"unreadable after line {number}: {e}") from e
+
+
+def _iter_records(stream: IO[str]) -> Iterator[tuple[int, tuple | None, str | None]]:
+    first = stream.readline()
+    if not first:
+        return
+    if first.lstrip().startswith("{"):
+        for number, line in enumerate(itertools.chain([first], stream), 1):
+            if not line.strip():
+                continue
+            try:
+                yield number, _normalize(json.loads(line)), None
+            except (ValueError, AttributeError) as e:
+                yield number, None, str(e)
+        return
+
+    reader = csv.DictReader(stream, fieldnames=next(csv.reader([first])))
+    for number, row in enumerate(reader, 2):
+        try:
+            yield number, _normalize(row), None
+        except RecordError as e:
+            yield number, None, str(e)
+
+
+def write_rows(stream: IO[str], rows: Iterable[tuple], fmt: str, header: bool):
+    """Write (user_id, level, xp, total_xp) rows as CSV or JSON lines."""
+    if fmt == "jsonl":
+        for row in rows:
+            stream.write(json.dumps(dict(zip(EXPORT_FIELDS, row))) + "\n")
+        return
+    writer = csv.writer(stream)
+    if header:
+        writer.writerow(EXPORT_FIELDS)
+    writer.writerows(rows)